@@ -0,0 +1,181 @@
+"""A micro-benchmark suite for the video library, player and parser.
+
+Usage:
+    python3 src/benchmark.py [--scales 10000 100000] [--output results.json]
+"""
+
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from catalog_generator import generate_catalog
+from command_parser import CommandParser
+from video_library import VideoLibrary
+from video_player import VideoPlayer
+
+DEFAULT_SCALES = (10_000, 100_000)
+
+
+class _NullWriter(io.TextIOBase):
+    """A text stream that discards everything written to it."""
+
+    def write(self, text):
+        return len(text)
+
+
+@contextlib.contextmanager
+def quiet_player():
+    """Silences player output and answers 'no' to any search prompt."""
+    original_input = builtins.input
+    builtins.input = lambda *args: "no"
+    try:
+        with contextlib.redirect_stdout(_NullWriter()):
+            yield
+    finally:
+        builtins.input = original_input
+
+
+def time_call(action, setup=None, repeat=5):
+    """Times an action, running setup before each run untimed.
+
+    Returns:
+        A dict with the number of runs and min/mean/median seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        action()
+        timings.append(time.perf_counter() - start)
+    return {
+        "runs": repeat,
+        "min_s": min(timings),
+        "mean_s": statistics.mean(timings),
+        "median_s": statistics.median(timings),
+    }
+
+
+def _player_cases(player, video_id, tag):
+    """Returns (name, setup, action) for every VideoPlayer command."""
+    def playing():
+        player.play_video(video_id)
+
+    def paused():
+        player.play_video(video_id)
+        player.pause_video()
+
+    def with_playlist():
+        player.playlists.clear()
+        player.create_playlist("bench")
+        player.add_to_playlist("bench", video_id)
+
+    def unflagged():
+        player.flagged_videos.clear()
+
+    def flagged():
+        player.flagged_videos.clear()
+        player.flag_video(video_id, "bench")
+
+    return (
+        ("number_of_videos", None, player.number_of_videos),
+        ("show_all_videos", None, player.show_all_videos),
+        ("play_video", None, playing),
+        ("play_random_video", None, player.play_random_video),
+        ("stop_video", playing, player.stop_video),
+        ("pause_video", playing, player.pause_video),
+        ("continue_video", paused, player.continue_video),
+        ("show_playing", playing, player.show_playing),
+        ("create_playlist", player.playlists.clear,
+         lambda: player.create_playlist("bench")),
+        ("add_to_playlist", lambda: (player.playlists.clear(),
+                                     player.create_playlist("bench")),
+         lambda: player.add_to_playlist("bench", video_id)),
+        ("remove_from_playlist", with_playlist,
+         lambda: player.remove_from_playlist("bench", video_id)),
+        ("clear_playlist", with_playlist,
+         lambda: player.clear_playlist("bench")),
+        ("delete_playlist", with_playlist,
+         lambda: player.delete_playlist("bench")),
+        ("show_playlist", with_playlist,
+         lambda: player.show_playlist("bench")),
+        ("show_all_playlists", with_playlist, player.show_all_playlists),
+        ("search_videos", None, lambda: player.search_videos("cat")),
+        ("search_videos_tag", None, lambda: player.search_videos_tag(tag)),
+        ("flag_video", unflagged, lambda: player.flag_video(video_id, "x")),
+        ("allow_video", flagged, lambda: player.allow_video(video_id)),
+    )
+
+
+def run_scale(catalog_path, rows, repeat=5):
+    """Runs the whole suite against one catalog file.
+
+    Returns:
+        A dict with load time and per-command timings.
+    """
+    load = time_call(lambda: VideoLibrary(catalog_path), repeat=1)
+    library = VideoLibrary(catalog_path)
+    player = VideoPlayer(library)
+    parser = CommandParser(player)
+    first = library.get_all_videos()[0]
+    tag = first.tags[0] if first.tags else "#cat"
+
+    commands = {}
+    dispatch = {}
+    with quiet_player():
+        for name, setup, action in _player_cases(player, first.video_id, tag):
+            commands[name] = time_call(action, setup, repeat)
+        for command in ("NUMBER_OF_VIDEOS", "SHOW_PLAYING", "HELP",
+                        f"PLAY {first.video_id}", "SEARCH_VIDEOS cat"):
+            dispatch[command] = time_call(
+                lambda: parser.execute_command(command.split()),
+                repeat=repeat)
+    return {"rows": rows, "load": load, "commands": commands,
+            "dispatch": dispatch}
+
+
+def run_suite(scales=DEFAULT_SCALES, seed=0, repeat=5):
+    """Generates a catalog at each scale and benchmarks it.
+
+    Returns:
+        A JSON serializable dict of results.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in scales:
+            catalog_path = os.path.join(tmp_dir, f"videos_{rows}.txt")
+            generate_catalog(catalog_path, rows, seed)
+            results.append(run_scale(catalog_path, rows, repeat))
+            os.remove(catalog_path)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--scales", type=int, nargs="+",
+                            default=list(DEFAULT_SCALES))
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--output", help="JSON file, defaults to stdout")
+    args = arg_parser.parse_args()
+
+    suite = run_suite(args.scales, args.seed, args.repeat)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(suite, output_file, indent=2)
+    else:
+        json.dump(suite, sys.stdout, indent=2)
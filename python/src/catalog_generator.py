@@ -0,0 +1,90 @@
+"""A synthetic videos.txt catalog generator.
+
+Usage:
+    python3 src/catalog_generator.py <rows> <output_path> [--seed SEED]
+"""
+
+import argparse
+import itertools
+import random
+
+_TITLE_WORDS = (
+    "cat", "cats", "dog", "dogs", "funny", "amazing", "how", "to", "the",
+    "best", "video", "about", "life", "at", "google", "music", "live",
+    "tutorial", "python", "cooking", "recipe", "travel", "vlog", "review",
+    "unboxing", "game", "gameplay", "trailer", "official", "highlights",
+    "news", "week", "day", "in", "my", "with", "for", "beginners", "top",
+    "ten", "moments", "compilation", "asmr", "workout", "morning", "routine",
+    "science", "explained", "history", "documentary", "guitar", "piano",
+    "lesson", "speedrun", "challenge", "prank", "reaction", "podcast",
+    "episode", "interview", "football", "goals", "nothing", "another",
+)
+
+_TAGS = (
+    "#animal", "#cat", "#dog", "#music", "#funny", "#tutorial", "#gaming",
+    "#news", "#travel", "#food", "#sport", "#science", "#education",
+    "#career", "#google", "#python", "#diy", "#comedy", "#vlog", "#review",
+    "#asmr", "#fitness", "#history", "#tech", "#movie", "#kids", "#art",
+    "#nature", "#cars", "#fashion",
+)
+
+
+def _zipf_cum_weights(count, exponent=1.1):
+    """Returns cumulative Zipf weights for use with random.choices."""
+    return list(itertools.accumulate(
+        1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def generate_rows(rows, seed=0):
+    """Yields (title, video_id, tags) tuples for a synthetic catalog.
+
+    Titles and tags follow a Zipf distribution so that a few words and tags
+    are very common and most are rare, which is what real catalogs look
+    like. The same seed always yields the same rows.
+
+    Args:
+        rows: The number of videos to generate.
+        seed: The random seed.
+    """
+    rng = random.Random(seed)
+    word_weights = _zipf_cum_weights(len(_TITLE_WORDS))
+    tag_weights = _zipf_cum_weights(len(_TAGS))
+    for row in range(rows):
+        words = rng.choices(_TITLE_WORDS, cum_weights=word_weights,
+                            k=rng.randint(2, 6))
+        title = " ".join(words).capitalize()
+        video_id = f"{'_'.join(words[:2])}_{row:08x}_video_id"
+        tag_count = rng.choices((0, 1, 2, 3, 4), weights=(5, 25, 40, 20, 10))[0]
+        tags = dict.fromkeys(
+            rng.choices(_TAGS, cum_weights=tag_weights, k=tag_count))
+        yield title, video_id, tuple(tags)
+
+
+def format_row(title, video_id, tags):
+    """Returns a catalog line in the videos.txt format."""
+    return f"{title} | {video_id} |  {' , '.join(tags)}\n"
+
+
+def generate_catalog(path, rows, seed=0):
+    """Writes a synthetic catalog in the videos.txt format.
+
+    Rows are streamed to the file so memory use does not depend on the
+    catalog size.
+
+    Args:
+        path: The output file path.
+        rows: The number of videos to generate.
+        seed: The random seed.
+    """
+    with open(path, "w") as catalog_file:
+        catalog_file.writelines(
+            format_row(*row) for row in generate_rows(rows, seed))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("rows", type=int)
+    arg_parser.add_argument("output_path")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+    generate_catalog(args.output_path, args.rows, args.seed)
@@ -0,0 +1,284 @@
+"""A streaming catalog import pipeline.
+
+Catalogs are read line by line, optionally through gzip, bz2 or xz
+decompression, parsed by a reader for their format and validated in
+batches, so memory use does not depend on the size of the file, apart
+from the video ids kept to reject duplicates.
+
+Usage:
+    python3 src/catalog_import.py <path> [--format pipe|csv|jsonl]
+        [--sqlite DB]
+"""
+
+import argparse
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import math
+import time
+from pathlib import Path
+
+from video import Video
+
+_OPENERS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+_FORMATS_BY_SUFFIX = {
+    ".txt": "pipe",
+    ".psv": "pipe",
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+_CSV_HEADER = ["title", "video_id", "tags"]
+_CSV_HEADER_WITH_DURATION = _CSV_HEADER + ["duration"]
+
+# Only the first rejections are kept, to bound memory on very bad files
+_MAX_KEPT_REJECTIONS = 100
+
+
+def open_catalog(path):
+    """Opens a catalog for reading text, decompressing by file suffix."""
+    opener = _OPENERS.get(Path(path).suffix.lower())
+    if opener is None:
+        return open(path, newline="")
+    return opener(path, "rt", newline="")
+
+
+def detect_format(path):
+    """Returns the reader format for a path, ignoring compression suffixes.
+
+    Unknown suffixes are read as the pipe-delimited videos.txt format.
+    """
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes]
+    if suffixes and suffixes[-1] in _OPENERS:
+        suffixes.pop()
+    if not suffixes:
+        return "pipe"
+    return _FORMATS_BY_SUFFIX.get(suffixes[-1], "pipe")
+
+
+def _split_tags(tags):
+    return [tag.strip() for tag in tags.split(",")] if tags else []
+
+
+def parse_duration(text):
+    """Returns the seconds in a duration given as seconds, m:ss or h:mm:ss.
+
+    Raises:
+        ValueError: If the text is not a duration.
+    """
+    seconds = 0.0
+    for part in text.split(":"):
+        seconds = seconds * 60 + float(part)
+    # float() also reads inf and nan, which no video lasts
+    if not seconds > 0 or not math.isfinite(seconds):
+        raise ValueError(f"invalid duration {text!r}")
+    return seconds
+
+
+def _is_duration(value):
+    """Returns whether a JSON value is a positive, finite number of seconds."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    try:
+        # NaN fails both comparisons; an int too big for a float overflows
+        return 0 < float(value) < math.inf
+    except OverflowError:
+        return False
+
+
+# Helper Wrapper around CSV reader to strip whitespace from around
+# each item.
+def _csv_reader_with_strip(reader):
+    yield from ([item.strip() for item in line] for line in reader)
+
+
+def _read_delimited(lines, delimiter, headers=()):
+    reader = _csv_reader_with_strip(csv.reader(lines, delimiter=delimiter))
+    for line_number, fields in enumerate(reader, 1):
+        if not fields:
+            continue
+        if line_number == 1 and \
+                [field.lower() for field in fields] in headers:
+            continue
+        if len(fields) not in (3, 4):
+            yield line_number, f"expected 3 or 4 fields, got {len(fields)}"
+            continue
+        title, video_id, tags = fields[:3]
+        duration = None
+        if len(fields) == 4 and fields[3]:
+            try:
+                duration = parse_duration(fields[3])
+            except ValueError:
+                yield line_number, f"invalid duration {fields[3]!r}"
+                continue
+        yield line_number, (title, video_id, _split_tags(tags), duration)
+
+
+def read_pipe(lines):
+    """Yields (line_number, row) from the pipe-delimited videos.txt format.
+
+    Each row is a (title, video_id, tags, duration) tuple, or an error
+    message if the line cannot be parsed. The duration column is optional
+    and may be seconds, m:ss or h:mm:ss; it is None when left out.
+    """
+    return _read_delimited(lines, "|")
+
+
+def read_csv(lines):
+    """Yields (line_number, row) from a CSV with title, video_id, tags and
+    an optional duration column. Tags are comma separated inside their
+    field and a header row, in any case, is skipped."""
+    return _read_delimited(lines, ",",
+                           (_CSV_HEADER, _CSV_HEADER_WITH_DURATION))
+
+
+def read_jsonl(lines):
+    """Yields (line_number, row) from JSON lines with title, video_id, tags
+    and optional duration keys. Tags may be a list or a comma separated
+    string, and the duration a number of seconds or a string as in
+    read_pipe."""
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, "expected a JSON object"
+            continue
+        tags = record.get("tags") or []
+        if isinstance(tags, str):
+            tags = _split_tags(tags)
+        duration = record.get("duration")
+        if isinstance(duration, str):
+            try:
+                duration = parse_duration(duration)
+            except ValueError:
+                yield line_number, f"invalid duration {duration!r}"
+                continue
+        yield line_number, (record.get("title"), record.get("video_id"), tags,
+                            duration)
+
+
+READERS = {
+    "pipe": read_pipe,
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+}
+
+
+class ImportStats:
+    """A class used to represent the outcome of an import."""
+
+    def __init__(self):
+        self.rows = 0
+        self.rejected = 0
+        self.rejections = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        if not self.seconds:
+            return 0.0
+        return (self.rows + self.rejected) / self.seconds
+
+    def reject(self, line_number, reason):
+        self.rejected += 1
+        if len(self.rejections) < _MAX_KEPT_REJECTIONS:
+            self.rejections.append((line_number, reason))
+
+    def __str__(self):
+        return (f"Imported {self.rows} videos, rejected {self.rejected} rows "
+                f"in {self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s)")
+
+
+class CatalogImporter:
+    """A class used to stream videos out of a catalog file.
+
+    Every imported video id is kept in a set to reject duplicates, about a
+    hundred bytes per video, so that set is the one part of an import that
+    grows with the catalog.
+    """
+
+    def __init__(self, path, catalog_format=None, batch_size=10_000):
+        """
+        Args:
+            path: The catalog file, optionally .gz, .bz2 or .xz compressed.
+            catalog_format: One of READERS. Detected from the path if None.
+            batch_size: How many rows are validated together.
+        """
+        if catalog_format is None:
+            catalog_format = detect_format(path)
+        if catalog_format not in READERS:
+            raise ValueError(f"Unknown catalog format: {catalog_format}")
+        self._path = path
+        self._reader = READERS[catalog_format]
+        self._batch_size = batch_size
+        self.stats = ImportStats()
+
+    def _validate(self, batch, seen_ids):
+        for line_number, row in batch:
+            if isinstance(row, str):
+                self.stats.reject(line_number, row)
+                continue
+            title, video_id, tags, duration = row
+            if not isinstance(title, str) or not title:
+                self.stats.reject(line_number, "missing title")
+            elif not isinstance(video_id, str) or not video_id:
+                self.stats.reject(line_number, "missing video_id")
+            elif not isinstance(tags, list) or \
+                    not all(isinstance(tag, str) for tag in tags):
+                self.stats.reject(line_number, "tags must be strings")
+            elif duration is not None and not _is_duration(duration):
+                self.stats.reject(line_number,
+                                  "duration must be a positive number")
+            elif video_id in seen_ids:
+                self.stats.reject(line_number,
+                                  f"duplicate video_id {video_id}")
+            else:
+                seen_ids.add(video_id)
+                self.stats.rows += 1
+                yield Video(title, video_id, tags, duration)
+
+    def __iter__(self):
+        """Yields the valid videos, updating stats as it goes."""
+        self.stats = ImportStats()
+        start = time.perf_counter()
+        seen_ids = set()
+        batch = []
+        with open_catalog(self._path) as catalog_file:
+            for item in self._reader(catalog_file):
+                batch.append(item)
+                if len(batch) >= self._batch_size:
+                    yield from self._validate(batch, seen_ids)
+                    batch = []
+                    self.stats.seconds = time.perf_counter() - start
+            yield from self._validate(batch, seen_ids)
+        self.stats.seconds = time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    from video_library import VideoLibrary
+    from video_storage import SqliteStorage
+
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("path")
+    arg_parser.add_argument("--format", choices=sorted(READERS))
+    arg_parser.add_argument("--sqlite", metavar="DB")
+    args = arg_parser.parse_args()
+
+    storage = SqliteStorage(args.sqlite) if args.sqlite else None
+    library = VideoLibrary(args.path, storage, args.format)
+    print(library.import_stats)
+    for line_number, reason in library.import_stats.rejections:
+        print(f"  line {line_number}: {reason}")
@@ -1,8 +1,11 @@
 """A command parser class."""
 
 import textwrap
+from datetime import datetime
 from typing import Sequence
 
+from deadline import Deadline, format_timeout, parse_timeout
+
 
 class CommandException(Exception):
     """A class used to represent a wrong command exception."""
@@ -12,13 +15,72 @@ class CommandException(Exception):
 class CommandParser:
     """A class used to parse and execute a user Command."""
 
-    def __init__(self, video_player):
+    def __init__(self, video_player, default_timeout=None):
+        """
+        Args:
+            video_player: The VideoPlayer to run commands on.
+            default_timeout: The seconds a command may take unless it is
+                given its own TIMEOUT, None for no limit.
+        """
         self._player = video_player
+        self.default_timeout = default_timeout
+
+    @staticmethod
+    def _video_ids(arguments):
+        """Returns the video ids given as arguments. An argument @path is
+        replaced by the ids in that file, one per line."""
+        video_ids = []
+        for argument in arguments:
+            if not argument.startswith("@"):
+                video_ids.append(argument)
+                continue
+            try:
+                with open(argument[1:], encoding="utf-8") as id_file:
+                    video_ids.extend(line.strip() for line in id_file
+                                     if line.strip())
+            except OSError as e:
+                raise CommandException(
+                    f"Cannot read video ids from {argument[1:]}: "
+                    f"{e.strerror}")
+        return video_ids
+
+    @staticmethod
+    def _timeout(text):
+        try:
+            return parse_timeout(text)
+        except ValueError:
+            raise CommandException(
+                "Please enter TIMEOUT command followed by a timeout such as "
+                "200ms, 2s or OFF, and optionally a command to run with it.")
+
+    @staticmethod
+    def _history_times(arguments):
+        """Returns the (start, end) epoch seconds of ISO date arguments."""
+        try:
+            times = [datetime.fromisoformat(argument).timestamp()
+                     for argument in arguments]
+        except ValueError:
+            raise CommandException(
+                "Please enter FLAG_HISTORY command followed by an optional "
+                "start and end time, e.g. 2024-05-01T09:00, and an optional "
+                "reason=<flag_reason>.")
+        return tuple(times + [None] * (2 - len(times)))
 
     def execute_command(self, command: Sequence[str]):
         """Executes the user command. Expects the command to be upper case.
            Raises CommandException if a command cannot be parsed.
+
+           The command runs under a Deadline of default_timeout, or of the
+           timeout given by a TIMEOUT <timeout> <command> prefix.
         """
+        timeout = self.default_timeout
+        if len(command) > 2 and command[0].upper() == "TIMEOUT":
+            timeout = self._timeout(command[1])
+            command = command[2:]
+        with Deadline(timeout):
+            self._execute(command)
+
+    def _execute(self, command):
         if not command:
             raise CommandException(
                 "Please enter a valid command, "
@@ -51,6 +113,9 @@ class CommandParser:
         elif command[0].upper() == "SHOW_PLAYING":
             self._player.show_playing()
 
+        elif command[0].upper() == "POSITION":
+            self._player.show_position()
+
         elif command[0].upper() == "CREATE_PLAYLIST":
             if len(command) != 2:
                 raise CommandException(
@@ -72,6 +137,36 @@ class CommandParser:
                     "playlist name and video_id to remove.")
             self._player.remove_from_playlist(command[1], command[2])
 
+        elif command[0].upper() == "ADD_TO_PLAYLIST_BULK":
+            if len(command) < 3:
+                raise CommandException(
+                    "Please enter ADD_TO_PLAYLIST_BULK command followed by a "
+                    "playlist name and video_ids or @file to add.")
+            self._player.add_to_playlist_bulk(
+                command[1], self._video_ids(command[2:]))
+
+        elif command[0].upper() == "REMOVE_FROM_PLAYLIST_BULK":
+            if len(command) < 3:
+                raise CommandException(
+                    "Please enter REMOVE_FROM_PLAYLIST_BULK command followed "
+                    "by a playlist name and video_ids or @file to remove.")
+            self._player.remove_from_playlist_bulk(
+                command[1], self._video_ids(command[2:]))
+
+        elif command[0].upper() in ("PLAYLIST_UNION", "PLAYLIST_INTERSECT",
+                                    "PLAYLIST_DIFF"):
+            if len(command) < 4:
+                raise CommandException(
+                    f"Please enter {command[0].upper()} command followed by a "
+                    "new playlist name and at least two playlists to "
+                    "combine.")
+            combine = {
+                "PLAYLIST_UNION": self._player.playlist_union,
+                "PLAYLIST_INTERSECT": self._player.playlist_intersect,
+                "PLAYLIST_DIFF": self._player.playlist_diff,
+            }[command[0].upper()]
+            combine(command[1], command[2:])
+
         elif command[0].upper() == "CLEAR_PLAYLIST":
             if len(command) != 2:
                 raise CommandException(
@@ -87,11 +182,14 @@ class CommandParser:
             self._player.delete_playlist(command[1])
 
         elif command[0].upper() == "SHOW_PLAYLIST":
-            if len(command) != 2:
+            if not 2 <= len(command) <= 4 or \
+                    not all(argument.isdigit() and int(argument) > 0
+                            for argument in command[2:]):
                 raise CommandException(
                     "Please enter SHOW_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.show_playlist(command[1])
+                    "playlist name and an optional start position and "
+                    "number of videos.")
+            self._player.show_playlist(command[1], *map(int, command[2:]))
 
         elif command[0].upper() == "SHOW_ALL_PLAYLISTS":
             self._player.show_all_playlists()
@@ -110,6 +208,65 @@ class CommandParser:
                     "video tag.")
             self._player.search_videos_tag(command[1])
 
+        elif command[0].upper() == "SEARCH_REGEX":
+            if len(command) < 2:
+                raise CommandException(
+                    "Please enter SEARCH_REGEX command followed by a regular "
+                    "expression, e.g. ^how to .* (cat|dog).")
+            self._player.search_videos_regex(" ".join(command[1:]))
+
+        elif command[0].upper() == "QUERY":
+            if len(command) < 2:
+                raise CommandException(
+                    "Please enter QUERY command followed by a query, e.g. "
+                    "title:cat AND tag:#animal AND NOT flagged.")
+            self._player.query_videos(" ".join(command[1:]))
+
+        elif command[0].upper() == "RECOMMEND":
+            if len(command) not in (2, 3) or \
+                    (len(command) == 3 and not command[2].isdigit()):
+                raise CommandException(
+                    "Please enter RECOMMEND command followed by a video_id "
+                    "and an optional number of videos.")
+            self._player.recommend(command[1], *map(int, command[2:]))
+
+        elif command[0].upper() == "PLAY_SIMILAR":
+            self._player.play_similar()
+
+        elif command[0].upper() in ("TOP_PLAYED", "TRENDING"):
+            if len(command) > 2 or \
+                    (len(command) == 2 and not command[1].isdigit()):
+                raise CommandException(
+                    f"Please enter {command[0].upper()} command followed by "
+                    "an optional number of videos.")
+            if command[0].upper() == "TOP_PLAYED":
+                self._player.show_top_played(*map(int, command[1:]))
+            else:
+                self._player.show_trending(*map(int, command[1:]))
+
+        elif command[0].upper() == "SIMILAR":
+            if len(command) not in (2, 3) or \
+                    (len(command) == 3 and not command[2].isdigit()):
+                raise CommandException(
+                    "Please enter SIMILAR command followed by a video_id "
+                    "and an optional number of videos.")
+            self._player.show_similar(command[1], *map(int, command[2:]))
+
+        elif command[0].upper() == "DUPLICATES":
+            if len(command) > 2:
+                raise CommandException(
+                    "Please enter DUPLICATES command followed by an optional "
+                    "similarity threshold between 0 and 1.")
+            try:
+                threshold = float(command[1]) if len(command) == 2 else 0.8
+            except ValueError:
+                threshold = -1
+            if not 0 <= threshold <= 1:
+                raise CommandException(
+                    "Please enter DUPLICATES command followed by an optional "
+                    "similarity threshold between 0 and 1.")
+            self._player.show_duplicates(threshold)
+
         elif command[0].upper() == "FLAG_VIDEO":
             if len(command) == 3:
                 self._player.flag_video(command[1], command[2])
@@ -127,10 +284,68 @@ class CommandParser:
                     "video_id.")
             self._player.allow_video(command[1])
 
+        elif command[0].upper() == "FLAG_VIDEOS":
+            arguments = command[1:]
+            flag_reason = ""
+            if arguments and arguments[-1].lower().startswith("reason="):
+                flag_reason = arguments.pop()[len("reason="):]
+            if not arguments:
+                raise CommandException(
+                    "Please enter FLAG_VIDEOS command followed by video_ids "
+                    "or @file and an optional reason=<flag_reason>.")
+            self._player.flag_videos(self._video_ids(arguments), flag_reason)
+
+        elif command[0].upper() == "ALLOW_VIDEOS":
+            if len(command) < 2:
+                raise CommandException(
+                    "Please enter ALLOW_VIDEOS command followed by video_ids "
+                    "or @file.")
+            self._player.allow_videos(self._video_ids(command[1:]))
+
+        elif command[0].upper() == "FLAG_HISTORY":
+            arguments = command[1:]
+            flag_reason = None
+            if arguments and arguments[-1].lower().startswith("reason="):
+                flag_reason = arguments.pop()[len("reason="):]
+            if len(arguments) > 2:
+                raise CommandException(
+                    "Please enter FLAG_HISTORY command followed by an "
+                    "optional start and end time, e.g. 2024-05-01T09:00, and "
+                    "an optional reason=<flag_reason>.")
+            self._player.show_flag_history(*self._history_times(arguments),
+                                           flag_reason)
+
+        elif command[0].upper() == "MEMORY":
+            if len(command) > 2 or len(command) == 2 and \
+                    command[1].upper() not in ("TRACE", "BASELINE", "STOP"):
+                raise CommandException(
+                    "Please enter MEMORY command followed by an optional "
+                    "TRACE, BASELINE or STOP.")
+            self._player.show_memory(*command[1:])
+
+        elif command[0].upper() == "INDEX_STATUS":
+            self._player.show_index_status()
+
+        elif command[0].upper() == "OUTPUT":
+            if len(command) != 2:
+                raise CommandException(
+                    "Please enter OUTPUT command followed by TEXT or JSON.")
+            self._player.set_output(command[1])
+
+        elif command[0].upper() == "TIMEOUT":
+            if len(command) != 2:
+                raise CommandException(
+                    "Please enter TIMEOUT command followed by a timeout such "
+                    "as 200ms, 2s or OFF, and optionally a command to run "
+                    "with it.")
+            self.default_timeout = self._timeout(command[1])
+            self._player.output.message(
+                f"Default timeout: {format_timeout(self.default_timeout)}")
+
         elif command[0].upper() == "HELP":
             self._get_help()
         else:
-            print(
+            self._player.output.error(
                 "Please enter a valid command, type HELP for a list of "
                 "available commands.")
 
@@ -146,18 +361,39 @@ class CommandParser:
             PAUSE - Pause the current video.
             CONTINUE - Resume the current paused video.
             SHOW_PLAYING - Displays the title, url and paused status of the video that is currently playing (or paused).
+            POSITION - Displays how far into the current video playback is.
             CREATE_PLAYLIST <playlist_name> - Creates a new (empty) playlist with the provided name.
             ADD_TO_PLAYLIST <playlist_name> <video_id> - Adds the requested video to the playlist.
             REMOVE_FROM_PLAYLIST <playlist_name> <video_id> - Removes the specified video from the specified playlist
+            ADD_TO_PLAYLIST_BULK <playlist_name> <video_id|@file> ... - Adds many videos to the playlist, listing only the ones that failed.
+            REMOVE_FROM_PLAYLIST_BULK <playlist_name> <video_id|@file> ... - Removes many videos from the playlist, listing only the ones that failed.
+            PLAYLIST_UNION <new_playlist> <playlist> <playlist> ... - Creates a playlist of the videos in any of the playlists, in order of first appearance.
+            PLAYLIST_INTERSECT <new_playlist> <playlist> <playlist> ... - Creates a playlist of the videos in all of the playlists, in the order of the first.
+            PLAYLIST_DIFF <new_playlist> <playlist> <playlist> ... - Creates a playlist of the videos in the first playlist but not the others.
             CLEAR_PLAYLIST <playlist_name> - Removes all the videos from the playlist.
             DELETE_PLAYLIST <playlist_name> - Deletes the playlist.
-            SHOW_PLAYLIST <playlist_name> - List all the videos in this playlist.
+            SHOW_PLAYLIST <playlist_name> [start] [count] - List all the videos in this playlist, or count videos from position start.
             SHOW_ALL_PLAYLISTS - Display all the available playlists.
             SEARCH_VIDEOS <search_term> - Display all the videos whose titles contain the search_term.
             SEARCH_VIDEOS_WITH_TAG <tag_name> -Display all videos whose tags contains the provided tag.
+            SEARCH_REGEX <pattern> - Display all the videos whose titles match the regular expression, ignoring case.
+            QUERY <query> - Display all videos matching a query of title:, tag:, id: terms and FLAGGED combined with AND, OR, NOT and brackets.
+            RECOMMEND <video_id> [count] - Display the unflagged videos most related to a video by its tags.
+            PLAY_SIMILAR - Plays the unflagged video most related to the current video.
+            TOP_PLAYED [count] - Display the unflagged videos played the most times.
+            TRENDING [count] - Display the unflagged videos played the most, favouring recent plays.
+            SIMILAR <video_id> [count] - Display the unflagged videos with the most similar title and tags.
+            DUPLICATES [threshold] - Display pairs of videos that are likely near-duplicates.
             FLAG_VIDEO <video_id> <flag_reason> - Mark a video as flagged.
             ALLOW_VIDEO <video_id> - Removes a flag from a video.
+            FLAG_VIDEOS <video_id|@file> ... [reason=<flag_reason>] - Mark many videos as flagged, listing only the ones that failed.
+            ALLOW_VIDEOS <video_id|@file> ... - Removes the flags from many videos, listing only the ones that failed.
+            FLAG_HISTORY [start] [end] [reason=<flag_reason>] - Display the videos flagged and allowed between two times, e.g. 2024-05-01T09:00, and counts by reason.
+            MEMORY [TRACE|BASELINE|STOP] - Shows memory used by videos, tags, playlists, flags and indexes.
+            INDEX_STATUS - Shows which search and recommendation indexes are built and how long they took.
+            OUTPUT <TEXT|JSON> - Prints results as text, or as one JSON object per line for scripts.
+            TIMEOUT <timeout|OFF> [command] - Runs the command with a time limit such as 200ms or 2s, or sets the limit for every command. Listings that run out of time are truncated.
             HELP - Displays help.
             EXIT - Terminates the program execution.
         """)
-        print(help_text)
+        self._player.output.message(help_text)
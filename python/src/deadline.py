@@ -0,0 +1,129 @@
+"""Deadlines that long running player commands check as they go."""
+
+import contextlib
+import contextvars
+import re
+import time
+
+_TIMEOUT = re.compile(r"(\d+(?:\.\d*)?|\.\d+)(ms|s|m)?", re.IGNORECASE)
+
+_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60}
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+
+def parse_timeout(text):
+    """Returns the seconds in a timeout such as 200ms, 1.5s, 2m or 3.
+
+    OFF means no timeout and gives None.
+
+    Raises:
+        ValueError: If text is not a positive timeout or OFF.
+    """
+    if text.upper() == "OFF":
+        return None
+    match = _TIMEOUT.fullmatch(text)
+    if match is None or float(match.group(1)) <= 0:
+        raise ValueError(f"Invalid timeout {text}")
+    return float(match.group(1)) * _UNIT_SECONDS[(match.group(2) or "s")
+                                                 .lower()]
+
+
+def format_timeout(seconds):
+    """Formats a timeout as parse_timeout reads it, e.g. 200ms or 2s."""
+    if seconds is None:
+        return "OFF"
+    if seconds < 1:
+        return f"{seconds * 1000:g}ms"
+    return f"{seconds:g}s"
+
+
+class Deadline:
+    """A class used to tell a running command when to give up.
+
+    Used as a context manager, a deadline becomes the current one for the
+    thread running the command, so the player's loops find it through
+    current_deadline() without it being passed down. The loops check
+    expired between items and stop with what they have so far; nothing is
+    interrupted mid item. A deadline expires when its time is up or when it
+    is cancelled, e.g. by Ctrl-C.
+    """
+
+    def __init__(self, seconds=None, clock=time.monotonic):
+        """
+        Args:
+            seconds: The time the command may take, None for no limit.
+            clock: Returns the current time in seconds.
+        """
+        self.seconds = seconds
+        self.cancelled = False
+        self._clock = clock
+        self._expires = None if seconds is None else clock() + seconds
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _current.reset(self._token)
+        self._token = None
+
+    def cancel(self):
+        """Makes the deadline expire now."""
+        self.cancelled = True
+
+    @property
+    def expired(self):
+        if self.cancelled:
+            return True
+        return self._expires is not None and self._clock() >= self._expires
+
+    def remaining(self):
+        """Returns the seconds left, or None if there is no limit."""
+        if self.cancelled:
+            return 0.0
+        if self._expires is None:
+            return None
+        return max(0.0, self._expires - self._clock())
+
+    def describe(self):
+        """Returns why the deadline expired, for a truncated listing."""
+        if self.cancelled:
+            return "cancelled"
+        return f"timed out after {format_timeout(self.seconds)}"
+
+
+# Never expires; current when no command has set a deadline
+_NO_DEADLINE = Deadline()
+
+
+def current_deadline():
+    """Returns the deadline of the command running on this thread."""
+    return _current.get() or _NO_DEADLINE
+
+
+@contextlib.contextmanager
+def suspended():
+    """Lifts the current deadline while a command waits, e.g. for an answer.
+
+    Ctrl-C then finds no command to cancel and interrupts the wait.
+    """
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def cancel_current():
+    """Cancels the deadline of the command running on this thread.
+
+    Returns:
+        False if no command is running or it was already cancelled.
+    """
+    deadline = _current.get()
+    if deadline is None or deadline.cancelled:
+        return False
+    deadline.cancel()
+    return True
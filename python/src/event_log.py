@@ -0,0 +1,161 @@
+"""An asynchronous, batched audit log of playback and flag events."""
+
+import os
+import queue
+import threading
+import time
+
+# The player events written to the audit log
+AUDITED_EVENTS = (
+    "play_video", "stop_video", "pause_video", "continue_video",
+    "flag_video", "allow_video",
+)
+
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+_STOP = object()
+
+
+class AsyncEventLog:
+    """A class used to write player events to a log file off the command path.
+
+    Recording an event only timestamps it and puts it on a bounded queue. A
+    background thread drains the queue in batches of up to batch_size
+    events, writes each batch with a single write and flushes the file once
+    batch_size events are pending or flush_interval seconds have passed. The
+    file is rotated to path.1, path.2, ... once it reaches max_bytes. When
+    the queue is full the overflow policy decides what gives: "block" waits
+    for the writer, "drop_newest" discards the new event and "drop_oldest"
+    discards the oldest queued event. Dropped events are counted.
+
+    Each line is the tab separated time, event name and arguments.
+    """
+
+    def __init__(self, path, max_queue=10000, batch_size=256,
+                 flush_interval=1.0, max_bytes=10 * 1024 * 1024, backups=5,
+                 overflow="drop_oldest"):
+        """
+        Args:
+            path: The log file, appended to if it exists.
+            max_queue: How many events may wait for the writer.
+            batch_size: The most events written at once.
+            flush_interval: The most seconds an event waits to be flushed.
+            max_bytes: The size at which the log file is rotated.
+            backups: How many rotated files are kept.
+            overflow: What to do when the queue is full, one of
+                OVERFLOW_POLICIES.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self.path = str(path)
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(max_queue)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._overflow = overflow
+        self._player = None
+        self._file = open(self.path, "ab")
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="event-log-writer")
+        self._thread.start()
+
+    def attach(self, player):
+        """Logs the audited events of a player from now on."""
+        self._player = player
+        player.listeners.append(self.record)
+
+    def record(self, method_name, *args):
+        """Queues an event for the writer; never touches the disk."""
+        if method_name not in AUDITED_EVENTS:
+            return
+        event = (time.time(), method_name, args)
+        if self._overflow == "block":
+            self._queue.put(event)
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            if self._overflow == "drop_oldest":
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(event)
+                except queue.Full:
+                    pass
+            self.dropped += 1
+
+    @staticmethod
+    def _format(event):
+        timestamp, method_name, args = event
+        return "\t".join((f"{timestamp:.6f}", method_name) + args) + "\n"
+
+    def _rotate(self):
+        self._file.close()
+        for number in range(self._backups - 1, 0, -1):
+            source = f"{self.path}.{number}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{number + 1}")
+        if self._backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+
+    def _write(self, batch):
+        data = "".join(self._format(event) for event in batch).encode("utf-8")
+        if self._file.tell() and self._file.tell() + len(data) > \
+                self._max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self.written += len(batch)
+
+    def _run(self):
+        pending = 0
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            timeout = max(0.0, last_flush + self._flush_interval -
+                          time.monotonic()) if pending else None
+            batch = []
+            try:
+                event = self._queue.get(timeout=timeout)
+                while True:
+                    if event is _STOP:
+                        stopping = True
+                        break
+                    batch.append(event)
+                    if len(batch) == self._batch_size:
+                        break
+                    event = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+                pending += len(batch)
+            if pending and (stopping or pending >= self._batch_size or
+                            time.monotonic() - last_flush >=
+                            self._flush_interval):
+                self._file.flush()
+                pending = 0
+                last_flush = time.monotonic()
+
+    def close(self):
+        """Stops logging, writes every queued event and closes the file.
+
+        The file is closed even when the writer has already stopped, e.g.
+        on a failed write.
+        """
+        try:
+            if self._player is not None:
+                self._player.listeners.remove(self.record)
+                self._player = None
+            if self._thread.is_alive():
+                self._queue.put(_STOP)
+                self._thread.join()
+        finally:
+            self._file.close()
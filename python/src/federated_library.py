@@ -0,0 +1,134 @@
+"""A video library made of several mounted catalogs."""
+
+import heapq
+import itertools
+from collections.abc import Mapping
+
+
+def _title(video):
+    return video.title
+
+
+def _without(videos, hidden):
+    return (video for video in videos if video.video_id not in hidden)
+
+
+class _FederatedVideos(Mapping):
+    """A class used to view every mounted catalog as one video_id mapping."""
+
+    def __init__(self, library):
+        self._library = library
+
+    def __getitem__(self, video_id):
+        for source in self._library.sources:
+            video = source.get_video(video_id)
+            if video is not None:
+                return video
+        raise KeyError(video_id)
+
+    def __contains__(self, video_id):
+        return any(video_id in source.videos
+                   for source in self._library.sources)
+
+    def __iter__(self):
+        return (video.video_id for video in self._library.iter_videos())
+
+    def __len__(self):
+        return self._library.video_count
+
+    @property
+    def scans_catalog(self):
+        return all(getattr(source.videos, "scans_catalog", False)
+                   for source in self._library.sources)
+
+
+class FederatedLibrary:
+    """A class used to represent a Video Library spread over several catalogs.
+
+    Each mounted source is a VideoLibrary with its own storage. When two
+    sources hold the same video_id, the source mounted first wins and the
+    later copy is hidden everywhere. Sources are only ever appended, so
+    mounting a catalog costs loading it plus one lookup per video to find
+    the ids it shares with earlier sources; nothing already mounted is
+    touched.
+
+    Listings are lazy: videos_by_title merges the sources' own title order
+    with heapq.merge, and searches go to every source and are chained in
+    mount order, so nothing is concatenated and re-sorted.
+    """
+
+    def __init__(self, sources=()):
+        """
+        Args:
+            sources: VideoLibrary objects, highest precedence first.
+        """
+        self.sources = []
+        self._hidden = []
+        self.video_count = 0
+        self._videos = _FederatedVideos(self)
+        for source in sources:
+            self.mount(source)
+
+    def mount(self, source):
+        """Adds a catalog below every source mounted so far.
+
+        Returns:
+            The ids of the source hidden by earlier sources.
+        """
+        hidden = {video_id for video_id in source.videos
+                  if any(video_id in earlier.videos
+                         for earlier in self.sources)}
+        self.sources.append(source)
+        self._hidden.append(hidden)
+        self.video_count += len(source.videos) - len(hidden)
+        return hidden
+
+    @property
+    def paths(self):
+        """Returns the catalog file of every source, in mount order."""
+        return [source.path for source in self.sources]
+
+    @property
+    def import_stats(self):
+        """Returns the import stats of every source, in mount order."""
+        return [source.import_stats for source in self.sources]
+
+    def _visible(self, videos_per_source):
+        for videos, hidden in zip(videos_per_source, self._hidden):
+            yield _without(videos, hidden) if hidden else videos
+
+    def iter_videos(self):
+        """Yields every visible video, source by source."""
+        return itertools.chain.from_iterable(self._visible(
+            source.get_all_videos() for source in self.sources))
+
+    def get_all_videos(self):
+        """Returns all visible videos, source by source."""
+        return list(self.iter_videos())
+
+    def videos_by_title(self):
+        """Yields every visible video in title order, merged lazily."""
+        return heapq.merge(*self._visible(
+            source.videos_by_title() for source in self.sources), key=_title)
+
+    def get_video(self, video_id):
+        """Returns the video from the first source holding video_id, or None
+        if no source does."""
+        return self._videos.get(video_id)
+
+    def search_titles(self, search_term):
+        """Returns the videos whose titles contain search_term from every
+        source, source by source."""
+        return list(itertools.chain.from_iterable(self._visible(
+            source.search_titles(search_term) for source in self.sources)))
+
+    def search_tag(self, video_tag):
+        """Returns the videos tagged with video_tag from every source, source
+        by source."""
+        return list(itertools.chain.from_iterable(self._visible(
+            source.search_tag(video_tag) for source in self.sources)))
+
+    @property
+    def videos(self):
+        """Returns a mapping of video_id to Video over every source."""
+        return self._videos
@@ -0,0 +1,144 @@
+"""An append-only history of flagged and allowed videos."""
+
+import bisect
+import heapq
+import time
+from collections import namedtuple
+
+FLAG = "flag"
+ALLOW = "allow"
+
+FlagEvent = namedtuple("FlagEvent", "time action video_id reason")
+
+
+class FlagHistory:
+    """A class used to answer when videos were flagged, and why.
+
+    Every flag and allow is appended as one event; nothing is ever removed
+    or changed. Events are stored as parallel lists in time order, so the
+    events between two times are the slice found by bisecting the times.
+    For each action, and for each action and reason, the positions of its
+    events are kept in their own lists, which are sorted because events
+    are only appended. Counting a range is therefore two bisects of the
+    right list, and listing it costs the bisects plus the events returned,
+    however long the history grows.
+
+    An allow event carries the reason of the flag it removed, which may
+    predate the history.
+    """
+
+    def __init__(self, clock=time.time):
+        """
+        Args:
+            clock: Returns the current time in seconds since the epoch.
+        """
+        self._clock = clock
+        self._times = []
+        self._actions = []
+        self._video_ids = []
+        self._reasons = []
+        self._by_action = {FLAG: [], ALLOW: []}
+        self._by_reason = {}
+        # The reason of every video flagged now, for its allow event
+        self._open = {}
+
+    def __len__(self):
+        return len(self._times)
+
+    def record(self, action, video_id, reason=None):
+        """Appends an event stamped with the current time.
+
+        Args:
+            action: FLAG or ALLOW.
+            video_id: The video flagged or allowed.
+            reason: The flag reason; for ALLOW, the reason of the flag
+                removed. Defaults to the reason recorded when the video
+                was flagged.
+        """
+        now = self._clock()
+        # A wall clock can step back; the times must stay sorted
+        if self._times and now < self._times[-1]:
+            now = self._times[-1]
+        if action == FLAG:
+            self._open[video_id] = reason
+        else:
+            recorded = self._open.pop(video_id, None)
+            if reason is None:
+                reason = recorded
+        position = len(self._times)
+        self._times.append(now)
+        self._actions.append(action)
+        self._video_ids.append(video_id)
+        self._reasons.append(reason)
+        self._by_action[action].append(position)
+        self._by_reason.setdefault((action, reason), []).append(position)
+
+    def _span(self, start, end):
+        """Returns the positions [low, high) of the events from start to
+        end inclusive; None means unbounded."""
+        low = 0 if start is None else bisect.bisect_left(self._times, start)
+        high = len(self._times) if end is None else \
+            bisect.bisect_right(self._times, end)
+        return low, high
+
+    def _position_lists(self, action, reason):
+        """Returns the position lists holding the matching events, or None
+        when every event matches."""
+        actions = (FLAG, ALLOW) if action is None else (action,)
+        if reason is not None:
+            return [self._by_reason.get((action, reason), [])
+                    for action in actions]
+        if action is not None:
+            return [self._by_action[action]]
+        return None
+
+    def count(self, start=None, end=None, action=None, reason=None):
+        """Returns the number of events from start to end inclusive.
+
+        Args:
+            start: The earliest time, None for the beginning.
+            end: The latest time, None for now.
+            action: Only count FLAG or ALLOW events.
+            reason: Only count events with this reason.
+        """
+        low, high = self._span(start, end)
+        position_lists = self._position_lists(action, reason)
+        if position_lists is None:
+            return max(0, high - low)
+        return sum(max(0, bisect.bisect_left(positions, high) -
+                       bisect.bisect_left(positions, low))
+                   for positions in position_lists)
+
+    def events(self, start=None, end=None, action=None, reason=None):
+        """Returns the FlagEvents from start to end inclusive, oldest first.
+
+        Takes the same arguments as count.
+        """
+        low, high = self._span(start, end)
+        position_lists = self._position_lists(action, reason)
+        if position_lists is None:
+            selected = range(low, high)
+        else:
+            selected = heapq.merge(*(
+                positions[bisect.bisect_left(positions, low):
+                          bisect.bisect_left(positions, high)]
+                for positions in position_lists))
+        return [FlagEvent(self._times[position], self._actions[position],
+                          self._video_ids[position], self._reasons[position])
+                for position in selected]
+
+    def count_by_reason(self, start=None, end=None, action=FLAG):
+        """Returns {reason: count} of the events from start to end inclusive.
+
+        Costs two bisects per distinct reason, not a pass over the events.
+        """
+        low, high = self._span(start, end)
+        counts = {}
+        for (event_action, reason), positions in self._by_reason.items():
+            if event_action != action:
+                continue
+            count = bisect.bisect_left(positions, high) - \
+                bisect.bisect_left(positions, low)
+            if count > 0:
+                counts[reason] = count
+        return counts
@@ -0,0 +1,113 @@
+"""Builds a player's indexes on a background thread."""
+
+import functools
+import threading
+import time
+
+PENDING = "pending"
+BUILDING = "building"
+READY = "ready"
+FAILED = "failed"
+
+
+class IndexBuilder:
+    """A class used to build a player's indexes without holding up commands.
+
+    The indexes are built one after another on a daemon thread, through the
+    player's index cache when it has one. The library is read once, by the
+    first build that needs it, and the list is shared by the others and
+    dropped once the last is done. Each build counts the videos it has
+    taken from the list, which status reports as its progress. Each
+    finished index is published into player.indexes with a single dict
+    assignment, which is atomic, so a command sees either no index or a
+    complete one. No player lock is taken: a command holding the read side
+    may be waiting for this very build. Until then searches scan the
+    library as before, and commands that need an index wait for the build
+    already under way instead of starting a second one.
+    """
+
+    def __init__(self, player, names):
+        """
+        Args:
+            player: The VideoPlayer whose indexes are built.
+            names: The index names to build, in order.
+        """
+        self._player = player
+        self._names = tuple(names)
+        self._states = {name: PENDING for name in self._names}
+        self._started = {}
+        self._finished = {}
+        self._errors = {}
+        self._indexed = {}
+        self._videos = None
+        self._done = {name: threading.Event() for name in self._names}
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="index-builder")
+
+    def start(self):
+        """Starts building in the background."""
+        self._thread.start()
+
+    def _all_videos(self):
+        if self._videos is None:
+            self._videos = self._player.video_library.get_all_videos()
+        return self._videos
+
+    def _counted(self, name, videos):
+        """Yields the videos, counting those taken into the build's
+        progress."""
+        for indexed, video in enumerate(videos, 1):
+            self._indexed[name] = indexed
+            yield video
+
+    def _run(self):
+        for name in self._names:
+            if name in self._player.indexes:
+                self._states[name] = READY
+                self._done[name].set()
+                continue
+            self._started[name] = time.perf_counter()
+            self._states[name] = BUILDING
+            try:
+                self._player.indexes[name] = self._player._build_index(
+                    name, self._all_videos,
+                    functools.partial(self._counted, name))
+                self._states[name] = READY
+            except Exception as e:
+                self._errors[name] = e
+                self._states[name] = FAILED
+            self._finished[name] = time.perf_counter()
+            self._done[name].set()
+        self._videos = None
+
+    def wait(self, name, timeout=None):
+        """Waits until an index has been built or has failed.
+
+        Returns:
+            True once the build is over, False on timeout.
+        """
+        event = self._done.get(name)
+        return event is None or event.wait(timeout)
+
+    def status(self):
+        """Returns (name, state, seconds, error, indexed, total) for every
+        index.
+
+        seconds is the build time of a finished index, the time so far of
+        the one building and None for a pending one. indexed is how many of
+        the library's total videos a build has taken so far; total is None
+        until the library has been read.
+        """
+        now = time.perf_counter()
+        videos = self._videos
+        total = None if videos is None else len(videos)
+        report = []
+        for name in self._names:
+            started = self._started.get(name)
+            seconds = None
+            if started is not None:
+                seconds = self._finished.get(name, now) - started
+            report.append((name, self._states[name], seconds,
+                           self._errors.get(name),
+                           self._indexed.get(name, 0), total))
+        return report
@@ -0,0 +1,165 @@
+"""An on-disk cache of indexes built over a catalog."""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+from video import Video
+
+# Bump whenever an index class changes how it stores its data, so caches
+# written by older code are rebuilt instead of loaded
+INDEX_FORMAT_VERSION = 3
+
+_CHUNK_SIZE = 1 << 20
+
+
+def catalog_fingerprint(*paths):
+    """Returns a hex digest of catalog files' sizes, mtimes and contents."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{stat.st_size}:{stat.st_mtime_ns}:".encode("ascii"))
+        with open(path, "rb") as catalog_file:
+            for chunk in iter(lambda: catalog_file.read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def catalog_key(*paths):
+    """Returns a short hex digest naming catalog files by where they are,
+    whatever they hold."""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        digest.update(os.fsencode(os.path.abspath(path)) + b"\0")
+    return digest.hexdigest()
+
+
+class _VideoPickler(pickle.Pickler):
+    """Pickles the library's videos as their positions in it."""
+
+    def __init__(self, file, rows):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self._rows = rows
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Video):
+            return self._rows.get(obj)
+        return None
+
+
+class _VideoUnpickler(pickle.Unpickler):
+    """Unpickles video positions as the library's own Video objects."""
+
+    def __init__(self, file, videos):
+        super().__init__(file)
+        self._videos = videos
+
+    def persistent_load(self, row):
+        try:
+            return self._videos[row]
+        except (IndexError, TypeError):
+            raise pickle.UnpicklingError(f"no video at row {row!r}")
+
+
+class IndexCache:
+    """A class used to keep pickled indexes for a library on disk.
+
+    Each index is stored as
+    <name>-<catalog key>-v<format version>-<fingerprint>.pickle, so an
+    edited catalog or a new index format simply misses the cache, and
+    replacing the entry of one catalog never touches another's in the same
+    directory. Videos are stored as their positions in the library and
+    loaded as the library's own Video objects, so a cached index does not
+    hold a second copy of the catalog. Files are written to a temporary
+    file in the cache directory and moved into place with os.replace,
+    which is atomic: a process starting alongside another either finds a
+    complete file or none, and if both build the same index the second
+    replace swaps one complete file for an identical one.
+    """
+
+    def __init__(self, directory, *catalog_paths):
+        """
+        Args:
+            directory: The cache directory, created if needed.
+            catalog_paths: The catalog files the indexes are built from, in
+                mount order.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.catalog_key = catalog_key(*catalog_paths)
+        self.fingerprint = catalog_fingerprint(*catalog_paths)
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, name):
+        """Returns the cache file of an index."""
+        return self.directory / (
+            f"{name}-{self.catalog_key}-v{INDEX_FORMAT_VERSION}-"
+            f"{self.fingerprint}.pickle")
+
+    def load(self, name, videos=()):
+        """Returns the cached index, or None if it is missing or unreadable.
+
+        Args:
+            name: The index name.
+            videos: The library's videos, in the order the index was
+                stored with.
+        """
+        try:
+            with open(self.path(name), "rb") as cache_file:
+                return _VideoUnpickler(cache_file, videos).load()
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+                ImportError):
+            return None
+
+    def store(self, name, index, videos=()):
+        """Atomically writes an index and removes stale copies of it made
+        for the same catalog.
+
+        Args:
+            name: The index name.
+            index: The index to store.
+            videos: The library's videos; those the index refers to are
+                stored as their positions in it.
+        """
+        path = self.path(name)
+        rows = {video: row for row, video in enumerate(videos)}
+        descriptor, temp_name = tempfile.mkstemp(
+            dir=self.directory, prefix=f".{name}-", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as temp_file:
+                _VideoPickler(temp_file, rows).dump(index)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_name, path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+        for stale in self.directory.glob(
+                f"{name}-{self.catalog_key}-v*.pickle"):
+            if stale != path:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+
+    def get(self, name, build, videos=None):
+        """Returns the cached index, building and storing it on a miss.
+
+        Args:
+            name: The index name, e.g. query.
+            build: Called with no arguments to build the index.
+            videos: Returns the library's videos, in catalog order. The
+                index refers to them by position in the cache file.
+        """
+        library = videos() if videos is not None else ()
+        index = self.load(name, library)
+        if index is not None:
+            self.hits += 1
+            return index
+        self.misses += 1
+        index = build()
+        self.store(name, index, library)
+        return index
@@ -0,0 +1,203 @@
+"""An end-to-end load generator replaying weighted command mixes.
+
+Usage:
+    python3 src/load_generator.py [--catalog PATH] [--profile NAME_OR_JSON]
+        [--players N] [--commands N] [--seed SEED] [--window SECONDS]
+        [--shared]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import quiet_player
+from command_parser import CommandException, CommandParser
+from thread_safe_player import ThreadSafeVideoPlayer
+from video_library import VideoLibrary
+from video_player import VideoPlayer
+
+# Relative command weights. Each profile is a dict of command name to weight.
+PROFILES = {
+    "browse": {
+        "PLAY": 30, "STOP": 10, "PAUSE": 8, "CONTINUE": 8, "SHOW_PLAYING": 10,
+        "SEARCH_VIDEOS": 15, "SEARCH_VIDEOS_WITH_TAG": 8, "SHOW_ALL_VIDEOS": 1,
+        "ADD_TO_PLAYLIST": 4, "REMOVE_FROM_PLAYLIST": 2, "SHOW_PLAYLIST": 3,
+        "FLAG_VIDEO": 0.5, "ALLOW_VIDEO": 0.5,
+    },
+    "curate": {
+        "PLAY": 5, "SEARCH_VIDEOS": 10, "SEARCH_VIDEOS_WITH_TAG": 10,
+        "CREATE_PLAYLIST": 2, "ADD_TO_PLAYLIST": 30, "REMOVE_FROM_PLAYLIST": 10,
+        "SHOW_PLAYLIST": 10, "CLEAR_PLAYLIST": 1, "SHOW_ALL_PLAYLISTS": 2,
+    },
+    "moderate": {
+        "PLAY": 10, "SEARCH_VIDEOS": 20, "SEARCH_VIDEOS_WITH_TAG": 20,
+        "FLAG_VIDEO": 20, "ALLOW_VIDEO": 15, "SHOW_ALL_VIDEOS": 1,
+    },
+}
+
+_SEARCH_TERMS = ("cat", "dog", "how", "music", "video", "best", "live")
+_PLAYLISTS = ("favourites", "watch_later", "music", "kids")
+
+
+def load_profile(profile):
+    """Returns a profile by name, or loads it from a JSON file path."""
+    if profile in PROFILES:
+        return PROFILES[profile]
+    with open(profile) as profile_file:
+        return json.load(profile_file)
+
+
+class CommandStream:
+    """A class used to generate a reproducible stream of commands."""
+
+    def __init__(self, video_ids, tags, profile, seed=0):
+        self._rng = random.Random(seed)
+        self._video_ids = video_ids
+        self._tags = tags or ["#cat"]
+        self._commands = list(profile)
+        self._cum_weights = []
+        total = 0
+        for command in self._commands:
+            total += profile[command]
+            self._cum_weights.append(total)
+
+    def _arguments(self, command):
+        rng = self._rng
+        if command in ("PLAY", "ALLOW_VIDEO"):
+            return [rng.choice(self._video_ids)]
+        if command == "FLAG_VIDEO":
+            return [rng.choice(self._video_ids), "load_test"]
+        if command == "SEARCH_VIDEOS":
+            return [rng.choice(_SEARCH_TERMS)]
+        if command == "SEARCH_VIDEOS_WITH_TAG":
+            return [rng.choice(self._tags)]
+        if command in ("CREATE_PLAYLIST", "SHOW_PLAYLIST", "CLEAR_PLAYLIST",
+                       "DELETE_PLAYLIST"):
+            return [rng.choice(_PLAYLISTS)]
+        if command in ("ADD_TO_PLAYLIST", "REMOVE_FROM_PLAYLIST"):
+            return [rng.choice(_PLAYLISTS), rng.choice(self._video_ids)]
+        return []
+
+    def take(self, count):
+        """Returns the next count commands as token lists."""
+        commands = self._rng.choices(
+            self._commands, cum_weights=self._cum_weights, k=count)
+        return [[command] + self._arguments(command) for command in commands]
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def summarize(samples, window):
+    """Groups (finish_time, latency) samples into time windows.
+
+    Returns:
+        A list of dicts with throughput and latency percentiles per window.
+    """
+    windows = {}
+    for finished, latency in samples:
+        windows.setdefault(int(finished // window), []).append(latency)
+    summary = []
+    for index in sorted(windows):
+        latencies = sorted(windows[index])
+        summary.append({
+            "window_start_s": index * window,
+            "commands": len(latencies),
+            "throughput_per_s": len(latencies) / window,
+            "p50_ms": _percentile(latencies, 0.50) * 1000,
+            "p95_ms": _percentile(latencies, 0.95) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000,
+            "max_ms": latencies[-1] * 1000,
+        })
+    return summary
+
+
+def _drive(parser, commands, started):
+    samples = []
+    errors = 0
+    for command in commands:
+        start = time.perf_counter()
+        try:
+            parser.execute_command(command)
+        except CommandException:
+            errors += 1
+        end = time.perf_counter()
+        samples.append((end - started, end - start))
+    return samples, errors
+
+
+def run_load(library, profile, players=1, commands=10_000, seed=0,
+             window=1.0, shared=False):
+    """Replays generated command streams through one parser per player.
+
+    Every player gets its own stream seeded from seed and its index, so the
+    same arguments always replay the same commands. With shared set, all
+    the streams drive a single ThreadSafeVideoPlayer instead of one
+    VideoPlayer each.
+
+    Returns:
+        A JSON serializable dict with totals and per-window statistics.
+    """
+    videos = library.get_all_videos()
+    video_ids = [video.video_id for video in videos]
+    tags = sorted({tag for video in videos for tag in video.tags})
+    streams = [CommandStream(video_ids, tags, profile, seed + index)
+               .take(commands) for index in range(players)]
+    if shared:
+        player = ThreadSafeVideoPlayer(library)
+        parsers = [CommandParser(player) for _ in range(players)]
+    else:
+        parsers = [CommandParser(VideoPlayer(library))
+                   for _ in range(players)]
+
+    with quiet_player(), ThreadPoolExecutor(max_workers=players) as pool:
+        started = time.perf_counter()
+        futures = [pool.submit(_drive, parser, stream, started)
+                   for parser, stream in zip(parsers, streams)]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+    samples = [sample for player_samples, _ in results
+               for sample in player_samples]
+    latencies = sorted(latency for _, latency in samples)
+    return {
+        "players": players,
+        "shared": shared,
+        "seed": seed,
+        "commands": len(samples),
+        "errors": sum(errors for _, errors in results),
+        "elapsed_s": elapsed,
+        "throughput_per_s": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "p999_ms": _percentile(latencies, 0.999) * 1000,
+        "windows": summarize(samples, window),
+    }
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--catalog", help="defaults to src/videos.txt")
+    arg_parser.add_argument("--profile", default="browse",
+                            help=f"one of {sorted(PROFILES)} or a JSON file")
+    arg_parser.add_argument("--players", type=int, default=1)
+    arg_parser.add_argument("--commands", type=int, default=10_000,
+                            help="commands per player")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--window", type=float, default=1.0)
+    arg_parser.add_argument("--shared", action="store_true",
+                            help="drive one thread-safe player from all "
+                                 "threads")
+    args = arg_parser.parse_args()
+
+    report = run_load(VideoLibrary(args.catalog), load_profile(args.profile),
+                      args.players, args.commands, args.seed, args.window,
+                      args.shared)
+    json.dump(report, sys.stdout, indent=2)
@@ -0,0 +1,149 @@
+"""Memory accounting helpers for the video player."""
+
+import sys
+import tracemalloc
+
+
+def deep_sizeof(obj, seen=None):
+    """Returns the size in bytes of an object and everything it references.
+
+    Args:
+        obj: The object to measure.
+        seen: Set of object ids already counted. Objects in it are skipped,
+            which lets several calls share one set without double counting.
+
+    Returns:
+        The total size in bytes.
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+
+        if isinstance(current, (str, bytes, bytearray, int, float, bool)):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        else:
+            if hasattr(current, "__dict__"):
+                stack.append(current.__dict__)
+            for cls in type(current).__mro__:
+                for slot in getattr(cls, "__slots__", ()):
+                    if hasattr(current, slot):
+                        stack.append(getattr(current, slot))
+    return size
+
+
+def _shallow(obj, seen):
+    """Counts only the object itself, marking it as seen."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    return sys.getsizeof(obj)
+
+
+def memory_report(player):
+    """Returns the deep memory usage of a player broken down by component.
+
+    Components are measured in a fixed order with a shared seen-set, so an
+    object shared between components (e.g. a Video inside a playlist) is
+    only counted once, under the first component that reaches it.
+
+    Args:
+        player: The VideoPlayer to measure.
+
+    Returns:
+        A dict mapping component name to size in bytes, plus a 'total' key.
+    """
+    seen = set()
+    videos = player.video_library.get_all_videos()
+    report = {}
+
+    report["videos"] = _shallow(player.video_library.videos, seen)
+    for video in videos:
+        report["videos"] += _shallow(video, seen)
+        if hasattr(video, "__dict__"):
+            report["videos"] += _shallow(video.__dict__, seen)
+
+    report["strings"] = 0
+    for video in videos:
+        report["strings"] += deep_sizeof(video.title, seen)
+        report["strings"] += deep_sizeof(video.video_id, seen)
+        report["strings"] += deep_sizeof(video.search_key, seen)
+        report["strings"] += deep_sizeof(video.display_line, seen)
+
+    report["tags"] = sum(deep_sizeof(video.tags, seen) for video in videos)
+    report["playlists"] = deep_sizeof(player.playlists, seen)
+    report["flags"] = deep_sizeof(player.flagged_videos, seen)
+    report["indexes"] = deep_sizeof(getattr(player, "indexes", {}), seen)
+    report["play_counts"] = deep_sizeof(getattr(player, "play_counts", None),
+                                        seen)
+    report["flag_history"] = deep_sizeof(
+        getattr(player, "flag_history", None), seen)
+    report["total"] = sum(report.values())
+    return report
+
+
+class MemoryTracker:
+    """A class used to take tracemalloc snapshots and compare them."""
+
+    def __init__(self, frames=1):
+        self._frames = frames
+        self.baseline = None
+
+    @property
+    def is_tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        """Starts tracing allocations if not already tracing."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+
+    def stop(self):
+        """Stops tracing and drops the baseline snapshot."""
+        tracemalloc.stop()
+        self.baseline = None
+
+    def snapshot(self):
+        """Returns a filtered snapshot of the current allocations."""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def set_baseline(self):
+        """Records the current allocations as the baseline to diff against."""
+        self.baseline = self.snapshot()
+
+    def top_allocations(self, limit=10):
+        """Returns the top allocation sites as (location, size, count).
+
+        When a baseline is set the sizes are the growth since the baseline.
+        """
+        current = self.snapshot()
+        if self.baseline is not None:
+            stats = current.compare_to(self.baseline, "lineno")
+            return [(str(stat.traceback), stat.size_diff, stat.count_diff)
+                    for stat in stats[:limit]]
+        stats = current.statistics("lineno")
+        return [(str(stat.traceback), stat.size, stat.count)
+                for stat in stats[:limit]]
+
+
+def format_size(size):
+    """Returns a human readable size string."""
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
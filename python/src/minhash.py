@@ -0,0 +1,193 @@
+"""A MinHash/LSH near-neighbour index over video titles and tags."""
+
+import random
+import zlib
+from array import array
+
+_MAX_HASH = (1 << 32) - 1
+_SHINGLE_SIZE = 3
+_GOLDEN = 0x9E3779B1
+
+
+def shingles(video):
+    """Returns the set of features of a video: title character 3-shingles
+    and its tags."""
+    title = " ".join(video.search_key.split())
+    features = {title[i:i + _SHINGLE_SIZE]
+                for i in range(max(1, len(title) - _SHINGLE_SIZE + 1))}
+    features.update("\0" + tag.lower() for tag in video.tags)
+    return features
+
+
+class MinHashIndex:
+    """A class used to find similar videos without comparing every pair.
+
+    Each video gets a MinHash signature of num_perm 32-bit values, all kept
+    in one flat array('I'). Signatures use one permutation hashing: every
+    feature is hashed once and the hash picks the signature slot it
+    competes for, so a signature costs one pass over the features instead
+    of one pass per slot. Empty slots are filled from the next non-empty
+    slot to the right. Signatures are split into bands and videos
+    sharing any band land in the same LSH bucket, so only bucket mates are
+    compared, which keeps similarity search and duplicate reports close to
+    linear in the catalog size.
+    """
+
+    def __init__(self, videos, num_perm=64, bands=16, seed=1):
+        """
+        Args:
+            videos: The videos to index.
+            num_perm: The signature length.
+            bands: How many LSH bands the signature is split into. More
+                bands find less similar pairs at the cost of more candidates.
+            seed: The seed for the hash permutations.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self._num_perm = num_perm
+        self._rows_per_band = num_perm // bands
+        self._seed = random.Random(seed).randrange(_MAX_HASH + 1)
+        self._videos = []
+        self._rows = {}
+        self.signatures = array("I")
+        self._buckets = [{} for _ in range(bands)]
+        self.add_videos(videos)
+
+    def _signature(self, features):
+        num_perm = self._num_perm
+        signature = [None] * num_perm
+        for feature in features:
+            data = feature.encode("utf-8")
+            slot = zlib.crc32(data) % num_perm
+            value = zlib.crc32(data, self._seed)
+            if signature[slot] is None or value < signature[slot]:
+                signature[slot] = value
+        if None in signature:
+            self._densify(signature)
+        return signature
+
+    @staticmethod
+    def _densify(signature):
+        """Fills empty slots from the next filled slot to the right, mixed
+        with the distance so the borrowed values stay distinct."""
+        num_perm = len(signature)
+        last = max((slot for slot, value in enumerate(signature)
+                    if value is not None), default=None)
+        if last is None:
+            signature[:] = [0] * num_perm
+            return
+        # Walk right to left from the last filled slot, once round, so each
+        # empty slot sees the nearest filled slot on its right
+        borrowed = signature[last]
+        distance = 0
+        for step in range(1, num_perm):
+            slot = (last - step) % num_perm
+            distance += 1
+            if signature[slot] is None:
+                signature[slot] = (borrowed ^ (distance * _GOLDEN)) & _MAX_HASH
+            else:
+                borrowed = signature[slot]
+                distance = 0
+
+    def add_videos(self, videos):
+        """Adds videos to the index."""
+        for video in videos:
+            if video.video_id in self._rows:
+                continue
+            row = len(self._videos)
+            self._videos.append(video)
+            self._rows[video.video_id] = row
+            signature = self._signature(shingles(video))
+            self.signatures.extend(signature)
+            for band, bucket in enumerate(self._buckets):
+                start = band * self._rows_per_band
+                key = tuple(signature[start:start + self._rows_per_band])
+                bucket.setdefault(key, []).append(row)
+
+    def _row_signature(self, row):
+        start = row * self._num_perm
+        return self.signatures[start:start + self._num_perm]
+
+    def similarity(self, first_row, second_row):
+        """Returns the estimated Jaccard similarity of two rows."""
+        # XOR the two signatures as one big int and count the zero lanes,
+        # which keeps the whole comparison in C
+        difference = int.from_bytes(
+            self._row_signature(first_row).tobytes(), "little") ^ \
+            int.from_bytes(self._row_signature(second_row).tobytes(), "little")
+        lanes = array("I", difference.to_bytes(self._num_perm * 4, "little"))
+        return lanes.count(0) / self._num_perm
+
+    def _candidates(self, row):
+        signature = self._row_signature(row)
+        candidates = set()
+        for band, bucket in enumerate(self._buckets):
+            start = band * self._rows_per_band
+            key = tuple(signature[start:start + self._rows_per_band])
+            candidates.update(bucket.get(key, ()))
+        candidates.discard(row)
+        return candidates
+
+    def similar(self, video_id, k=5, threshold=0.0, excluded=()):
+        """Returns up to k (video, similarity) pairs, most similar first.
+
+        Args:
+            video_id: The video to find similar videos for.
+            k: The maximum number of videos to return.
+            threshold: The minimum estimated similarity.
+            excluded: Video ids never to return, e.g. flagged videos.
+        """
+        row = self._rows.get(video_id)
+        if row is None:
+            return []
+        scored = []
+        for candidate in self._candidates(row):
+            video = self._videos[candidate]
+            if video.video_id in excluded:
+                continue
+            similarity = self.similarity(row, candidate)
+            if similarity >= threshold:
+                scored.append((-similarity, candidate))
+        scored.sort()
+        return [(self._videos[candidate], -negative)
+                for negative, candidate in scored[:k]]
+
+    def duplicates(self, threshold=0.8, window=4):
+        """Returns (video, video, similarity) for likely near-duplicates.
+
+        Videos with identical signatures are grouped first and reported
+        against the first video of their group. The remaining candidate
+        pairs come from shared LSH buckets and are kept when their
+        estimated similarity reaches threshold. Buckets larger than window
+        are sorted by signature and each row is only compared with its next
+        window neighbours, so a few huge buckets cannot make the report
+        quadratic. Pairs are returned most similar first.
+        """
+        groups = {}
+        for row in range(len(self._videos)):
+            groups.setdefault(self._row_signature(row).tobytes(), []).append(
+                row)
+        pairs = []
+        representatives = set()
+        for rows in groups.values():
+            representatives.add(rows[0])
+            pairs.extend((-1.0, rows[0], other) for other in rows[1:])
+
+        seen = set()
+        for bucket in self._buckets:
+            for rows in bucket.values():
+                rows = [row for row in rows if row in representatives]
+                if len(rows) > window:
+                    rows.sort(key=self._row_signature)
+                for i, first in enumerate(rows):
+                    for second in rows[i + 1:i + 1 + window]:
+                        pair = (min(first, second), max(first, second))
+                        if pair in seen:
+                            continue
+                        seen.add(pair)
+                        similarity = self.similarity(first, second)
+                        if similarity >= threshold:
+                            pairs.append((-similarity,) + pair)
+        pairs.sort()
+        return [(self._videos[first], self._videos[second], -negative)
+                for negative, first, second in pairs]
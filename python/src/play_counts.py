@@ -0,0 +1,145 @@
+"""Bounded memory play counting with all-time and trending top-k."""
+
+import time
+
+# Forward decay weights grow by 2 every half life; past this weight the
+# stored scores are scaled back down so they stay well inside float range
+_RESCALE_AT = 2.0 ** 32
+
+
+class SpaceSaving:
+    """A class used to keep approximate top-k counts in fixed memory.
+
+    At most capacity items are counted. When a new item arrives and the
+    table is full it takes over the smallest counter, inheriting its count
+    as the error bound, so any item counted more than total / capacity times
+    is always kept. Counters sit in a min-heap indexed by item, so an update
+    is one dict lookup and a sift bounded by log(capacity), whatever the
+    number of distinct items or updates.
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        Args:
+            capacity: The maximum number of items counted.
+        """
+        self.capacity = capacity
+        # Entries are [count, error, item]
+        self._heap = []
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _swap(self, i, j):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._positions[heap[i][2]] = i
+        self._positions[heap[j][2]] = j
+
+    def _sift_up(self, position):
+        heap = self._heap
+        while position:
+            parent = (position - 1) // 2
+            if heap[parent][0] <= heap[position][0]:
+                return
+            self._swap(parent, position)
+            position = parent
+
+    def _sift_down(self, position):
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = position
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < size and heap[child][0] < heap[smallest][0]:
+                    smallest = child
+            if smallest == position:
+                return
+            self._swap(position, smallest)
+            position = smallest
+
+    def add(self, item, weight=1):
+        """Counts weight more occurrences of item."""
+        position = self._positions.get(item)
+        if position is not None:
+            self._heap[position][0] += weight
+            self._sift_down(position)
+        elif len(self._heap) < self.capacity:
+            self._heap.append([weight, 0, item])
+            self._positions[item] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+        else:
+            smallest = self._heap[0]
+            del self._positions[smallest[2]]
+            self._heap[0] = [smallest[0] + weight, smallest[0], item]
+            self._positions[item] = 0
+            self._sift_down(0)
+
+    def scale(self, factor):
+        """Multiplies every count by factor, which keeps the heap order."""
+        for entry in self._heap:
+            entry[0] *= factor
+            entry[1] *= factor
+
+    def top(self, k=None):
+        """Returns up to k (item, count, error) tuples, highest count first.
+
+        count may overestimate the true count by at most error.
+        """
+        entries = sorted(self._heap, key=lambda entry: (-entry[0], entry[2]))
+        return [(item, count, error) for count, error, item in entries[:k]]
+
+
+class PlayCounter:
+    """A class used to count plays all time and with exponential decay.
+
+    Trending scores use forward decay: a play at time t adds
+    2 ** ((t - epoch) / half_life) instead of every older score being
+    decayed, so recording a play stays a single SpaceSaving update. Scores
+    are divided by the current weight when read, and rebased onto a new
+    epoch once the weights get large.
+    """
+
+    def __init__(self, capacity=1000, half_life=3600.0, clock=time.monotonic):
+        """
+        Args:
+            capacity: The maximum number of videos counted by each counter.
+            half_life: Seconds after which a play counts half as much
+                towards trending.
+            clock: Returns the current time in seconds.
+        """
+        self.plays = 0
+        self.total = SpaceSaving(capacity)
+        self.recent = SpaceSaving(capacity)
+        self._half_life = half_life
+        self._clock = clock
+        self._epoch = clock()
+
+    def _weight(self):
+        return 2.0 ** ((self._clock() - self._epoch) / self._half_life)
+
+    def record(self, video_id):
+        """Counts one play of a video."""
+        self.plays += 1
+        self.total.add(video_id)
+        weight = self._weight()
+        if weight > _RESCALE_AT:
+            self.recent.scale(1 / weight)
+            self._epoch = self._clock()
+            weight = 1.0
+        self.recent.add(video_id, weight)
+
+    def top_played(self, k=None):
+        """Returns up to k (video_id, plays) pairs, most played first."""
+        return [(video_id, count) for video_id, count, _ in self.total.top(k)]
+
+    def trending(self, k=None):
+        """Returns up to k (video_id, score) pairs, highest score first.
+
+        A score is the number of plays weighted by how recent they are, so a
+        play now scores 1 and a play one half life ago scores 0.5.
+        """
+        weight = self._weight()
+        return [(video_id, score / weight)
+                for video_id, score, _ in self.recent.top(k)]
@@ -0,0 +1,271 @@
+"""Simulated playback positions driven by a hierarchical timer wheel."""
+
+import functools
+import math
+import threading
+import time
+from collections import deque
+
+
+class _Timer:
+    """A class used to represent one scheduled callback."""
+
+    __slots__ = ("expires", "callback", "slot")
+
+    def __init__(self, expires, callback):
+        self.expires = expires
+        self.callback = callback
+        self.slot = None
+
+
+class TimerWheel:
+    """A class used to fire callbacks after a number of ticks.
+
+    Timers sit in a hierarchy of wheels of `slots` buckets each: level 0
+    holds timers due within the next `slots` ticks, level 1 those due within
+    the next `slots` ** 2 ticks, and so on. Scheduling and cancelling are a
+    dict insert or delete. Each tick fires one level 0 bucket, and whenever
+    a level wraps round the due bucket of the level above is cascaded down,
+    so a tick costs the same however many timers are pending and no timer
+    is ever polled before it is due. A wheel is not thread-safe on its own;
+    PlaybackClock locks it.
+    """
+
+    def __init__(self, slots=256, levels=4):
+        """
+        Args:
+            slots: The buckets per level.
+            levels: The number of levels. Timers further away than
+                slots ** levels ticks wait in the top level and are
+                cascaded again when their bucket comes round.
+        """
+        self.now = 0
+        self._slots = slots
+        self._levels = levels
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._pending = 0
+
+    def __len__(self):
+        return self._pending
+
+    def _place(self, timer):
+        level = 0
+        expires, now = timer.expires, self.now
+        # The lowest level whose bucket index is less than a whole turn away
+        while level < self._levels - 1 and expires - now >= self._slots:
+            expires //= self._slots
+            now //= self._slots
+            level += 1
+        bucket = self._wheels[level][expires % self._slots]
+        bucket[timer] = None
+        timer.slot = bucket
+
+    def schedule(self, ticks, callback):
+        """Calls callback() once ticks ticks have passed.
+
+        Returns:
+            A handle for cancel.
+        """
+        timer = _Timer(self.now + max(1, ticks), callback)
+        self._place(timer)
+        self._pending += 1
+        return timer
+
+    def cancel(self, timer):
+        """Stops a scheduled timer from firing, if it has not already."""
+        if timer.slot is not None:
+            del timer.slot[timer]
+            timer.slot = None
+            self._pending -= 1
+
+    def _cascade(self):
+        """Moves the timers of every higher level bucket that has come
+        due down towards level 0."""
+        position = self.now
+        for level in range(1, self._levels):
+            if position % self._slots:
+                return
+            position //= self._slots
+            bucket = self._wheels[level][position % self._slots]
+            if not bucket:
+                continue
+            timers = list(bucket)
+            bucket.clear()
+            for timer in timers:
+                self._place(timer)
+
+    def advance(self, ticks=1):
+        """Moves time on by ticks, firing every timer that comes due.
+
+        Returns:
+            The number of timers fired.
+        """
+        fired = 0
+        target = self.now + ticks
+        while self.now < target:
+            if not self._pending:
+                self.now = target
+                break
+            self.now += 1
+            self._cascade()
+            bucket = self._wheels[0][self.now % self._slots]
+            if not bucket:
+                continue
+            due = [timer for timer in bucket if timer.expires <= self.now]
+            for timer in due:
+                del bucket[timer]
+                timer.slot = None
+                self._pending -= 1
+            for timer in due:
+                timer.callback()
+            fired += len(due)
+        return fired
+
+
+class PlaybackClock:
+    """A class used to drive many playback sessions from one timer wheel.
+
+    Positions are derived from a monotonic clock, so nothing is updated
+    while a video plays. The end of each playing video is a timer on the
+    wheel; advance() moves the wheel up to the current time and fires the
+    videos that finished.
+
+    The wheel is locked, so players on different threads can share a clock.
+    Callbacks run on whichever thread advances it, with the lock held, so
+    they must be quick and must not call the clock or take other locks:
+    Playback's only queues the end for its own player to handle.
+    """
+
+    def __init__(self, tick=0.1, clock=time.monotonic):
+        """
+        Args:
+            tick: The timer resolution in seconds.
+            clock: Returns the current time in seconds.
+        """
+        self.tick = tick
+        self.clock = clock
+        self.wheel = TimerWheel()
+        self._start = clock()
+        self._lock = threading.Lock()
+
+    def _ticks(self):
+        return int((self.clock() - self._start) / self.tick)
+
+    def schedule(self, seconds, callback):
+        """Calls callback() once seconds have passed, on a later advance()."""
+        with self._lock:
+            self._advance()
+            return self.wheel.schedule(math.ceil(seconds / self.tick),
+                                       callback)
+
+    def cancel(self, timer):
+        with self._lock:
+            self.wheel.cancel(timer)
+
+    def _advance(self):
+        return self.wheel.advance(max(0, self._ticks() - self.wheel.now))
+
+    def advance(self):
+        """Fires every callback due by now.
+
+        Returns:
+            The number of callbacks fired.
+        """
+        with self._lock:
+            return self._advance()
+
+
+class Playback:
+    """A class used to track the position of the video a session plays.
+
+    The position is the time played before the last pause plus the time
+    since the last resume. While a video with a known duration plays, a
+    timer for its remaining time is on the clock's wheel; pausing or
+    stopping cancels it.
+
+    The clock may fire the timer from another session's thread, so firing
+    only queues it. The session's own poll(), under whatever lock guards
+    the session, ends the video, unless the timer was cancelled or
+    replaced in the meantime.
+    """
+
+    def __init__(self, clock, on_end):
+        """
+        Args:
+            clock: The PlaybackClock shared by the sessions.
+            on_end: Called with no arguments by poll() once a video has
+                played to the end.
+        """
+        self._clock = clock
+        self._on_end = on_end
+        self.duration = None
+        self._offset = 0.0
+        self._resumed_at = None
+        self._timer = None
+        # Numbers each timer, so poll() can tell the current one's
+        self._generation = 0
+        # The numbers of fired timers; appended to by any thread
+        self._fired = deque()
+
+    def _cancel(self):
+        if self._timer is not None:
+            self._clock.cancel(self._timer)
+            self._timer = None
+
+    def poll(self):
+        """Ends the video if its timer has fired, calling on_end."""
+        while self._fired:
+            generation = self._fired.popleft()
+            if self._timer is not None and generation == self._generation:
+                self._timer = None
+                self._offset = self.duration
+                self._resumed_at = None
+                self._on_end()
+
+    @property
+    def playing(self):
+        return self._resumed_at is not None
+
+    @property
+    def position(self):
+        """Returns the seconds played of the current video."""
+        position = self._offset
+        if self._resumed_at is not None:
+            position += self._clock.clock() - self._resumed_at
+        if self.duration is not None:
+            position = min(position, self.duration)
+        return position
+
+    def start(self, duration):
+        """Plays a new video from the start."""
+        self._cancel()
+        self.duration = duration
+        self._offset = 0.0
+        self._resumed_at = None
+        self.resume()
+
+    def pause(self):
+        """Freezes the position."""
+        if self._resumed_at is None:
+            return
+        self._offset = self.position
+        self._resumed_at = None
+        self._cancel()
+
+    def resume(self):
+        """Moves the position on from where it was frozen."""
+        if self._resumed_at is not None:
+            return
+        self._resumed_at = self._clock.clock()
+        if self.duration is not None:
+            self._generation += 1
+            self._timer = self._clock.schedule(
+                self.duration - self._offset,
+                functools.partial(self._fired.append, self._generation))
+
+    def stop(self):
+        """Forgets the current video."""
+        self._cancel()
+        self.duration = None
+        self._offset = 0.0
+        self._resumed_at = None
@@ -0,0 +1,276 @@
+"""An event-sourced store for video player state.
+
+Every state changing command is appended to a binary event log. Every
+snapshot_every events the whole state is written to a snapshot that
+records how far into the log it reaches, so recovery loads the snapshot
+and replays only the events after it, however long the log has grown.
+"""
+
+import base64
+import contextlib
+import io
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+
+from video_flags import Flagged
+
+# Event type codes, stored as one byte. The names are the VideoPlayer
+# methods that produced the events, and replaying an event calls them.
+EVENTS = (
+    "play_video", "stop_video", "pause_video", "continue_video",
+    "create_playlist", "add_to_playlist", "remove_from_playlist",
+    "clear_playlist", "delete_playlist", "flag_video", "allow_video",
+)
+_EVENT_CODES = {name: code for code, name in enumerate(EVENTS)}
+
+# Record header: payload length, event code, crc32 of the payload
+_HEADER = struct.Struct("<IBI")
+_FIELD_LENGTH = struct.Struct("<I")
+# Set in the event code of records whose field lengths take 4 bytes; logs
+# written before then have 2 byte ones, which limited a field to 64KB
+_WIDE_FIELDS = 0x80
+_NARROW_FIELD_LENGTH = struct.Struct("<H")
+
+LOG_NAME = "events.log"
+SNAPSHOT_NAME = "snapshot.json"
+
+
+def encode_event(method_name, *args):
+    """Returns the binary record for an event."""
+    payload = bytearray()
+    for arg in args:
+        data = arg.encode("utf-8")
+        payload += _FIELD_LENGTH.pack(len(data))
+        payload += data
+    return _HEADER.pack(len(payload), _EVENT_CODES[method_name] |
+                        _WIDE_FIELDS, zlib.crc32(payload)) + payload
+
+
+def _decode_payload(payload, field_length=_FIELD_LENGTH):
+    args = []
+    offset = 0
+    while offset < len(payload):
+        (length,) = field_length.unpack_from(payload, offset)
+        offset += field_length.size
+        args.append(payload[offset:offset + length].decode("utf-8"))
+        offset += length
+    return tuple(args)
+
+
+def read_events(path, offset=0):
+    """Yields (end_offset, method_name, args) for each event in a log.
+
+    Reading stops at the first incomplete or corrupt record, which is what
+    a crash in the middle of an append leaves behind.
+
+    Args:
+        path: The event log file.
+        offset: The byte offset to start reading from.
+    """
+    with open(path, "rb") as log_file:
+        log_file.seek(offset)
+        while True:
+            header = log_file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, code, crc = _HEADER.unpack(header)
+            field_length = _FIELD_LENGTH if code & _WIDE_FIELDS else \
+                _NARROW_FIELD_LENGTH
+            code &= ~_WIDE_FIELDS
+            payload = log_file.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc or \
+                    code >= len(EVENTS):
+                return
+            offset += _HEADER.size + length
+            yield offset, EVENTS[code], _decode_payload(payload,
+                                                        field_length)
+
+
+def replay(player, events):
+    """Applies (method_name, args) events to a player, discarding output.
+
+    Returns:
+        The number of events applied.
+    """
+    count = 0
+    # Tells the player these are not new plays, so they are not counted
+    # again
+    player.replaying = True
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for method_name, args in events:
+                getattr(player, method_name)(*args)
+                count += 1
+    finally:
+        player.replaying = False
+    return count
+
+
+def _encode_rows(data):
+    """Returns native row id bytes as base64 of little endian ones."""
+    if sys.byteorder == "big":
+        rows = array("I")
+        rows.frombytes(data)
+        rows.byteswap()
+        data = rows.tobytes()
+    return base64.b64encode(data).decode("ascii")
+
+
+def _decode_rows(text):
+    """Returns the array('I') of row ids encoded by _encode_rows."""
+    rows = array("I")
+    rows.frombytes(base64.b64decode(text))
+    if sys.byteorder == "big":
+        rows.byteswap()
+    return rows
+
+
+def snapshot_state(player):
+    """Returns the player state as a JSON serializable dict.
+
+    Playlists are written as their row ids, base64 encoded, with the video
+    id of every row once, so a snapshot costs 4 bytes per entry however
+    long the playlists are.
+    """
+    current = player.status_codes["current_video_id"]
+    rows = player.playlist_rows
+    return {
+        "current_video_id": current.video_id if current else "",
+        "is_playing": player.status_codes["is_playing"],
+        "is_paused": player.status_codes["is_paused"],
+        "rows": [rows.video(row).video_id for row in range(len(rows))],
+        "playlists": [
+            [playlist.name, _encode_rows(playlist.row_bytes())]
+            for playlist in player.playlists.values()],
+        "flags": [[video_id, flag.reason]
+                  for video_id, flag in player.flagged_videos.items()],
+    }
+
+
+def restore_state(player, state):
+    """Replaces the player state with a snapshot_state dict."""
+    library = player.video_library
+    current = library.get_video(state["current_video_id"])
+    player.status_codes["current_video_id"] = current or ""
+    player.status_codes["is_playing"] = state["is_playing"]
+    player.status_codes["is_paused"] = state["is_paused"]
+
+    for playlist in player.playlists.values():
+        playlist.close()
+    player.playlists.clear()
+    # The snapshot's row ids, numbered again by this player's rows; None
+    # for videos no longer in the library
+    rows = [player.playlist_rows.row(library.get_video(video_id))
+            if video_id in library.videos else None
+            for video_id in state.get("rows", ())]
+    for name, entries in state["playlists"]:
+        playlist = player._new_playlist(name)
+        if isinstance(entries, str):
+            playlist.set_rows(rows[row] for row in _decode_rows(entries)
+                              if rows[row] is not None)
+        else:
+            # Snapshots written before playlists were stored as row ids
+            playlist.videos = [library.get_video(video_id)
+                               for video_id in entries
+                               if video_id in library.videos]
+        player.playlists[name.lower()] = playlist
+
+    player.flagged_videos.clear()
+    for video_id, reason in state["flags"]:
+        flag = Flagged(video_id)
+        flag.reason = reason
+        player.flagged_videos[video_id] = flag
+
+
+class EventStore:
+    """A class used to persist player state as events plus snapshots."""
+
+    def __init__(self, directory, snapshot_every=1000):
+        """
+        Args:
+            directory: Where the event log and snapshot are kept.
+            snapshot_every: How many events are logged between snapshots.
+        """
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._snapshot_every = snapshot_every
+        self._player = None
+        self._log = None
+        self._since_snapshot = 0
+
+    @property
+    def log_path(self):
+        return self._directory / LOG_NAME
+
+    @property
+    def snapshot_path(self):
+        return self._directory / SNAPSHOT_NAME
+
+    def recover(self, player):
+        """Restores the latest snapshot into a player and replays the tail.
+
+        Returns:
+            The number of events replayed after the snapshot.
+        """
+        offset = 0
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path) as snapshot_file:
+                snapshot = json.load(snapshot_file)
+            restore_state(player, snapshot["state"])
+            offset = snapshot["log_offset"]
+        if not self.log_path.exists():
+            return 0
+
+        end = offset
+        events = []
+        for end, method_name, args in read_events(self.log_path, offset):
+            events.append((method_name, args))
+        replayed = replay(player, events)
+
+        # Drop a torn record left by a crash so new events follow the last
+        # good one
+        if end < self.log_path.stat().st_size:
+            with open(self.log_path, "r+b") as log_file:
+                log_file.truncate(end)
+        return replayed
+
+    def attach(self, player):
+        """Recovers a player's state, then logs every change it makes."""
+        self._since_snapshot = self.recover(player)
+        self._player = player
+        self._log = open(self.log_path, "ab")
+        player.listeners.append(self.record)
+
+    def record(self, method_name, *args):
+        """Appends an event to the log, snapshotting when one is due."""
+        self._log.write(encode_event(method_name, *args))
+        self._log.flush()
+        self._since_snapshot += 1
+        if self._since_snapshot >= self._snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        """Writes the full player state and the log offset it covers."""
+        snapshot = {"log_offset": self._log.tell(),
+                    "state": snapshot_state(self._player)}
+        temp_path = self.snapshot_path.with_suffix(".tmp")
+        with open(temp_path, "w") as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        self._since_snapshot = 0
+
+    def close(self):
+        """Stops logging and closes the log file."""
+        if self._player is not None:
+            self._player.listeners.remove(self.record)
+            self._player = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,103 @@
+"""Output formats for the video player."""
+
+import json
+import sys
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+class TextOutput:
+    """A class used to print player output as human readable text."""
+
+    name = "text"
+
+    def message(self, text):
+        """Writes a status message."""
+        print(text)
+
+    def error(self, text):
+        """Writes a message about a command that could not be run."""
+        print(text)
+
+    def truncated(self, text):
+        """Writes the marker that ends a listing cut short."""
+        print(text)
+
+    def video(self, video, line, flag_reason=None, number=None, score=None):
+        """Writes one video of a listing.
+
+        Args:
+            video: The Video listed.
+            line: The text line for the video, as it has always been printed.
+            flag_reason: The reason the video is flagged, None if it is not.
+            number: The position of the video in a numbered listing.
+            score: What a ranked listing ranks the video by, e.g. its
+                similarity or play count.
+        """
+        print(line)
+
+    def duplicate(self, first, second, similarity, line):
+        """Writes a pair of videos that are likely near-duplicates.
+
+        Args:
+            first: The first Video of the pair.
+            second: The second Video of the pair.
+            similarity: Their estimated similarity, between 0 and 1.
+            line: The text line for the pair.
+        """
+        print(line)
+
+
+class JsonOutput:
+    """A class used to print player output as newline delimited JSON.
+
+    Every status message and every listed video is written as one JSON
+    object on its own line the moment it is produced, so a consumer can
+    parse rows as they stream out of even the largest listing:
+
+        {"type":"message","text":"Here's a list of all available videos:"}
+        {"type":"video","video_id":"...","title":"...","tags":["#cat"],
+         "flag_reason":null}
+
+    Numbered and ranked listings add number and score fields to their video
+    records. A listing cut short by its deadline ends with a truncated
+    record.
+    """
+
+    name = "json"
+
+    def _write(self, record):
+        # Looked up per call so redirected stdout is honoured
+        sys.stdout.write(_ENCODER.encode(record))
+        sys.stdout.write("\n")
+
+    def message(self, text):
+        """Writes a status message."""
+        self._write({"type": "message", "text": text})
+
+    def error(self, text):
+        """Writes a message about a command that could not be run."""
+        self._write({"type": "error", "text": text})
+
+    def truncated(self, text):
+        """Writes the marker that ends a listing cut short."""
+        self._write({"type": "truncated", "text": text})
+
+    def video(self, video, line, flag_reason=None, number=None, score=None):
+        """Writes one video of a listing; see TextOutput.video."""
+        record = {"type": "video", "video_id": video.video_id,
+                  "title": video.title, "tags": video.tags,
+                  "flag_reason": flag_reason}
+        if number is not None:
+            record["number"] = number
+        if score is not None:
+            record["score"] = score
+        self._write(record)
+
+    def duplicate(self, first, second, similarity, line):
+        """Writes a likely duplicate pair; see TextOutput.duplicate."""
+        self._write({"type": "duplicate", "first": first.video_id,
+                     "second": second.video_id, "similarity": similarity})
+
+
+OUTPUT_MODES = {output.name: output for output in (TextOutput, JsonOutput)}
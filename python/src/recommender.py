@@ -0,0 +1,153 @@
+"""A tag co-occurrence recommender."""
+
+import heapq
+import math
+from collections import OrderedDict
+
+
+class TagRecommender:
+    """A class used to find videos related to a video by their tags.
+
+    The model is built once from the catalog: an IDF weight per tag, a
+    sparse tag co-occurrence table reduced to each tag's most related tags,
+    and a posting list per tag capped at the max_postings best videos. A
+    query only walks the capped postings of the source video's tags and
+    their related tags, so its cost does not grow with the catalog.
+    """
+
+    def __init__(self, videos, related_tags=3, max_postings=500,
+                 cache_size=1024):
+        """
+        Args:
+            videos: The videos to build the model from.
+            related_tags: How many co-occurring tags expand each tag.
+            max_postings: How many videos are kept per tag.
+            cache_size: How many tag sets keep their ranked candidates.
+        """
+        self._related_count = related_tags
+        self._max_postings = max_postings
+        self._cache_size = cache_size
+        self._default_limit = 32
+        self._videos = []
+        self._rows = {}
+        self._tag_counts = {}
+        self._co_counts = {}
+        self._postings = {}
+        self._cache = OrderedDict()
+        for video in videos:
+            self._add(video)
+        self._rebuild()
+
+    def _add(self, video):
+        row = len(self._videos)
+        self._videos.append(video)
+        self._rows[video.video_id] = row
+        tags = set(video.tags)
+        for tag in tags:
+            self._tag_counts[tag] = self._tag_counts.get(tag, 0) + 1
+            self._postings.setdefault(tag, []).append(row)
+            co_counts = self._co_counts.setdefault(tag, {})
+            for other in tags:
+                if other != tag:
+                    co_counts[other] = co_counts.get(other, 0) + 1
+
+    def _idf(self, tag):
+        return math.log((1 + len(self._videos)) /
+                        (1 + self._tag_counts.get(tag, 0))) + 1
+
+    def _static_score(self, row):
+        return sum(self._idf(tag) for tag in set(self._videos[row].tags))
+
+    def _rebuild_tag(self, tag):
+        """Recomputes the related tags and capped postings of one tag."""
+        counts = self._co_counts.get(tag, {})
+        own = self._tag_counts[tag]
+        self._related[tag] = heapq.nlargest(
+            self._related_count,
+            ((other, count / math.sqrt(own * self._tag_counts[other]))
+             for other, count in counts.items()),
+            key=lambda item: (item[1], item[0]))
+        self._postings[tag] = heapq.nsmallest(
+            self._max_postings, self._postings[tag],
+            key=lambda row: (-self._static_score(row), row))
+
+    def _rebuild(self):
+        self._related = {}
+        for tag in self._tag_counts:
+            self._rebuild_tag(tag)
+        self._cache.clear()
+
+    def add_video(self, video):
+        """Adds a video to the model, refreshing only the tags it touches.
+
+        IDF weights of other tags drift slightly as the catalog grows; they
+        are brought up to date on the next full rebuild.
+        """
+        if video.video_id in self._rows:
+            return
+        self._add(video)
+        touched = set(video.tags)
+        for tag in video.tags:
+            touched.update(self._co_counts.get(tag, ()))
+        for tag in touched:
+            self._rebuild_tag(tag)
+        self._cache.clear()
+
+    def _weights(self, tags):
+        """Returns the query weight of every tag relevant to a tag set."""
+        weights = {}
+        for tag in tags:
+            weights[tag] = weights.get(tag, 0) + self._idf(tag)
+            for other, similarity in self._related.get(tag, ()):
+                if other not in tags:
+                    weights[other] = weights.get(other, 0) + \
+                                     self._idf(other) * similarity
+        return weights
+
+    def _ranked(self, tags, limit):
+        """Returns the best limit (row, score) candidates for a tag set.
+
+        Results are cached per tag set; a cached list is reused whenever it
+        was computed with at least the requested limit.
+        """
+        key = frozenset(tags)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] >= limit:
+            self._cache.move_to_end(key)
+            return cached[1]
+        scores = {}
+        for tag, weight in self._weights(key).items():
+            for row in self._postings.get(tag, ()):
+                scores[row] = scores.get(row, 0) + weight
+        ranked = heapq.nsmallest(limit, scores.items(),
+                                 key=lambda item: (-item[1], item[0]))
+        self._cache[key] = (limit, ranked)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return ranked
+
+    def recommend(self, video_id, k=5, excluded=()):
+        """Returns up to k videos related to video_id, best first.
+
+        Args:
+            video_id: The video to find related videos for.
+            k: The maximum number of videos to return.
+            excluded: Video ids never to return, e.g. flagged videos.
+
+        Returns:
+            A list of Video objects, empty if video_id is unknown.
+        """
+        row = self._rows.get(video_id)
+        if row is None:
+            return []
+        # The source and every excluded video may sit among the candidates
+        limit = max(self._default_limit, k + 1 + len(excluded))
+        results = []
+        for candidate, _ in self._ranked(self._videos[row].tags, limit):
+            video = self._videos[candidate]
+            if candidate == row or video.video_id in excluded:
+                continue
+            results.append(video)
+            if len(results) == k:
+                break
+        return results
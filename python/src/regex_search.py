@@ -0,0 +1,214 @@
+"""Regular expression search over video titles."""
+
+import functools
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from video_query import iter_rows
+
+try:
+    import re._parser as sre_parse
+except ImportError:
+    # Before Python 3.11
+    import sre_parse
+
+# Titles checked between looks at the clock in a sequential scan
+_CHECK_EVERY = 1024
+
+# How often a parallel scan checks whether its command was cancelled
+_POLL_SECONDS = 0.05
+
+# Titles held by each worker process, set once when the pool starts
+_worker_titles = None
+
+
+@functools.lru_cache(maxsize=256)
+def compile_pattern(pattern):
+    """Returns the case insensitive compiled pattern, cached by text.
+
+    Raises:
+        re.error: If the pattern is not a valid regular expression.
+    """
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def required_literal(pattern):
+    """Returns the longest lower case text every match must contain.
+
+    Only literal runs at the top level of the pattern, or inside groups
+    without alternation, are considered, so the answer is conservative: an
+    empty string means nothing could be proven.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, RecursionError):
+        return ""
+    runs = [""]
+
+    def walk(items):
+        for op, argument in items:
+            if op is sre_parse.LITERAL:
+                runs[-1] += chr(argument)
+            elif op is sre_parse.SUBPATTERN and not argument[1] and \
+                    not argument[2]:
+                walk(argument[3])
+            else:
+                runs.append("")
+
+    walk(parsed)
+    return max(runs, key=len).lower()
+
+
+def _start_worker(titles):
+    global _worker_titles
+    _worker_titles = titles
+
+
+def _scan(pattern, rows, stop_at, titles=None, deadline=None):
+    """Returns (matching rows, whether every row was checked).
+
+    Stops at the monotonic time stop_at, or once deadline, the command's
+    Deadline, expires.
+    """
+    if titles is None:
+        titles = _worker_titles
+    search = compile_pattern(pattern).search
+    matches = []
+    for count, row in enumerate(rows):
+        if count % _CHECK_EVERY == 0 and (
+                time.monotonic() > stop_at or
+                deadline is not None and deadline.expired):
+            return matches, False
+        if search(titles[row]):
+            matches.append(row)
+    return matches, True
+
+
+class RegexSearcher:
+    """A class used to run regular expression searches over video titles.
+
+    A pattern's longest required literal prunes the titles first: through
+    the trigram bitmaps of the query index when one is given, otherwise by
+    a plain substring test, which is far cheaper than the regex. Small
+    candidate sets are scanned in this process, checking the time budget
+    and the command's deadline as they go. Large ones are split into chunks
+    scanned by a process pool that holds its own copy of the titles. A
+    chunk still running when the
+    budget is spent, or when the command is cancelled, has its pool shut
+    down and its workers killed, so even a pattern that backtracks for
+    minutes on a single title cannot hold up the caller.
+    """
+
+    def __init__(self, videos, parallel_threshold=200_000, workers=None,
+                 chunk_size=50_000):
+        """
+        Args:
+            videos: The videos to search, in catalog order.
+            parallel_threshold: The number of candidate titles from which
+                the scan is spread over a process pool.
+            workers: The pool size. Defaults to the number of CPUs.
+            chunk_size: The titles scanned per pool task.
+        """
+        self.videos = list(videos)
+        self._titles = [video.title for video in self.videos]
+        self._search_keys = [video.search_key for video in self.videos]
+        self._parallel_threshold = parallel_threshold
+        self._workers = workers or os.cpu_count()
+        self._chunk_size = chunk_size
+        self._pool = None
+
+    def _candidates(self, literal, index):
+        if not literal:
+            return range(len(self.videos))
+        if index is not None:
+            return list(iter_rows(index.title(literal)))
+        return [row for row, search_key in enumerate(self._search_keys)
+                if literal in search_key]
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self._workers, initializer=_start_worker,
+                initargs=(self._titles,))
+        return self._pool
+
+    def _kill_pool(self, futures):
+        pool, self._pool = self._pool, None
+        # shutdown(cancel_futures=True) needs Python 3.9
+        for future in futures:
+            future.cancel()
+        # The executor has no public way to stop a task that is running.
+        # Without _processes the workers are left to stop at their next
+        # look at the clock, which a runaway match may never reach.
+        processes = getattr(pool, "_processes", None) or {}
+        for process in list(processes.values()):
+            process.kill()
+        pool.shutdown(wait=False)
+
+    def _scan_parallel(self, pattern, rows, stop_at, deadline):
+        pool = self._get_pool()
+        futures = [pool.submit(_scan, pattern, rows[start:start +
+                                                    self._chunk_size],
+                               stop_at)
+                   for start in range(0, len(rows), self._chunk_size)]
+        # Workers stop on their own at stop_at between titles; the grace
+        # period only matters for a title that never finishes. A cancelled
+        # command cannot reach the workers, so it is checked here
+        grace_end = stop_at + 0.1
+        done, not_done = set(), set(futures)
+        while not_done:
+            remaining = grace_end - time.monotonic()
+            if remaining <= 0 or deadline is not None and deadline.cancelled:
+                break
+            finished, not_done = wait(not_done,
+                                      min(remaining, _POLL_SECONDS))
+            done |= finished
+        if not_done:
+            self._kill_pool(not_done)
+        matches = []
+        complete = not not_done
+        for future in futures:
+            if future in done:
+                chunk_matches, chunk_complete = future.result()
+                matches.extend(chunk_matches)
+                complete = complete and chunk_complete
+        return matches, complete
+
+    def search(self, pattern, budget=2.0, index=None, deadline=None):
+        """Returns the videos whose titles match pattern, in catalog order.
+
+        Args:
+            pattern: The regular expression, matched ignoring case anywhere
+                in the title.
+            budget: The most seconds to spend scanning.
+            index: An optional BitmapIndex over the same videos in the same
+                order, used to find the titles containing the required
+                literal.
+            deadline: The Deadline of the command searching, if any; the
+                scan also stops once it expires, e.g. when it is cancelled.
+
+        Returns:
+            A (videos, complete) tuple; complete is False when the budget
+            ran out before every candidate title was checked.
+
+        Raises:
+            re.error: If the pattern is not a valid regular expression.
+        """
+        compile_pattern(pattern)
+        stop_at = time.monotonic() + budget
+        rows = self._candidates(required_literal(pattern), index)
+        if len(rows) >= self._parallel_threshold and self._workers > 1:
+            matches, complete = self._scan_parallel(pattern, rows, stop_at,
+                                                    deadline)
+        else:
+            matches, complete = _scan(pattern, rows, stop_at, self._titles,
+                                      deadline)
+        return [self.videos[row] for row in matches], complete
+
+    def close(self):
+        """Stops the process pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
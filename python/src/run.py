@@ -1,20 +1,148 @@
 """A youtube terminal simulator."""
+import argparse
+import signal
+
+from video_library import VideoLibrary
+from federated_library import FederatedLibrary
 from video_player import VideoPlayer
+from video_storage import SqliteStorage
+from sharded_storage import ShardedStorage
+from catalog_import import READERS
+from player_events import EventStore
+from event_log import AsyncEventLog, OVERFLOW_POLICIES
+from player_output import OUTPUT_MODES
+from index_cache import IndexCache
+from deadline import cancel_current, parse_timeout
 from command_parser import CommandException
 from command_parser import CommandParser
 
+
+def _parse_args():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--catalog", action="append",
+        help="catalog file to load, defaults to src/videos.txt; may be .gz, "
+             ".bz2 or .xz compressed. Repeat to mount several catalogs; on "
+             "a duplicate video_id the catalog given first wins")
+    arg_parser.add_argument(
+        "--format", choices=sorted(READERS),
+        help="catalog format, detected from the file name by default")
+    storage_group = arg_parser.add_mutually_exclusive_group()
+    storage_group.add_argument(
+        "--sqlite", metavar="DB",
+        help="keep the catalog in this SQLite database instead of memory; "
+             "an existing database is reused without reading the catalog")
+    storage_group.add_argument(
+        "--shards", type=int, metavar="N",
+        help="partition the catalog across N worker processes")
+    arg_parser.add_argument(
+        "--state-dir", metavar="DIR",
+        help="log player state changes here and restore them on start")
+    arg_parser.add_argument(
+        "--event-log", metavar="FILE",
+        help="append play, stop, pause, continue and flag events to FILE "
+             "from a background thread")
+    arg_parser.add_argument(
+        "--event-log-overflow", choices=OVERFLOW_POLICIES,
+        default="drop_oldest",
+        help="what to do with events when the writer falls behind")
+    arg_parser.add_argument(
+        "--index-cache", metavar="DIR",
+        help="keep built search and recommendation indexes here, reused "
+             "while the catalog is unchanged")
+    arg_parser.add_argument(
+        "--output", choices=sorted(OUTPUT_MODES), default="text",
+        help="print results as text, or as one JSON object per line")
+    arg_parser.add_argument(
+        "--playlist-dir", metavar="DIR",
+        help="keep playlists of a million videos or more in memory-mapped "
+             "files here instead of memory")
+    arg_parser.add_argument(
+        "--timeout", type=parse_timeout, metavar="TIMEOUT",
+        help="stop listings that take longer than e.g. 200ms or 2s and show "
+             "what was found so far")
+    args = arg_parser.parse_args()
+    if args.catalog and len(args.catalog) > 1 and (args.sqlite or args.shards):
+        arg_parser.error("--sqlite and --shards take a single --catalog")
+    return args
+
+
+def _cancel_command(signum, frame):
+    """Ctrl-C stops the running command at its next check; pressed again,
+    or at the prompt, it interrupts whatever is waiting."""
+    if not cancel_current():
+        raise KeyboardInterrupt
+
+
 if __name__ == "__main__":
-    print("""Hello and welcome to YouTube, what would you like to do?
+    args = _parse_args()
+    storage = None
+    if args.sqlite:
+        storage = SqliteStorage(args.sqlite)
+    elif args.shards:
+        storage = ShardedStorage(args.shards)
+    if args.catalog and len(args.catalog) > 1:
+        library = FederatedLibrary(VideoLibrary(catalog, None, args.format)
+                                   for catalog in args.catalog)
+        catalog_paths = library.paths
+    else:
+        library = VideoLibrary(args.catalog and args.catalog[0], storage,
+                               args.format)
+        catalog_paths = [library.path]
+        if library.import_stats is None:
+            # A reused --sqlite database was not loaded from the catalog,
+            # so the indexes are built from, and keyed on, the database
+            catalog_paths = [args.sqlite]
+    video_player = VideoPlayer(library)
+    video_player.output = OUTPUT_MODES[args.output]()
+    video_player.playlist_spill_dir = args.playlist_dir
+    if args.index_cache:
+        video_player.index_cache = IndexCache(args.index_cache,
+                                              *catalog_paths)
+    # Searches scan an in-memory library until the indexes are ready
+    video_player.build_indexes_in_background()
+    video_player.output.message(
+        """Hello and welcome to YouTube, what would you like to do?
     Enter HELP for list of available commands or EXIT to terminate.""")
-    video_player = VideoPlayer()
-    parser = CommandParser(video_player)
-    while True:
-        command = input("YT> ")
-        if command.upper() == "EXIT":
-            break
-        try:
-            parser.execute_command(command.split())
-        except CommandException as e:
-            print(e)
-    print("YouTube has now terminated its execution. "
-          "Thank you and goodbye!")
+    event_store = None
+    if args.state_dir:
+        event_store = EventStore(args.state_dir)
+        event_store.attach(video_player)
+    event_log = None
+    if args.event_log:
+        event_log = AsyncEventLog(args.event_log,
+                                  overflow=args.event_log_overflow)
+        event_log.attach(video_player)
+    parser = CommandParser(video_player, args.timeout)
+    signal.signal(signal.SIGINT, _cancel_command)
+    try:
+        while True:
+            # A prompt would break up JSON output, so it is text only
+            try:
+                command = input("YT> " if video_player.output.name == "text"
+                                else "")
+            except KeyboardInterrupt:
+                # Ctrl-C discards the line being typed, as in a shell
+                if video_player.output.name == "text":
+                    print()
+                continue
+            except EOFError:
+                break
+            if command.upper() == "EXIT":
+                break
+            # Report videos that played to the end while waiting for input
+            video_player.advance_playback()
+            try:
+                parser.execute_command(command.split())
+            except CommandException as e:
+                video_player.output.error(str(e))
+            except KeyboardInterrupt:
+                video_player.output.error("Command cancelled")
+    finally:
+        # Queued audit events are written even if input ends abruptly
+        if event_log is not None:
+            event_log.close()
+        if event_store is not None:
+            event_store.close()
+    video_player.output.message("YouTube has now terminated its execution. "
+                                "Thank you and goodbye!")
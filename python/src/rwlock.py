@@ -0,0 +1,76 @@
+"""A reader/writer lock."""
+
+import contextlib
+import threading
+
+
+class ReadWriteLock:
+    """A class used to let many readers or one writer hold a lock.
+
+    Writers are preferred: once a writer is waiting, new readers wait too,
+    so a steady stream of reads cannot starve writes. The write side is
+    reentrant, and a thread holding it may also take the read side, so a
+    write method can call read or write methods of the same object. Taking
+    the write side while holding only the read side is not supported.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writers_waiting = 0
+        self._writer = None
+        self._write_depth = 0
+
+    def acquire_read(self):
+        with self._condition:
+            if self._writer == threading.get_ident():
+                self._write_depth += 1
+                return
+            while self._writer is not None or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            if self._writer == threading.get_ident():
+                self._write_depth -= 1
+                return
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        with self._condition:
+            me = threading.get_ident()
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            self._writers_waiting += 1
+            while self._writer is not None or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        with self._condition:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
@@ -0,0 +1,218 @@
+"""A video storage sharded across worker processes."""
+
+import heapq
+import multiprocessing
+import threading
+import weakref
+import zlib
+
+from video import Video
+from video_storage import VideoStorage
+
+_BATCH_SIZE = 10_000
+
+
+def shard_of(video_id, shard_count):
+    """Returns the shard owning a video id.
+
+    crc32 is used rather than hash() so the placement is stable across
+    processes and runs.
+    """
+    return zlib.crc32(video_id.encode("utf-8")) % shard_count
+
+
+def _shard_worker(conn):
+    """Serves one shard of the catalog until told to close.
+
+    Videos are kept as (row, title, video_id, tags, duration) tuples keyed
+    by id. The row is the position in the whole catalog, which the parent
+    uses to merge shard results back into catalog order. As videos are
+    added the shard also indexes them: each title lower cased once for
+    title searches, and the ids of the videos with each tag.
+    """
+    videos = {}
+    search_keys = {}
+    tag_ids = {}
+    while True:
+        request, argument = conn.recv()
+        if request == "add":
+            for entry in argument:
+                video_id = entry[2]
+                previous = videos.get(video_id)
+                if previous is not None:
+                    for tag in previous[3]:
+                        tag_ids[tag].discard(video_id)
+                videos[video_id] = entry
+                search_keys[video_id] = entry[1].lower()
+                for tag in entry[3]:
+                    tag_ids.setdefault(tag, set()).add(video_id)
+            conn.send(None)
+        elif request == "get":
+            conn.send(videos.get(argument))
+        elif request == "len":
+            conn.send(len(videos))
+        elif request == "values":
+            conn.send(list(videos.values()))
+        elif request == "search_titles":
+            search_key = argument.lower()
+            conn.send(sorted(
+                (videos[video_id] for video_id, title in search_keys.items()
+                 if search_key in title),
+                key=lambda entry: (entry[1], entry[0])))
+        elif request == "search_tag":
+            conn.send(sorted(
+                (videos[video_id] for video_id in tag_ids.get(argument, ())),
+                key=lambda entry: (entry[1], entry[0])))
+        elif request == "close":
+            conn.send(None)
+            conn.close()
+            return
+
+
+class _Shard:
+    """A class used to represent the parent's handle on one worker."""
+
+    def __init__(self, context):
+        self._conn, child_conn = context.Pipe()
+        self._lock = threading.Lock()
+        self.process = context.Process(
+            target=_shard_worker, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def send(self, request, argument=None):
+        """Sends a request, leaving the shard locked until receive() reads
+        the reply. A request that cannot be sent unlocks it again."""
+        self._lock.acquire()
+        try:
+            self._conn.send((request, argument))
+        except BaseException:
+            self._lock.release()
+            raise
+
+    def receive(self):
+        try:
+            return self._conn.recv()
+        finally:
+            self._lock.release()
+
+    def call(self, request, argument=None):
+        with self._lock:
+            self._conn.send((request, argument))
+            return self._conn.recv()
+
+    def close(self):
+        if self.process.is_alive():
+            self.call("close")
+        self.process.join()
+        self._conn.close()
+
+
+def _close_shards(shards):
+    for shard in shards:
+        shard.close()
+
+
+class ShardedStorage(VideoStorage):
+    """A class used to partition the catalog across worker processes.
+
+    Each video lives on the shard picked by a hash of its video_id, so PLAY
+    and FLAG_VIDEO lookups go to exactly one worker. Searches are sent to
+    every shard at once, each shard scans its own part in parallel and the
+    per-shard results, already sorted, are merged in title order.
+    """
+
+    def __init__(self, shard_count=None):
+        """Starts the workers.
+
+        Args:
+            shard_count: The number of worker processes. Defaults to the
+                number of CPUs.
+        """
+        if shard_count is None:
+            shard_count = multiprocessing.cpu_count()
+        context = multiprocessing.get_context()
+        self._shards = [_Shard(context) for _ in range(shard_count)]
+        self._next_row = 0
+        self._finalizer = weakref.finalize(self, _close_shards, self._shards)
+
+    @property
+    def shard_count(self):
+        return len(self._shards)
+
+    @staticmethod
+    def _to_video(entry):
+        row, title, video_id, tags, duration = entry
+        return Video(title, video_id, tags, duration)
+
+    def _owner(self, video_id):
+        return self._shards[shard_of(video_id, len(self._shards))]
+
+    def _scatter(self, request, argument=None):
+        """Sends a request to every shard, then gathers all the replies.
+
+        Every shard sent the request has its reply read, even when another
+        shard fails, so none is left locked.
+        """
+        sent = []
+        try:
+            for shard in self._shards:
+                shard.send(request, argument)
+                sent.append(shard)
+        finally:
+            replies = []
+            failure = None
+            for shard in sent:
+                try:
+                    replies.append(shard.receive())
+                except Exception as e:
+                    failure = failure or e
+        if failure is not None:
+            raise failure
+        return replies
+
+    def __getitem__(self, video_id):
+        entry = self._owner(video_id).call("get", video_id)
+        if entry is None:
+            raise KeyError(video_id)
+        return self._to_video(entry)
+
+    def __contains__(self, video_id):
+        return self._owner(video_id).call("get", video_id) is not None
+
+    def __iter__(self):
+        return (video.video_id for video in self.values())
+
+    def __len__(self):
+        return sum(self._scatter("len"))
+
+    def values(self):
+        return [self._to_video(entry)
+                for entry in heapq.merge(*self._scatter("values"))]
+
+    def add_videos(self, videos):
+        batches = [[] for _ in self._shards]
+        for video in videos:
+            batch = batches[shard_of(video.video_id, len(self._shards))]
+            batch.append((self._next_row, video.title, video.video_id,
+                          tuple(video.tags), video.duration))
+            self._next_row += 1
+            if len(batch) >= _BATCH_SIZE:
+                self._owner(video.video_id).call("add", batch)
+                batch.clear()
+        for shard, batch in zip(self._shards, batches):
+            if batch:
+                shard.call("add", batch)
+
+    def search_titles(self, search_term):
+        return [self._to_video(entry) for entry in heapq.merge(
+            *self._scatter("search_titles", search_term),
+            key=lambda entry: (entry[1], entry[0]))]
+
+    def search_tag(self, video_tag):
+        return [self._to_video(entry) for entry in heapq.merge(
+            *self._scatter("search_tag", video_tag.lower()),
+            key=lambda entry: (entry[1], entry[0]))]
+
+    def close(self):
+        self._finalizer()
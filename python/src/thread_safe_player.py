@@ -0,0 +1,71 @@
+"""A video player that can be shared across threads."""
+
+import functools
+import threading
+
+from rwlock import ReadWriteLock
+from video_player import VideoPlayer
+
+# Commands that only read player state run in parallel with each other
+READ_METHODS = (
+    "number_of_videos", "show_all_videos", "show_playing",
+    "show_all_playlists", "show_playlist", "query_videos",
+    "recommend", "show_similar", "show_duplicates", "show_top_played",
+    "show_trending", "show_index_status", "show_flag_history",
+    "_list_search_results",
+)
+
+# Commands that change player state run one at a time
+WRITE_METHODS = (
+    "play_video", "play_random_video", "stop_video", "pause_video",
+    "continue_video", "create_playlist", "add_to_playlist",
+    "remove_from_playlist", "clear_playlist", "delete_playlist",
+    "flag_video", "allow_video", "play_similar", "add_to_playlist_bulk",
+    "remove_from_playlist_bulk", "flag_videos", "allow_videos", "set_output",
+    "advance_playback", "show_position", "playlist_union",
+    "playlist_intersect", "playlist_diff", "_regex_searcher", "show_memory",
+)
+
+
+def _locked(method, lock_name):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with getattr(self.lock, lock_name)():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ThreadSafeVideoPlayer(VideoPlayer):
+    """A class used to represent a Video Player shared between threads.
+
+    Read-only commands hold the read side of a ReadWriteLock and run in
+    parallel; commands that change status_codes, playlists or
+    flagged_videos hold the write side for the length of the command. The
+    search prompt runs outside the lock, so a user deciding what to play
+    does not block anyone. A regex search creates its searcher under the
+    write side, then scans the searcher's own copy of the titles outside
+    the lock and lists the results under the read side. Read commands that
+    need an index build it on first use under a lock of its own, so
+    concurrent readers build it once. MEMORY starts and stops tracing, so
+    it holds the write side.
+    """
+
+    def __init__(self, video_library=None, playback_clock=None):
+        self.lock = ReadWriteLock()
+        self._index_lock = threading.Lock()
+        super().__init__(video_library, playback_clock)
+
+    def _index(self, name):
+        index = self.indexes.get(name)
+        if index is not None:
+            return index
+        with self._index_lock:
+            return super()._index(name)
+
+
+for _name in READ_METHODS:
+    setattr(ThreadSafeVideoPlayer, _name,
+            _locked(getattr(VideoPlayer, _name), "read_locked"))
+for _name in WRITE_METHODS:
+    setattr(ThreadSafeVideoPlayer, _name,
+            _locked(getattr(VideoPlayer, _name), "write_locked"))
@@ -1,20 +1,40 @@
 """A video class."""
 
-from typing import Sequence
+from typing import Optional, Sequence
 
 
 class Video:
     """A class used to represent a Video."""
 
-    def __init__(self, video_title: str, video_id: str, video_tags: Sequence[str]):
+    __slots__ = ("_title", "_video_id", "_tags", "_search_key",
+                 "_display_line", "_duration")
+
+    def __init__(self, video_title: str, video_id: str, video_tags: Sequence[str],
+                 video_duration: Optional[float] = None):
         """Video constructor."""
         self._title = video_title
         self._video_id = video_id
+        self._duration = video_duration
 
         # Turn the tags into a tuple here so it's unmodifiable,
         # in case the caller changes the 'video_tags' they passed to us
         self._tags = tuple(video_tags)
 
+        # Listings and searches touch every video, so build the lower case
+        # search key and the display line once here rather than per call
+        self._search_key = video_title.lower()
+        self._display_line = (
+            f"{video_title} ({video_id}) [{' '.join(self._tags)}]")
+
+    def __eq__(self, other):
+        # Storages may build a fresh Video per lookup, so compare by id
+        if not isinstance(other, Video):
+            return NotImplemented
+        return self._video_id == other._video_id
+
+    def __hash__(self):
+        return hash(self._video_id)
+
     @property
     def title(self) -> str:
         """Returns the title of a video."""
@@ -28,4 +48,29 @@ class Video:
     @property
     def tags(self) -> Sequence[str]:
         """Returns the list of tags of a video."""
-        return self._tags
\ No newline at end of file
+        return self._tags
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Returns the length of a video in seconds, None if unknown."""
+        return self._duration
+
+    @property
+    def search_key(self) -> str:
+        """Returns the lower case title used for searching."""
+        return self._search_key
+
+    @property
+    def display_line(self) -> str:
+        """Returns the title, video id and tags formatted for listings."""
+        return self._display_line
+
+    def display(self, flag_reason=None) -> str:
+        """Returns the display line with the flagged suffix, if any.
+
+        The trailing space when the video is not flagged matches how the
+        listings have always been printed.
+        """
+        if flag_reason is None:
+            return f"{self._display_line} "
+        return f"{self._display_line} - FLAGGED (reason: {flag_reason})"
@@ -1,36 +1,49 @@
 """A video library class."""
 
-from video import Video
+from catalog_import import CatalogImporter
+from video_storage import InMemoryStorage
 from pathlib import Path
-import csv
-
-
-# Helper Wrapper around CSV reader to strip whitespace from around
-# each item.
-def _csv_reader_with_strip(reader):
-    yield from ((item.strip() for item in line) for line in reader)
 
 
 class VideoLibrary:
     """A class used to represent a Video Library."""
 
-    def __init__(self):
-        """The VideoLibrary class is initialized."""
-        self._videos = {}
-        with open(Path(__file__).parent / "videos.txt") as video_file:
-            reader = _csv_reader_with_strip(
-                csv.reader(video_file, delimiter="|"))
-            for video_info in reader:
-                title, url, tags = video_info
-                self._videos[url] = Video(
-                    title,
-                    url,
-                    [tag.strip() for tag in tags.split(",")] if tags else [],
-                )
+    def __init__(self, path=None, storage=None, catalog_format=None):
+        """The VideoLibrary class is initialized.
+
+        Args:
+            path: The catalog file to load. Defaults to the videos.txt next
+                to this module.
+            storage: The VideoStorage to keep the videos in. Defaults to an
+                in-memory dict. A storage that already holds videos, such
+                as a previously built SQLite database, is used as is and
+                the catalog file is not read.
+            catalog_format: The catalog format, see catalog_import.READERS.
+                Detected from the path if None.
+        """
+        if path is None:
+            path = Path(__file__).parent / "videos.txt"
+        if storage is None:
+            storage = InMemoryStorage()
+        self.path = Path(path)
+        self._storage = storage
+        self.import_stats = None
+        if len(storage) == 0:
+            importer = CatalogImporter(path, catalog_format)
+            storage.add_videos(importer)
+            self.import_stats = importer.stats
 
     def get_all_videos(self):
         """Returns all available video information from the video library."""
-        return list(self._videos.values())
+        return list(self._storage.values())
+
+    def videos_by_title(self):
+        """Returns all videos sorted by title, ties kept in catalog order.
+
+        The storage decides how: in memory the order is computed once, on
+        first use, while SQLite streams it from its title index.
+        """
+        return self._storage.values_by_title()
 
     def get_video(self, video_id):
         """Returns the video object (title, url, tags) from the video library.
@@ -42,8 +55,25 @@ class VideoLibrary:
             The Video object for the requested video_id. None if the video
             does not exist.
         """
-        return self._videos.get(video_id, None)
+        return self._storage.get(video_id, None)
+
+    def search_titles(self, search_term):
+        """Returns the videos whose titles contain the search_term.
+
+        Args:
+            search_term: The case insensitive text to look for.
+        """
+        return self._storage.search_titles(search_term)
+
+    def search_tag(self, video_tag):
+        """Returns the videos tagged with the provided tag.
+
+        Args:
+            video_tag: The video tag to look for.
+        """
+        return self._storage.search_tag(video_tag)
 
     @property
     def videos(self):
-        return self._videos
+        """Returns the storage, a mapping of video_id to Video."""
+        return self._storage
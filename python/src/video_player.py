@@ -1,43 +1,221 @@
 """A video player class."""
+import functools
 import random
+import re
+from array import array
+from datetime import datetime
 
 from video_library import VideoLibrary
-from video_playlist import Playlist
+from video_playlist import Playlist, VideoRows
 from video_flags import Flagged
-
+from memory_usage import MemoryTracker, format_size, memory_report
+from video_query import BitmapIndex, QuerySyntaxError, run_query
+from recommender import TagRecommender
+from minhash import MinHashIndex
+from play_counts import PlayCounter
+from player_output import OUTPUT_MODES, TextOutput
+from index_builder import BUILDING, IndexBuilder
+from playback_clock import Playback, PlaybackClock
+from regex_search import RegexSearcher
+from deadline import current_deadline, format_timeout, suspended
+from flag_history import ALLOW, FLAG, FlagHistory
+
+# The indexes a player can build over its library, by name
+INDEX_CLASSES = {
+    "query": BitmapIndex,
+    "recommender": TagRecommender,
+    "minhash": MinHashIndex,
+}
+
+
+def _format_time(seconds):
+    """Formats seconds as m:ss, or h:mm:ss from an hour up."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
 
 
 class VideoPlayer:
     """A class used to represent a Video Player."""
 
-    def __init__(self):
-        self.video_library = VideoLibrary()
+    def __init__(self, video_library=None, playback_clock=None):
+        """
+        Args:
+            video_library: The VideoLibrary to play from. Defaults to the
+                bundled videos.txt.
+            playback_clock: The PlaybackClock to track the watch position
+                on, which many players may share. Defaults to a new one.
+        """
+        if video_library is None:
+            video_library = VideoLibrary()
+        if playback_clock is None:
+            playback_clock = PlaybackClock()
+        self.video_library = video_library
+        self.playback_clock = playback_clock
+        self.playback = Playback(playback_clock, self._video_ended)
         self.status_codes = {}
         self.playlists = {}
+        # Numbers the videos in playlists, which store only the numbers
+        self.playlist_rows = VideoRows()
+        # Where playlists too large to keep in memory are memory-mapped
+        self.playlist_spill_dir = None
         self.flagged_videos = {}
+        self.indexes = {}
+        # An IndexCache to load indexes from instead of building them
+        self.index_cache = None
+        self.index_builder = None
+        self.regex_searcher = None
+        self.memory_tracker = MemoryTracker()
+        self.play_counts = PlayCounter()
+        # True while recovered events are applied again
+        self.replaying = False
+        self.flag_history = FlagHistory()
+        self.output = TextOutput()
+        # Callables taking (method_name, *args), told about every state
+        # change once it has been applied
+        self.listeners = []
         self.status_codes['current_video_id'] = ''
         self.status_codes['is_playing'] = False
         self.status_codes['is_paused'] = True
 
+    def _notify(self, method_name, *args):
+        """Tells the listeners a state changing command succeeded."""
+        for listener in self.listeners:
+            listener(method_name, *args)
+
+    def _build_index(self, name, videos=None, progress=None):
+        """Builds an index over the library, or loads it from the cache.
+
+        Args:
+            name: The INDEX_CLASSES name of the index.
+            videos: Returns the list of the library's videos, so several
+                builds can share one. Defaults to reading the library once.
+            progress: Called with the videos, returns the iterable the
+                index is built from, e.g. one that counts them.
+        """
+        if videos is None:
+            videos = functools.lru_cache(maxsize=1)(
+                self.video_library.get_all_videos)
+
+        def build():
+            if progress is None:
+                return INDEX_CLASSES[name](videos())
+            return INDEX_CLASSES[name](progress(videos()))
+        if self.index_cache is not None:
+            return self.index_cache.get(name, build, videos)
+        return build()
+
+    def _index(self, name):
+        """Returns an index over the library, building it on first use.
+
+        If the background builder is already working on it, waits for that
+        build rather than starting another.
+        """
+        if name not in self.indexes and self.index_builder is not None:
+            self.index_builder.wait(name)
+        if name not in self.indexes:
+            self.indexes[name] = self._build_index(name)
+        return self.indexes[name]
+
+    def build_indexes_in_background(self):
+        """Starts building every index on a background thread.
+
+        Only a library whose storage scans the catalog gains from indexes
+        built ahead of use; any other, e.g. SQLite or shards, would be read
+        into memory for nothing, so its indexes are left to first use.
+
+        Returns:
+            True if the build was started.
+        """
+        if not self.video_library.videos.scans_catalog:
+            return False
+        self.index_builder = IndexBuilder(self, INDEX_CLASSES)
+        self.index_builder.start()
+        return True
+
+    def _searchable(self, search_term=None):
+        """Returns what searches should run against: the query index once
+        it is ready, otherwise the library itself.
+
+        Args:
+            search_term: A title search term. The index is only used for it
+                when its trigrams narrow the titles to check, as scanning
+                every title is faster for short or common terms.
+        """
+        index = self.indexes.get("query")
+        if index is None or not self.video_library.videos.scans_catalog:
+            return self.video_library
+        if search_term is not None and not index.narrows(search_term):
+            return self.video_library
+        return index
+
+    def show_index_status(self):
+        """Displays whether each index is built, how far the one building
+        has got, and how long each took."""
+        if self.index_builder is not None:
+            status = self.index_builder.status()
+        else:
+            status = [(name, "ready" if name in self.indexes else
+                       "built on first use", None, None, None, None)
+                      for name in INDEX_CLASSES]
+        self.output.message("Index status:")
+        for name, state, seconds, error, indexed, total in status:
+            if error is not None:
+                state = f"{state} ({error})"
+            elif state == BUILDING and total is not None:
+                state = f"{state} ({indexed} of {total} videos, " \
+                    f"{seconds:.2f}s)"
+            elif seconds is not None:
+                state = f"{state} ({seconds:.2f}s)"
+            self.output.message(f"  {name}: {state}")
+
     def number_of_videos(self):
-        num_videos = len(self.video_library.get_all_videos())
-        print(f"{num_videos} videos in the library")
+        num_videos = len(self.video_library.videos)
+        self.output.message(f"{num_videos} videos in the library")
 
     def show_all_videos(self):
         """Returns all videos."""
-        all_videos = self.video_library.get_all_videos()
-        sorted_videos = sorted(all_videos, key=lambda x: x.title)
-        print("Here's a list of all available videos:")
-
-        for i in sorted_videos:
-            title_txt = str(i.title)
-            video_id_txt = "(" + str(i.video_id) + ")"
-            tag_txt = "[" + " ".join(i.tags) + "]"
-            if i.video_id in self.flagged_videos:
-                flag_txt = "- FLAGGED (reason: " + (self.flagged_videos[i.video_id].reason) + ")"
-            else:
-                flag_txt = ""
-            print(f"{title_txt} {video_id_txt} {tag_txt} {flag_txt}")
+        self.output.message("Here's a list of all available videos:")
+
+        deadline = current_deadline()
+        for i in self.video_library.videos_by_title():
+            if deadline.expired:
+                self._truncated(deadline)
+                return
+            self._output_video(i, self._video_line(i))
+
+    def _truncated(self, deadline):
+        """Ends a listing cut short by the command's deadline."""
+        self.output.truncated(
+            f"Results truncated: command {deadline.describe()}")
+
+    def _output_video(self, video, line, number=None, score=None):
+        """Writes a listed video in the current output mode."""
+        flag = self.flagged_videos.get(video.video_id)
+        self.output.video(video, line,
+                          flag.reason if flag is not None else None, number,
+                          score)
+
+    def set_output(self, mode):
+        """Switches the output mode for the rest of the session.
+
+        Args:
+            mode: One of the OUTPUT_MODES names, e.g. text or json.
+        """
+        output = OUTPUT_MODES.get(mode.lower())
+        if output is None:
+            self.output.message(
+                f"Cannot set output mode: Unknown mode {mode}")
+            return
+        self.output = output()
+        self.output.message(f"Output mode: {output.name}")
+
+    def _video_line(self, video):
+        """Returns the listing line of a video, with its flag if flagged."""
+        flag = self.flagged_videos.get(video.video_id)
+        return video.display(flag.reason if flag is not None else None)
 
     def play_video(self, video_id):
         """Plays the respective video.
@@ -46,17 +224,17 @@ class VideoPlayer:
             video_id: The video_id to be played.
         """
 
-        if not self.video_library._videos.get(video_id, None):
-            print("Cannot play video: Video does not exist")
+        if video_id not in self.video_library.videos:
+            self.output.message("Cannot play video: Video does not exist")
             return
 
         if video_id in self.flagged_videos:
             if self.flagged_videos[video_id].status == True:
-                print(f"Cannot play video: Video is currently flagged (reason: {self.flagged_videos[video_id].reason})")
+                self.output.message(f"Cannot play video: Video is currently flagged (reason: {self.flagged_videos[video_id].reason})")
                 return
 
         if self.status_codes['is_playing'] is True and self.status_codes[
-            'current_video_id'] in self.video_library.get_all_videos():
+            'current_video_id'].video_id in self.video_library.videos:
             self.stop_video()
 
         current_video = self.video_library.get_video(video_id)
@@ -64,18 +242,24 @@ class VideoPlayer:
         self.status_codes['is_paused'] = False
 
         if self.status_codes['is_playing'] is True:
-            print(f"Playing video: {current_video.title}")
+            self.output.message(f"Playing video: {current_video.title}")
 
-        print(f"Playing video: {current_video.title}")
+        self.output.message(f"Playing video: {current_video.title}")
         self.status_codes['is_playing'] = True
+        self.playback.start(current_video.duration)
+        if not self.replaying:
+            self.play_counts.record(video_id)
+        self._notify("play_video", video_id)
 
     def stop_video(self):
         """Stops the current video."""
         if self.status_codes['is_playing']:
-            print(f"Stopping video: {self.status_codes['current_video_id'].title}")
+            self.output.message(f"Stopping video: {self.status_codes['current_video_id'].title}")
             self.status_codes['is_playing'] = False
+            self.playback.stop()
+            self._notify("stop_video")
         else:
-            print('Cannot stop video: No video is currently playing')
+            self.output.message('Cannot stop video: No video is currently playing')
 
     def play_random_video(self):
         """Plays a random video from the video library."""
@@ -88,7 +272,7 @@ class VideoPlayer:
             random_video = random.choice(all_videos)
             num_videos -= num_videos
             if num_videos == 0:
-                print("No videos available")
+                self.output.message("No videos available")
                 return
 
         if self.status_codes['is_playing']:
@@ -99,41 +283,71 @@ class VideoPlayer:
     def pause_video(self):
         """Pauses the current video."""
         if not self.status_codes['current_video_id']:
-            print("Cannot pause video: No video is currently playing")
+            self.output.message("Cannot pause video: No video is currently playing")
             return
 
         if not self.status_codes['is_paused']:
-            print(f"Pausing video: {self.status_codes['current_video_id'].title}")
+            self.output.message(f"Pausing video: {self.status_codes['current_video_id'].title}")
             self.status_codes['is_paused'] = True
+            self.playback.pause()
+            self._notify("pause_video")
         else:
-            print(f"Video already paused: {self.status_codes['current_video_id'].title}")
+            self.output.message(f"Video already paused: {self.status_codes['current_video_id'].title}")
 
     def continue_video(self):
         """Resumes playing the current video."""
 
         if not self.status_codes['is_playing']:
-            print(f"Cannot continue video: No video is currently playing")
+            self.output.message(f"Cannot continue video: No video is currently playing")
             return
 
         if self.status_codes['is_paused']:
-            print(f"Continuing video: {self.status_codes['current_video_id'].title}")
+            self.output.message(f"Continuing video: {self.status_codes['current_video_id'].title}")
             self.status_codes['is_paused'] = False
+            self.playback.resume()
+            self._notify("continue_video")
         else:
-            print(f"Cannot continue video: Video is not paused")
+            self.output.message(f"Cannot continue video: Video is not paused")
+
+    def _video_ended(self):
+        """Called by the playback clock when the current video finishes."""
+        self.output.message(
+            f"Finished video: {self.status_codes['current_video_id'].title}")
+        self.status_codes['is_playing'] = False
+        self.playback.stop()
+        self._notify("stop_video")
+
+    def advance_playback(self):
+        """Moves the playback clock on to now, finishing any video that has
+        played to its end."""
+        self.playback_clock.advance()
+        self.playback.poll()
+
+    def show_position(self):
+        """Displays how far into the current video playback is."""
+        self.advance_playback()
+        if not self.status_codes['is_playing']:
+            self.output.message("No video is currently playing")
+            return
+
+        position = _format_time(self.playback.position)
+        if self.playback.duration is not None:
+            position += f" / {_format_time(self.playback.duration)}"
+        paused = " - PAUSED" if self.status_codes['is_paused'] else ""
+        self.output.message(
+            f"Position: {self.status_codes['current_video_id'].title} "
+            f"{position}{paused}")
 
     def show_playing(self):
         """Displays video currently playing."""
         if self.status_codes['is_playing']:
-            title_txt = str(self.status_codes['current_video_id'].title)
-            video_id_txt = "(" + str(self.status_codes['current_video_id'].video_id) + ")"
-            tag_txt = "[" + " ".join(self.status_codes['current_video_id'].tags) + "]"
             if self.status_codes['is_paused']:
                 put_paused = '- PAUSED'
             else:
                 put_paused = ""
-            print(f"Currently playing: {title_txt} {video_id_txt} {tag_txt} {put_paused}")
+            self.output.message(f"Currently playing: {self.status_codes['current_video_id'].display_line} {put_paused}")
         else:
-            print(f"No video is currently playing")
+            self.output.message(f"No video is currently playing")
 
     def create_playlist(self, playlist_name):
         """Creates a playlist with a given name.
@@ -142,11 +356,17 @@ class VideoPlayer:
             playlist_name: The playlist name.
         """
         if playlist_name.lower() not in self.playlists:
-            print(f"Successfully created new playlist: {playlist_name}")
-            self.playlists[playlist_name.lower()] = Playlist(playlist_name)
+            self.output.message(f"Successfully created new playlist: {playlist_name}")
+            self.playlists[playlist_name.lower()] = self._new_playlist(playlist_name)
+            self._notify("create_playlist", playlist_name)
         else:
-            print("Cannot create playlist: A playlist with the same name already "
-                  "exists")
+            self.output.message("Cannot create playlist: A playlist with the same name already "
+                                "exists")
+
+    def _new_playlist(self, playlist_name):
+        """Returns an empty playlist sharing the player's video rows."""
+        return Playlist(playlist_name, self.playlist_rows,
+                        self.playlist_spill_dir)
 
     def add_to_playlist(self, playlist_name, video_id):
         """Adds a video to a playlist with a given name.
@@ -156,61 +376,275 @@ class VideoPlayer:
             video_id: The video_id to be added.
         """
         if playlist_name.lower() not in self.playlists:
-            print(f"Cannot add video to {playlist_name}: Playlist does not exist")
+            self.output.message(f"Cannot add video to {playlist_name}: Playlist does not exist")
             return
 
-        if not self.video_library.videos.get(video_id, None):
-            print(f"Cannot add video to {playlist_name}: Video does not exist")
+        if video_id not in self.video_library.videos:
+            self.output.message(f"Cannot add video to {playlist_name}: Video does not exist")
             return
 
         if self.video_library.get_video(video_id) in self.playlists[playlist_name.lower()].videos:
-            print(f"Cannot add video to {playlist_name}: Video already added")
+            self.output.message(f"Cannot add video to {playlist_name}: Video already added")
             return
 
         if video_id in self.flagged_videos:
-            print(f"Cannot add video to {playlist_name}: Video is currently flagged (reason: {self.flagged_videos[video_id].reason})")
+            self.output.message(f"Cannot add video to {playlist_name}: Video is currently flagged (reason: {self.flagged_videos[video_id].reason})")
             return
 
-        print(f"Added video to {playlist_name}: {self.video_library.get_video(video_id).title}")
+        self.output.message(f"Added video to {playlist_name}: {self.video_library.get_video(video_id).title}")
         self.playlists[playlist_name.lower()].videos.append(self.video_library.get_video(video_id))
+        self._notify("add_to_playlist", playlist_name, video_id)
+
+    def _print_bulk_summary(self, summary, action, failures):
+        """Prints one line for a bulk command, then any failed video ids."""
+        self.output.message(summary)
+        if failures:
+            self.output.message(f"Could not {action} {len(failures)} videos:")
+            for video_id, reason in failures:
+                self.output.message(f"  {video_id}: {reason}")
+
+    def _rows_present(self, playlist, video_ids):
+        """Returns {video_id: row id} of the video_ids in a playlist.
+
+        The playlist is read once as row ids, and only the rows asked about
+        are kept, so the cost in memory follows video_ids, not the
+        playlist.
+        """
+        wanted = {}
+        for video_id in video_ids:
+            row = self.playlist_rows.find_id(video_id)
+            if row is not None:
+                wanted[row] = video_id
+        present = {}
+        if wanted:
+            for row in playlist.iter_rows():
+                if row in wanted:
+                    present[wanted[row]] = row
+        return present
+
+    def add_to_playlist_bulk(self, playlist_name, video_ids):
+        """Adds many videos to a playlist, reporting only the failures.
+
+        Every id is checked in one pass, then the valid ones are appended
+        together.
+
+        Args:
+            playlist_name: The playlist name.
+            video_ids: The video_ids to be added, in order.
+        """
+        playlist = self.playlists.get(playlist_name.lower())
+        if playlist is None:
+            self.output.message(f"Cannot add videos to {playlist_name}: Playlist does not exist")
+            return
+
+        present = self._rows_present(playlist, video_ids)
+        added = []
+        failures = []
+        for video_id in video_ids:
+            if video_id not in self.video_library.videos:
+                failures.append((video_id, "Video does not exist"))
+            elif video_id in present:
+                failures.append((video_id, "Video already added"))
+            elif video_id in self.flagged_videos:
+                failures.append((video_id, "Video is currently flagged "
+                                 f"(reason: {self.flagged_videos[video_id].reason})"))
+            else:
+                present[video_id] = None
+                added.append(self.video_library.get_video(video_id))
+
+        playlist.videos.extend(added)
+        for video in added:
+            self._notify("add_to_playlist", playlist_name, video.video_id)
+        self._print_bulk_summary(
+            f"Added {len(added)} videos to {playlist_name}", "add", failures)
+
+    def remove_from_playlist_bulk(self, playlist_name, video_ids):
+        """Removes many videos from a playlist, reporting only the failures.
+
+        Args:
+            playlist_name: The playlist name.
+            video_ids: The video_ids to be removed.
+        """
+        playlist = self.playlists.get(playlist_name.lower())
+        if playlist is None:
+            self.output.message(f"Cannot remove videos from {playlist_name}: Playlist does not exist")
+            return
+
+        present = self._rows_present(playlist, video_ids)
+        removed = []
+        removing = set()
+        failures = []
+        for video_id in video_ids:
+            if video_id not in self.video_library.videos:
+                failures.append((video_id, "Video does not exist"))
+            elif video_id not in present:
+                failures.append((video_id, "Video is not in playlist"))
+            else:
+                removing.add(present.pop(video_id))
+                removed.append(video_id)
+
+        if removing:
+            playlist.set_rows(row for row in playlist.iter_rows()
+                              if row not in removing)
+        for video_id in removed:
+            self._notify("remove_from_playlist", playlist_name, video_id)
+        self._print_bulk_summary(
+            f"Removed {len(removed)} videos from {playlist_name}", "remove",
+            failures)
+
+    def _combine_playlists(self, operation, new_name, source_names, keep):
+        """Creates a playlist from the videos of others.
+
+        Every playlist shares the player's video rows, so the sources are
+        combined as row ids: each is read once and looked up in a byte per
+        row, so the cost is linear in their total length and no Video or
+        id string is built per entry.
+
+        Args:
+            operation: The operation name, for messages.
+            new_name: The playlist to create.
+            source_names: The playlists to combine, in order.
+            keep: Called with the source playlists, yields the row ids of
+                the new playlist in order, each once.
+        """
+        if new_name.lower() in self.playlists:
+            self.output.message(f"Cannot {operation} playlists: A playlist with the same name already exists")
+            return
+
+        sources = []
+        for name in source_names:
+            playlist = self.playlists.get(name.lower())
+            if playlist is None:
+                self.output.message(f"Cannot {operation} playlists: Playlist {name} does not exist")
+                return
+            sources.append(playlist)
+
+        video = self.playlist_rows.video
+        added = array("I")
+        failures = []
+        for row in keep(sources):
+            video_id = video(row).video_id
+            flag = self.flagged_videos.get(video_id)
+            if flag is not None:
+                failures.append((video_id, "Video is currently flagged "
+                                 f"(reason: {flag.reason})"))
+            else:
+                added.append(row)
+
+        playlist = self._new_playlist(new_name)
+        playlist.set_rows(added)
+        self.playlists[new_name.lower()] = playlist
+        self._notify("create_playlist", new_name)
+        for row in added:
+            self._notify("add_to_playlist", new_name, video(row).video_id)
+        self._print_bulk_summary(
+            f"Created playlist {new_name} with {len(added)} videos", "add",
+            failures)
+
+    def _row_set(self, *playlists):
+        """Returns a bytearray with one byte per video row, set for the rows
+        in any of the playlists."""
+        rows = bytearray(len(self.playlist_rows))
+        for playlist in playlists:
+            for row in playlist.iter_rows():
+                rows[row] = 1
+        return rows
+
+    def playlist_union(self, new_name, source_names):
+        """Creates a playlist of the videos in any of the source playlists.
+
+        Videos keep the order of the first playlist, followed by those only
+        in later ones in their order.
+
+        Args:
+            new_name: The playlist to create.
+            source_names: The playlists to combine.
+        """
+        def keep(sources):
+            seen = self._row_set()
+            for playlist in sources:
+                for row in playlist.iter_rows():
+                    if not seen[row]:
+                        seen[row] = 1
+                        yield row
+
+        self._combine_playlists("union", new_name, source_names, keep)
+
+    def playlist_intersect(self, new_name, source_names):
+        """Creates a playlist of the videos in every source playlist, in the
+        order of the first.
+
+        Args:
+            new_name: The playlist to create.
+            source_names: The playlists to combine.
+        """
+        def keep(sources):
+            others = [self._row_set(playlist) for playlist in sources[1:]]
+            for row in sources[0].iter_rows():
+                if all(rows[row] for rows in others):
+                    yield row
+
+        self._combine_playlists("intersect", new_name, source_names, keep)
+
+    def playlist_diff(self, new_name, source_names):
+        """Creates a playlist of the videos in the first source playlist but
+        none of the others, in the order of the first.
+
+        Args:
+            new_name: The playlist to create.
+            source_names: The playlists to combine.
+        """
+        def keep(sources):
+            others = self._row_set(*sources[1:])
+            for row in sources[0].iter_rows():
+                if not others[row]:
+                    yield row
+
+        self._combine_playlists("diff", new_name, source_names, keep)
 
     def show_all_playlists(self):
         """Display all playlists."""
 
         if len(self.playlists) == 0:
-            print("No playlists exist yet")
+            self.output.message("No playlists exist yet")
             return
 
-        print("Showing all playlists:")
+        self.output.message("Showing all playlists:")
         playlist_length = len(self.playlists)
         for p in sorted(self.playlists):
-            print(f"{self.playlists[p].name}")
+            self.output.message(f"{self.playlists[p].name}")
 
-    def show_playlist(self, playlist_name):
+    def show_playlist(self, playlist_name, start=1, count=None):
         """Display all videos in a playlist with a given name.
 
         Args:
             playlist_name: The playlist name.
+            start: The position of the first video to show, from 1.
+            count: The most videos to show, None for all from start.
         """
         if playlist_name.lower() not in self.playlists:
-            print(f"Cannot show playlist {playlist_name}: Playlist does not exist")
+            self.output.message(f"Cannot show playlist {playlist_name}: Playlist does not exist")
             return
 
-        if len(self.playlists[playlist_name.lower()].videos) == 0:
-            print(f"Showing playlist: {playlist_name}")
-            print("No videos here yet")
+        playlist = self.playlists[playlist_name.lower()]
+        length = len(playlist.videos)
+        if length == 0:
+            self.output.message(f"Showing playlist: {playlist_name}")
+            self.output.message("No videos here yet")
             return
 
-        print(f"Showing playlist: {playlist_name}")
-        for v in self.playlists[playlist_name.lower()].videos:
-            title_txt = str(v.title)
-            video_id_txt = "(" + str(v.video_id) + ")"
-            tag_txt = "[" + " ".join(v.tags) + "]"
-            if v.video_id in self.flagged_videos:
-                flag_txt = "- FLAGGED (reason: " + (self.flagged_videos[v.video_id].reason) + ")"
-            else:
-                flag_txt = ""
-            print(f"{title_txt} {video_id_txt} {tag_txt} {flag_txt}")
+        if start > length:
+            self.output.message(f"Cannot show playlist {playlist_name}: Playlist has only {length} videos")
+            return
+
+        self.output.message(f"Showing playlist: {playlist_name}")
+        deadline = current_deadline()
+        stop = None if count is None else start - 1 + count
+        for v in playlist.iter_videos(start - 1, stop):
+            if deadline.expired:
+                self._truncated(deadline)
+                return
+            self._output_video(v, self._video_line(v))
 
     def remove_from_playlist(self, playlist_name, video_id):
         """Removes a video to a playlist with a given name.
@@ -220,19 +654,20 @@ class VideoPlayer:
             video_id: The video_id to be removed.
         """
         if playlist_name.lower() not in self.playlists:
-            print(f"Cannot remove video from {playlist_name}: Playlist does not exist")
+            self.output.message(f"Cannot remove video from {playlist_name}: Playlist does not exist")
             return
 
-        if not self.video_library.videos.get(video_id, None):
-            print(f"Cannot remove video from {playlist_name}: Video does not exist")
+        if video_id not in self.video_library.videos:
+            self.output.message(f"Cannot remove video from {playlist_name}: Video does not exist")
             return
 
         if self.video_library.get_video(video_id) not in self.playlists[playlist_name.lower()].videos:
-            print(f"Cannot remove video from {playlist_name}: Video is not in playlist")
+            self.output.message(f"Cannot remove video from {playlist_name}: Video is not in playlist")
             return
 
-        print(f"Removed video from {playlist_name}: {self.video_library.get_video(video_id).title}")
+        self.output.message(f"Removed video from {playlist_name}: {self.video_library.get_video(video_id).title}")
         self.playlists[playlist_name.lower()].videos.remove(self.video_library.get_video(video_id))
+        self._notify("remove_from_playlist", playlist_name, video_id)
 
     def clear_playlist(self, playlist_name):
         """Removes all videos from a playlist with a given name.
@@ -241,10 +676,11 @@ class VideoPlayer:
             playlist_name: The playlist name.
         """
         if playlist_name.lower() not in self.playlists:
-            print(f"Cannot clear playlist {playlist_name}: Playlist does not exist")
+            self.output.message(f"Cannot clear playlist {playlist_name}: Playlist does not exist")
             return
-        print(f"Successfully removed all videos from {playlist_name}")
+        self.output.message(f"Successfully removed all videos from {playlist_name}")
         self.playlists[playlist_name.lower()].videos = []
+        self._notify("clear_playlist", playlist_name)
 
     def delete_playlist(self, playlist_name):
         """Deletes a playlist with a given name.
@@ -253,10 +689,11 @@ class VideoPlayer:
             playlist_name: The playlist name.
         """
         if playlist_name.lower() not in self.playlists:
-            print(f"Cannot delete playlist {playlist_name}: Playlist does not exist")
+            self.output.message(f"Cannot delete playlist {playlist_name}: Playlist does not exist")
             return
-        print(f"Deleted playlist: {playlist_name}")
-        del self.playlists[playlist_name.lower()]
+        self.output.message(f"Deleted playlist: {playlist_name}")
+        self.playlists.pop(playlist_name.lower()).close()
+        self._notify("delete_playlist", playlist_name)
 
     def search_videos(self, search_term):
         """Display all the videos whose titles contain the search_term.
@@ -264,39 +701,11 @@ class VideoPlayer:
         Args:
             search_term: The query to be used in search.
         """
-        all_videos = self.video_library.get_all_videos()
-        sorted_videos = sorted(all_videos, key=lambda x: x.title)
-        count = 0
-        search_videos = []
-
-        for i in all_videos:
-            if search_term.lower() in i.title.lower():
-                if count == 0:
-                    print(f"Here are the results for {search_term}:")
-                    count = count + 1
-                if i.video_id not in self.flagged_videos:
-                    search_videos.append(i.video_id)
-                    title_txt = str(i.title)
-                    video_id_txt = "(" + str(i.video_id) + ")"
-                    tag_txt = "[" + " ".join(i.tags) + "]"
-                    print(f"{count}) {title_txt} {video_id_txt} {tag_txt}")
-
-        if count >= 1:
-            print((
-                    "Would you like to play any of the above? If yes, specify the number of the video. \n"
-                    "If your answer is not a valid number, we will assume it's a no."))
-            try:
-                play_above = int(input())
-            except ValueError:
-                return
-
-            if 0 < play_above <= count:
-                self.play_video(search_videos[play_above - 1])
-            else:
-                return
-
-        else:
-            print(f"No search results for {search_term}")
+        results = self._list_search_results(
+            search_term,
+            self._searchable(search_term).search_titles(search_term))
+        if results is not None:
+            self._offer_to_play(*results)
 
     def search_videos_tag(self, video_tag):
         """Display all videos whose tags contains the provided tag.
@@ -304,41 +713,255 @@ class VideoPlayer:
         Args:
             video_tag: The video tag to be used in search.
         """
-        all_videos = self.video_library.get_all_videos()
-        sorted_videos = sorted(all_videos, key=lambda x: x.title)
+        results = self._list_search_results(
+            video_tag, self._searchable().search_tag(video_tag))
+        if results is not None:
+            self._offer_to_play(*results)
+
+    def _regex_searcher(self):
+        """Returns the regex searcher, creating it on first use."""
+        if self.regex_searcher is None:
+            self.regex_searcher = RegexSearcher(
+                self.video_library.get_all_videos())
+        return self.regex_searcher
+
+    def search_videos_regex(self, pattern, budget=2.0):
+        """Display all the videos whose titles match a regular expression.
+
+        Args:
+            pattern: The regular expression, matched ignoring case.
+            budget: The most seconds to spend searching.
+        """
+        searcher = self._regex_searcher()
+        deadline = current_deadline()
+        remaining = deadline.remaining()
+        if remaining is not None:
+            # Leave half the command's time for listing what was found
+            budget = min(budget, remaining / 2)
+        try:
+            videos, complete = searcher.search(
+                pattern, budget, self.indexes.get("query"), deadline)
+        except re.error as e:
+            self.output.message(f"Cannot search videos: Invalid pattern ({e})")
+            return
+
+        # A cancelled search is reported as the listing is cut short
+        if not complete and not deadline.cancelled:
+            self.output.message(
+                f"Search stopped after {format_timeout(budget)}, results may "
+                "be incomplete")
+        results = self._list_search_results(pattern, videos)
+        if results is not None:
+            self._offer_to_play(*results)
+
+    def _list_search_results(self, search_term, videos):
+        """Prints the unflagged search results.
+
+        Stops early when the command's deadline expires.
+
+        Returns:
+            A (count, video_ids) tuple to offer for playing, or None if
+            there were no results or the command was cancelled.
+        """
         count = 0
         search_videos = []
-
-        for i in all_videos:
-            if video_tag.lower() in i.tags:
-                if count == 0:
-                    print(f"Here are the results for {video_tag}:")
-                    count = count + 1
-                if i.video_id not in self.flagged_videos:
-                    search_videos.append(i.video_id)
-                    title_txt = str(i.title)
-                    video_id_txt = "(" + str(i.video_id) + ")"
-                    tag_txt = "[" + " ".join(i.tags) + "]"
-                    print(f"{count}) {title_txt} {video_id_txt} {tag_txt}")
-
-        if count >= 1:
-            print(
-                    "Would you like to play any of the above? If yes, specify the number of the video. \n"
-                    "If your answer is not a valid number, we will assume it's a no.")
-            try:
+        truncated = False
+
+        deadline = current_deadline()
+        for i in videos:
+            if deadline.expired:
+                self._truncated(deadline)
+                if deadline.cancelled:
+                    return None
+                truncated = True
+                break
+            if count == 0:
+                self.output.message(f"Here are the results for {search_term}:")
+                count = count + 1
+            if i.video_id not in self.flagged_videos:
+                search_videos.append(i.video_id)
+                self._output_video(i, f"{count}) {i.display_line}", count)
+
+        if count == 0:
+            if not truncated:
+                self.output.message(f"No search results for {search_term}")
+            return None
+        return count, search_videos
+
+    def _offer_to_play(self, count, search_videos):
+        """Asks which of the listed search results to play, if any."""
+        self.output.message((
+                "Would you like to play any of the above? If yes, specify the number of the video. \n"
+                "If your answer is not a valid number, we will assume it's a no."))
+        try:
+            # The listing is over; Ctrl-C at the prompt interrupts it
+            with suspended():
                 play_above = int(input())
+        except ValueError:
+            return
 
-            except ValueError:
+        if 0 < play_above <= count:
+            self.play_video(search_videos[play_above - 1])
+
+    def query_videos(self, query):
+        """Display all videos matching a boolean, field-scoped query.
+
+        Args:
+            query: The query, e.g. 'title:cat AND tag:#animal AND NOT flagged'.
+        """
+        index = self._index("query")
+        try:
+            results = run_query(query, index, self.flagged_videos)
+        except QuerySyntaxError as e:
+            self.output.message(f"Cannot run query: {e}")
+            return
+
+        if not results:
+            self.output.message(f"No search results for {query}")
+            return
+
+        self.output.message(f"Here are the results for {query}:")
+        deadline = current_deadline()
+        for count, v in enumerate(sorted(results, key=lambda x: x.title), 1):
+            if deadline.expired:
+                self._truncated(deadline)
                 return
+            self._output_video(v, f"{count}) {self._video_line(v)}", count)
 
-            if 0 < play_above <= count:
-                self.play_video(search_videos[play_above - 1])
-            else:
+    def _recommender(self):
+        return self._index("recommender")
+
+    def recommend(self, video_id, count=5):
+        """Display the unflagged videos most related to a video by tags.
+
+        Args:
+            video_id: The video_id to find related videos for.
+            count: The maximum number of videos to show.
+        """
+        video = self.video_library.get_video(video_id)
+        if video is None:
+            self.output.message("Cannot recommend videos: Video does not exist")
+            return
+
+        recommendations = self._recommender().recommend(
+            video_id, count, self.flagged_videos)
+        if not recommendations:
+            self.output.message(f"No recommendations for {video.title}")
+            return
+
+        self.output.message(f"Recommendations for {video.title}:")
+        for number, v in enumerate(recommendations, 1):
+            self._output_video(v, f"{number}) {v.display_line}", number)
+
+    def play_similar(self):
+        """Plays the unflagged video most related to the current video."""
+        if not self.status_codes['current_video_id']:
+            self.output.message("Cannot play similar video: No video is currently playing")
+            return
+
+        recommendations = self._recommender().recommend(
+            self.status_codes['current_video_id'].video_id, 1,
+            self.flagged_videos)
+        if not recommendations:
+            self.output.message("Cannot play similar video: No similar videos available")
+            return
+
+        self.play_video(recommendations[0].video_id)
+
+    def _minhash(self):
+        return self._index("minhash")
+
+    def show_similar(self, video_id, count=5):
+        """Display the unflagged videos with the most similar title and tags.
+
+        Args:
+            video_id: The video_id to find similar videos for.
+            count: The maximum number of videos to show.
+        """
+        video = self.video_library.get_video(video_id)
+        if video is None:
+            self.output.message("Cannot show similar videos: Video does not exist")
+            return
+
+        similar = self._minhash().similar(video_id, count,
+                                          excluded=self.flagged_videos)
+        if not similar:
+            self.output.message(f"No similar videos for {video.title}")
+            return
+
+        self.output.message(f"Videos similar to {video.title}:")
+        for number, (v, similarity) in enumerate(similar, 1):
+            self._output_video(
+                v, f"{number}) {v.display_line} (similarity: {similarity:.2f})",
+                number, similarity)
+
+    def show_duplicates(self, threshold=0.8):
+        """Display pairs of videos that are likely near-duplicates.
+
+        Args:
+            threshold: The minimum estimated similarity, between 0 and 1.
+        """
+        duplicates = self._minhash().duplicates(threshold)
+        if not duplicates:
+            self.output.message("No duplicate videos found")
+            return
+
+        self.output.message("Possible duplicate videos:")
+        deadline = current_deadline()
+        for first, second, similarity in duplicates:
+            if deadline.expired:
+                self._truncated(deadline)
                 return
+            self.output.duplicate(
+                first, second, similarity,
+                f"{first.title} ({first.video_id}) ~ {second.title} "
+                f"({second.video_id}) (similarity: {similarity:.2f})")
+
+    def _show_counts(self, heading, counts, count, value_format):
+        shown = 0
+        for video_id, value in counts:
+            if video_id in self.flagged_videos:
+                continue
+            video = self.video_library.get_video(video_id)
+            if video is None:
+                continue
+            if not shown:
+                self.output.message(heading)
+            shown += 1
+            self._output_video(video, f"{shown}) {video.display_line} "
+                               f"({value_format.format(value)})", shown,
+                               value)
+            if shown == count:
+                break
+        return shown
+
+    def show_top_played(self, count=5):
+        """Display the unflagged videos played the most times.
 
-        else:
-            print(f"No search results for {video_tag}")
+        Args:
+            count: The maximum number of videos to show.
+        """
+        if not self._show_counts("Top played videos:",
+                                 self.play_counts.top_played(), count,
+                                 "{} plays"):
+            self.output.message("No videos have been played yet")
+
+    def show_trending(self, count=5):
+        """Display the unflagged videos played the most recently and often.
+
+        Args:
+            count: The maximum number of videos to show.
+        """
+        if not self._show_counts("Trending videos:",
+                                 self.play_counts.trending(), count,
+                                 "score: {:.2f}"):
+            self.output.message("No videos are trending")
 
+    def _record_flag(self, action, video_id, flag_reason):
+        """Adds a flag or allow to the history, unless it is being replayed
+        from an earlier session, when its real time is not known."""
+        if not self.replaying:
+            self.flag_history.record(action, video_id, flag_reason)
 
     def flag_video(self, video_id, flag_reason=""):
         """Mark a video as flagged.
@@ -351,12 +974,12 @@ class VideoPlayer:
         if not flag_reason:
             flag_reason = "Not supplied"
 
-        if not self.video_library.videos.get(video_id, None):
-            print(f"Cannot flag video: Video does not exist")
+        if video_id not in self.video_library.videos:
+            self.output.message(f"Cannot flag video: Video does not exist")
             return
 
         if video_id in self.flagged_videos:
-            print("Cannot flag video: Video is already flagged")
+            self.output.message("Cannot flag video: Video is already flagged")
             return
 
         if self.status_codes['is_playing'] and self.status_codes['current_video_id'].video_id == video_id:
@@ -365,11 +988,10 @@ class VideoPlayer:
         self.flagged_videos[video_id] = Flagged(video_id)
         self.flagged_videos[video_id].reason = flag_reason
         self.flagged_videos[video_id].status = True
+        self._record_flag(FLAG, video_id, flag_reason)
 
-
-        print(f"Successfully flagged video: {self.video_library.get_video(video_id).title} (reason: {flag_reason})")
-
-
+        self.output.message(f"Successfully flagged video: {self.video_library.get_video(video_id).title} (reason: {flag_reason})")
+        self._notify("flag_video", video_id, flag_reason)
 
     def allow_video(self, video_id):
         """Removes a flag from a video.
@@ -377,13 +999,150 @@ class VideoPlayer:
         Args:
             video_id: The video_id to be allowed again.
         """
-        if not self.video_library.videos.get(video_id, None):
-            print(f"Cannot remove flag from video: Video does not exist")
+        if video_id not in self.video_library.videos:
+            self.output.message(f"Cannot remove flag from video: Video does not exist")
             return
 
         if video_id in self.flagged_videos:
-            del self.flagged_videos[video_id]
-            print(f"Successfully removed flag from video: {self.video_library.get_video(video_id).title}")
+            flag = self.flagged_videos.pop(video_id)
+            self._record_flag(ALLOW, video_id, flag.reason)
+            self.output.message(f"Successfully removed flag from video: {self.video_library.get_video(video_id).title}")
+            self._notify("allow_video", video_id)
         else:
-            print("Cannot remove flag from video: Video is not flagged")
+            self.output.message("Cannot remove flag from video: Video is not flagged")
+
+    def flag_videos(self, video_ids, flag_reason=""):
+        """Marks many videos as flagged, reporting only the failures.
+
+        Args:
+            video_ids: The video_ids to be flagged.
+            flag_reason: Reason for flagging the videos.
+        """
+        if not flag_reason:
+            flag_reason = "Not supplied"
+
+        # A dict keeps the ids in order and makes repeats cheap to spot
+        flagging = {}
+        failures = []
+        for video_id in video_ids:
+            if video_id not in self.video_library.videos:
+                failures.append((video_id, "Video does not exist"))
+            elif video_id in self.flagged_videos or video_id in flagging:
+                failures.append((video_id, "Video is already flagged"))
+            else:
+                flagging[video_id] = None
+
+        current = self.status_codes['current_video_id']
+        if self.status_codes['is_playing'] and current.video_id in flagging:
+            self.stop_video()
+
+        for video_id in flagging:
+            flag = Flagged(video_id)
+            flag.reason = flag_reason
+            self.flagged_videos[video_id] = flag
+            self._record_flag(FLAG, video_id, flag_reason)
+            self._notify("flag_video", video_id, flag_reason)
+        self._print_bulk_summary(
+            f"Successfully flagged {len(flagging)} videos "
+            f"(reason: {flag_reason})", "flag", failures)
+
+    def allow_videos(self, video_ids):
+        """Removes the flags from many videos, reporting only the failures.
+
+        Args:
+            video_ids: The video_ids to be allowed again.
+        """
+        allowed = 0
+        failures = []
+        for video_id in video_ids:
+            if video_id not in self.video_library.videos:
+                failures.append((video_id, "Video does not exist"))
+            elif video_id not in self.flagged_videos:
+                failures.append((video_id, "Video is not flagged"))
+            else:
+                flag = self.flagged_videos.pop(video_id)
+                self._record_flag(ALLOW, video_id, flag.reason)
+                allowed += 1
+                self._notify("allow_video", video_id)
+        self._print_bulk_summary(
+            f"Successfully removed flag from {allowed} videos", "allow",
+            failures)
+
+    def show_flag_history(self, start=None, end=None, reason=None):
+        """Display the videos flagged and allowed between two times.
+
+        Args:
+            start: The earliest time in seconds since the epoch, None for
+                the start of the history.
+            end: The latest time in seconds since the epoch, None for now.
+            reason: Only show the flags with this reason, and the allows
+                that removed them.
+        """
+        history = self.flag_history
+        if not history.count(start, end, reason=reason):
+            self.output.message("No flag history")
+            return
+
+        self.output.message("Flag history:")
+        deadline = current_deadline()
+        for event in history.events(start, end, reason=reason):
+            if deadline.expired:
+                self._truncated(deadline)
+                break
+            video = self.video_library.get_video(event.video_id)
+            title = video.title if video is not None else event.video_id
+            when = datetime.fromtimestamp(event.time).strftime(
+                "%Y-%m-%d %H:%M:%S")
+            action = "Flagged" if event.action == FLAG else "Allowed"
+            self.output.message(f"{when} {action} {title} "
+                                f"({event.video_id}) (reason: {event.reason})")
+
+        # The totals come from the indexes, so they are right even when the
+        # listing was truncated
+        self.output.message(
+            f"{history.count(start, end, FLAG, reason)} flagged, "
+            f"{history.count(start, end, ALLOW, reason)} allowed")
+        if reason is None:
+            self.output.message("Flagged by reason:")
+            counts = history.count_by_reason(start, end)
+            for flag_reason in sorted(counts, key=counts.get, reverse=True):
+                self.output.message(f"  {flag_reason}: {counts[flag_reason]}")
+
+    def show_memory(self, option=""):
+        """Displays the memory used by the library, playlists and flags.
+
+        Args:
+            option: TRACE starts tracemalloc, BASELINE records a snapshot to
+                diff against and STOP ends tracing. Empty shows the report;
+                anything else is refused.
+        """
+        option = option.upper()
+        if option == "TRACE":
+            self.memory_tracker.start()
+            self.output.message("Memory tracing started")
+            return
+        if option == "BASELINE":
+            self.memory_tracker.start()
+            self.memory_tracker.set_baseline()
+            self.output.message("Memory baseline recorded")
+            return
+        if option == "STOP":
+            if not self.memory_tracker.is_tracing:
+                self.output.message("Cannot stop memory tracing: Tracing is not running")
+                return
+            self.memory_tracker.stop()
+            self.output.message("Memory tracing stopped")
+            return
+        if option:
+            self.output.message(
+                f"Cannot show memory: Unknown option {option}")
+            return
+
+        self.output.message("Memory usage:")
+        for component, size in memory_report(self).items():
+            self.output.message(f"  {component}: {format_size(size)}")
 
+        if self.memory_tracker.is_tracing:
+            self.output.message("Top allocation sites:")
+            for location, size, count in self.memory_tracker.top_allocations():
+                self.output.message(f"  {location}: {format_size(size)} ({count} blocks)")
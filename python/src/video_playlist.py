@@ -1,9 +1,319 @@
 """A video playlist class."""
 
+import mmap
+import struct
+import tempfile
+from array import array
+from collections.abc import MutableSequence
+
+# Row ids are stored as unsigned 32 bit integers
+_ROW = struct.Struct("I")
+
+# Playlists are listed this many rows at a time
+PAGE_ROWS = 4096
+
+# The entries from which a playlist with a spill directory moves to a
+# memory-mapped file
+SPILL_AT = 1 << 20
+
+
+class VideoRows:
+    """A class used to number the videos that are in playlists.
+
+    Each video gets a row id the first time it is added to a playlist, and
+    every playlist sharing the rows stores only those ids. A video is held
+    once here however many playlists or entries refer to it.
+    """
+
+    def __init__(self):
+        self._videos = []
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._videos)
+
+    def row(self, video):
+        """Returns the row id of a video, numbering it if it is new."""
+        row = self._rows.get(video.video_id)
+        if row is None:
+            row = len(self._videos)
+            self._rows[video.video_id] = row
+            self._videos.append(video)
+        return row
+
+    def find(self, video):
+        """Returns the row id of a video, None if it has none."""
+        return self._rows.get(video.video_id)
+
+    def find_id(self, video_id):
+        """Returns the row id of a video_id, None if it has none."""
+        return self._rows.get(video_id)
+
+    def video(self, row):
+        return self._videos[row]
+
+
+class MappedRows:
+    """A class used to keep row ids in a memory-mapped temporary file.
+
+    It supports the array('I') operations a playlist uses. The file grows
+    by doubling, so appends are amortised constant time, and it is removed
+    when closed. Only the pages being read or written need to be in
+    memory.
+    """
+
+    def __init__(self, directory, rows=()):
+        """
+        Args:
+            directory: Where to create the file.
+            rows: The initial row ids.
+        """
+        data = array("I", rows).tobytes()
+        self._file = tempfile.TemporaryFile(dir=directory, suffix=".rows")
+        self._length = len(data) // _ROW.size
+        self._map = None
+        self._view = None
+        self._reserve(max(self._length, PAGE_ROWS))
+        self._map[:len(data)] = data
+
+    def _reserve(self, capacity):
+        """Makes room for capacity rows, remapping the file."""
+        if self._view is not None:
+            # A mapping cannot be resized while a view of it exists
+            self._view.release()
+            self._map.close()
+        self._file.truncate(capacity * _ROW.size)
+        self._map = mmap.mmap(self._file.fileno(), capacity * _ROW.size)
+        self._view = memoryview(self._map).cast("I")
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return self._view[:self._length][position].tolist()
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError("row index out of range")
+        return self._view[position]
+
+    def __setitem__(self, position, row):
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError("row index out of range")
+        self._view[position] = row
+
+    def __delitem__(self, position):
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError("row index out of range")
+        self.insert_rows(position, position + 1, ())
+
+    def insert_rows(self, start, stop, rows):
+        """Replaces the rows from start to stop with rows."""
+        data = array("I", rows).tobytes()
+        tail = (self._length - stop) * _ROW.size
+        length = self._length - (stop - start) + len(data) // _ROW.size
+        if length > len(self._view):
+            self._reserve(max(length, len(self._view) * 2))
+        self._map.move((start * _ROW.size) + len(data), stop * _ROW.size,
+                       tail)
+        self._map[start * _ROW.size:start * _ROW.size + len(data)] = data
+        self._length = length
+
+    def append(self, row):
+        if self._length == len(self._view):
+            self._reserve(self._length * 2)
+        self._view[self._length] = row
+        self._length += 1
+
+    def extend(self, rows):
+        self.insert_rows(self._length, self._length, rows)
+
+    def tobytes(self):
+        return self._map[:self._length * _ROW.size]
+
+    def index(self, row):
+        """Returns the first position of row; raises ValueError if absent."""
+        needle = _ROW.pack(row)
+        end = self._length * _ROW.size
+        offset = self._map.find(needle, 0, end)
+        # A match can straddle two rows; only aligned ones count
+        while offset != -1 and offset % _ROW.size:
+            offset = self._map.find(needle, offset + 1, end)
+        if offset == -1:
+            raise ValueError(f"{row} is not in rows")
+        return offset // _ROW.size
+
+    def __contains__(self, row):
+        try:
+            self.index(row)
+        except ValueError:
+            return False
+        return True
+
+    def remove(self, row):
+        del self[self.index(row)]
+
+    def close(self):
+        """Unmaps and removes the file."""
+        if self._view is not None:
+            self._view.release()
+            self._map.close()
+            self._view = None
+        self._file.close()
+
+
+class _PlaylistVideos(MutableSequence):
+    """A class used to view a playlist's row ids as a list of videos."""
+
+    def __init__(self, playlist):
+        self._playlist = playlist
+
+    @property
+    def _entries(self):
+        return self._playlist._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, position):
+        video = self._playlist.rows.video
+        if isinstance(position, slice):
+            return [video(row) for row in self._entries[position]]
+        return video(self._entries[position])
+
+    def __setitem__(self, position, video):
+        if isinstance(position, slice):
+            raise TypeError("playlist slices cannot be assigned")
+        self._entries[position] = self._playlist.rows.row(video)
+
+    def __delitem__(self, position):
+        if isinstance(position, slice):
+            raise TypeError("playlist slices cannot be deleted")
+        del self._entries[position]
+
+    def insert(self, position, video):
+        row = self._playlist.rows.row(video)
+        if isinstance(self._entries, MappedRows):
+            position = min(max(position + len(self) if position < 0
+                               else position, 0), len(self))
+            self._entries.insert_rows(position, position, (row,))
+        else:
+            self._entries.insert(position, row)
+
+    def __iter__(self):
+        return self._playlist.iter_videos()
+
+    def __contains__(self, video):
+        row = self._playlist.rows.find(video)
+        return row is not None and row in self._entries
+
+    def index(self, video, start=0, stop=None):
+        row = self._playlist.rows.find(video)
+        if row is None or start != 0 or stop is not None:
+            return super().index(video, start, stop)
+        return self._entries.index(row)
+
+    def append(self, video):
+        self._entries.append(self._playlist.rows.row(video))
+        self._playlist._check_spill()
+
+    def extend(self, videos):
+        self._entries.extend(self._playlist.rows.row(video)
+                             for video in videos)
+        self._playlist._check_spill()
+
+    def remove(self, video):
+        row = self._playlist.rows.find(video)
+        if row is None:
+            raise ValueError("video is not in playlist")
+        self._entries.remove(row)
+
 
 class Playlist:
-    """A class used to represent a Playlist."""
+    """A class used to represent a Playlist.
 
-    def __init__(self, name):
+    The videos are stored as 4 byte row ids in an array('I'), numbered by a
+    VideoRows shared with the player's other playlists, and read back
+    through the videos view, which behaves like a list of Video objects.
+    Given a spill directory, a playlist that reaches spill_at entries moves
+    its ids to a memory-mapped temporary file there, so very large
+    playlists live on disk and are paged in as they are listed.
+    """
+
+    def __init__(self, name, rows=None, spill_dir=None, spill_at=SPILL_AT):
+        """
+        Args:
+            name: The playlist name.
+            rows: The VideoRows numbering the videos. Defaults to one of
+                the playlist's own.
+            spill_dir: The directory for the memory-mapped file of a large
+                playlist. None keeps every playlist in memory.
+            spill_at: The entries from which the playlist spills.
+        """
         self.name = name
-        self.videos = []
+        self.rows = rows if rows is not None else VideoRows()
+        self._spill_dir = spill_dir
+        self._spill_at = spill_at
+        self._entries = array("I")
+
+    @property
+    def videos(self):
+        """Returns the videos of the playlist as a mutable sequence."""
+        return _PlaylistVideos(self)
+
+    @videos.setter
+    def videos(self, videos):
+        self.set_rows(self.rows.row(video) for video in videos)
+
+    def set_rows(self, rows):
+        """Replaces the playlist with row ids of its VideoRows.
+
+        rows may be read from the playlist itself, e.g. to filter it: they
+        are all read before the old entries are dropped.
+        """
+        entries = array("I", rows)
+        self.close()
+        self._entries = entries
+        self._check_spill()
+
+    def iter_rows(self, start=0, stop=None):
+        """Yields the row ids from position start up to stop, a page at a
+        time, without building a Video or copying the playlist."""
+        entries = self._entries
+        stop = len(entries) if stop is None else min(stop, len(entries))
+        for page in range(start, stop, PAGE_ROWS):
+            yield from entries[page:min(page + PAGE_ROWS, stop)]
+
+    def row_bytes(self):
+        """Returns the row ids as native unsigned 32 bit integers."""
+        return self._entries.tobytes()
+
+    def iter_videos(self, start=0, stop=None):
+        """Yields the videos from position start up to stop.
+
+        Row ids are read a page at a time, so a listing never copies the
+        whole playlist.
+        """
+        video = self.rows.video
+        for row in self.iter_rows(start, stop):
+            yield video(row)
+
+    @property
+    def spilled(self):
+        return isinstance(self._entries, MappedRows)
+
+    def _check_spill(self):
+        if self._spill_dir is not None and not self.spilled and \
+                len(self._entries) >= self._spill_at:
+            self._entries = MappedRows(self._spill_dir, self._entries)
+
+    def close(self):
+        """Removes the memory-mapped file, if the playlist spilled."""
+        if self.spilled:
+            self._entries.close()
+            self._entries = array("I")
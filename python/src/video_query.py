@@ -0,0 +1,254 @@
+"""A boolean, field-scoped query language evaluated over row bitmaps.
+
+Grammar:
+    query    := or_expr
+    or_expr  := and_expr (OR and_expr)*
+    and_expr := not_expr ([AND] not_expr)*
+    not_expr := NOT not_expr | atom
+    atom     := '(' or_expr ')' | FLAGGED | field ':' value | value
+
+Fields are title (substring, the default for a bare value), tag and id.
+Example: title:cat AND tag:#animal AND NOT flagged
+"""
+
+import re
+
+_TOKEN_RE = re.compile(r"\(|\)|[^\s()]+")
+_NGRAM = 3
+# How deeply NOTs and parentheses may nest, well inside Python's recursion
+# limit
+MAX_DEPTH = 100
+
+
+class QuerySyntaxError(Exception):
+    """A class used to represent a malformed query."""
+    pass
+
+
+def iter_rows(bitmap):
+    """Yields the row numbers set in a bitmap, in ascending order."""
+    if not bitmap:
+        return
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield byte_index * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+class BitmapIndex:
+    """A class used to represent per-term bitmaps over video rows.
+
+    Every video gets an integer row and every term a Python int whose set
+    bits are the rows containing it, so AND/OR/NOT of terms are a handful of
+    word-wise big-int operations instead of catalog scans.
+    """
+
+    def __init__(self, videos):
+        self.videos = []
+        self.rows = {}
+        self._titles = []
+        tag_rows = {}
+        ngram_rows = {}
+        for row, video in enumerate(videos):
+            self.videos.append(video)
+            self.rows[video.video_id] = row
+            title = video.search_key
+            self._titles.append(title)
+            for tag in video.tags:
+                tag_rows.setdefault(tag.lower(), []).append(row)
+            for ngram in {title[i:i + _NGRAM]
+                          for i in range(len(title) - _NGRAM + 1)}:
+                ngram_rows.setdefault(ngram, []).append(row)
+        self.all = (1 << len(self.videos)) - 1
+        self._tags = {tag: self._to_bitmap(rows)
+                      for tag, rows in tag_rows.items()}
+        self._ngrams = {ngram: self._to_bitmap(rows)
+                        for ngram, rows in ngram_rows.items()}
+
+    @staticmethod
+    def _to_bitmap(rows):
+        if not rows:
+            return 0
+        bits = bytearray((rows[-1] >> 3) + 1)
+        for row in rows:
+            bits[row >> 3] |= 1 << (row & 7)
+        return int.from_bytes(bits, "little")
+
+    def rows_for_ids(self, video_ids):
+        """Returns a bitmap of the rows of the given video ids."""
+        return self._to_bitmap(sorted(
+            self.rows[video_id] for video_id in video_ids
+            if video_id in self.rows))
+
+    def tag(self, tag):
+        """Returns the bitmap of rows tagged with tag."""
+        return self._tags.get(tag.lower(), 0)
+
+    def video_id(self, video_id):
+        """Returns the bitmap holding only the row of video_id."""
+        row = self.rows.get(video_id)
+        return 0 if row is None else 1 << row
+
+    def narrows(self, term, fraction=1 / 16):
+        """Returns whether the trigrams of term leave at most fraction of
+        the rows as candidates.
+
+        Below that a scan of every title is cheaper than going through the
+        bitmaps. Terms shorter than a trigram never narrow.
+        """
+        term = term.lower()
+        if len(term) < _NGRAM:
+            return False
+        candidates = self.all
+        for i in range(len(term) - _NGRAM + 1):
+            candidates &= self._ngrams.get(term[i:i + _NGRAM], 0)
+            if not candidates:
+                return True
+        return bin(candidates).count("1") <= len(self.videos) * fraction
+
+    def search_titles(self, search_term):
+        """Returns the videos whose titles contain search_term, ignoring
+        case, in catalog order, like VideoStorage.search_titles."""
+        return [self.videos[row] for row in iter_rows(self.title(search_term))]
+
+    def search_tag(self, video_tag):
+        """Returns the videos tagged with video_tag in catalog order, like
+        VideoStorage.search_tag."""
+        # The bitmaps ignore the case of stored tags; storages do not
+        video_tag = video_tag.lower()
+        return [self.videos[row] for row in iter_rows(self.tag(video_tag))
+                if video_tag in self.videos[row].tags]
+
+    def title(self, term):
+        """Returns the bitmap of rows whose title contains term.
+
+        Candidates are the AND of the term's trigram bitmaps and are then
+        verified, since trigrams alone can match out of order. Terms shorter
+        than a trigram are checked against every title.
+        """
+        term = term.lower()
+        if len(term) < _NGRAM:
+            return self._to_bitmap([row for row, title
+                                    in enumerate(self._titles)
+                                    if term in title])
+        candidates = self.all
+        for i in range(len(term) - _NGRAM + 1):
+            candidates &= self._ngrams.get(term[i:i + _NGRAM], 0)
+            if not candidates:
+                return 0
+        # Built in one go: OR-ing in one bit at a time copies the growing
+        # int every time, which is quadratic in the number of matches
+        return self._to_bitmap([row for row in iter_rows(candidates)
+                                if term in self._titles[row]])
+
+
+class _Parser:
+    """A recursive descent parser that evaluates as it parses."""
+
+    def __init__(self, tokens, index, flagged):
+        self._tokens = tokens
+        self._pos = 0
+        self._depth = 0
+        self._index = index
+        self._flagged = flagged
+
+    def _peek(self):
+        if self._pos < len(self._tokens):
+            return self._tokens[self._pos]
+        return None
+
+    def _next(self):
+        token = self._peek()
+        self._pos += 1
+        return token
+
+    def parse(self):
+        result = self._or()
+        if self._peek() is not None:
+            raise QuerySyntaxError(f"Unexpected '{self._peek()}'")
+        return result
+
+    def _or(self):
+        result = self._and()
+        while self._peek() is not None and self._peek().upper() == "OR":
+            self._next()
+            result |= self._and()
+        return result
+
+    def _and(self):
+        result = self._not()
+        while self._peek() is not None and self._peek() != ")" and \
+                self._peek().upper() != "OR":
+            if self._peek().upper() == "AND":
+                self._next()
+            result &= self._not()
+        return result
+
+    def _nest(self):
+        """Counts one more level of NOT or parentheses."""
+        self._depth += 1
+        if self._depth > MAX_DEPTH:
+            raise QuerySyntaxError(
+                f"Query nested more than {MAX_DEPTH} levels deep")
+
+    def _not(self):
+        if self._peek() is not None and self._peek().upper() == "NOT":
+            self._next()
+            self._nest()
+            result = self._index.all & ~self._not()
+            self._depth -= 1
+            return result
+        return self._atom()
+
+    def _atom(self):
+        token = self._next()
+        if token is None:
+            raise QuerySyntaxError("Unexpected end of query")
+        if token == "(":
+            self._nest()
+            result = self._or()
+            if self._next() != ")":
+                raise QuerySyntaxError("Missing ')'")
+            self._depth -= 1
+            return result
+        if token == ")" or token.upper() in ("AND", "OR"):
+            raise QuerySyntaxError(f"Unexpected '{token}'")
+        if token.upper() == "FLAGGED":
+            return self._flagged
+
+        field, sep, value = token.partition(":")
+        if not sep:
+            return self._index.title(token)
+        if not value:
+            raise QuerySyntaxError(f"Missing value for '{field}'")
+        field = field.lower()
+        if field == "title":
+            return self._index.title(value)
+        if field == "tag":
+            return self._index.tag(value)
+        if field == "id":
+            return self._index.video_id(value)
+        raise QuerySyntaxError(f"Unknown field '{field}'")
+
+
+def run_query(query, index, flagged_ids=()):
+    """Evaluates a query against a BitmapIndex.
+
+    Args:
+        query: The query string.
+        index: The BitmapIndex to evaluate against.
+        flagged_ids: The ids of the currently flagged videos.
+
+    Returns:
+        The list of matching videos, in row order.
+
+    Raises:
+        QuerySyntaxError: If the query cannot be parsed.
+    """
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        raise QuerySyntaxError("Empty query")
+    bitmap = _Parser(tokens, index, index.rows_for_ids(flagged_ids)).parse()
+    return [index.videos[row] for row in iter_rows(bitmap)]
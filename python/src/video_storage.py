@@ -0,0 +1,257 @@
+"""Storage backends for the video library."""
+
+import json
+import sqlite3
+import sys
+from collections.abc import Mapping
+
+from video import Video
+
+
+class VideoStorage(Mapping):
+    """A class used to represent where the library keeps its videos.
+
+    A storage is a read-only mapping of video_id to Video that keeps the
+    catalog order, plus the bulk load and search operations the library
+    needs. Search results come back in catalog order unless a backend
+    documents otherwise. Subclasses implement __getitem__, __iter__, __len__,
+    add_videos, search_titles and search_tag.
+    """
+
+    # Whether search_titles and search_tag scan the catalog in catalog
+    # order, so an index over the library can answer them instead
+    scans_catalog = False
+
+    def add_videos(self, videos):
+        """Adds an iterable of Video objects to the storage."""
+        raise NotImplementedError
+
+    def values_by_title(self):
+        """Returns the videos sorted by title, ties kept in catalog order.
+
+        Backends that can read their videos in that order should stream
+        them rather than sort every video in memory.
+        """
+        return sorted(self.values(), key=lambda video: video.title)
+
+    def search_titles(self, search_term):
+        """Returns the videos whose titles contain search_term, ignoring
+        case, in catalog order."""
+        raise NotImplementedError
+
+    def search_tag(self, video_tag):
+        """Returns the videos tagged with video_tag, in catalog order."""
+        raise NotImplementedError
+
+    def close(self):
+        """Releases any resources held by the storage."""
+        pass
+
+
+class InMemoryStorage(VideoStorage):
+    """A class used to keep the whole catalog in a dict."""
+
+    scans_catalog = True
+
+    def __init__(self):
+        self._videos = {}
+        self._by_title = None
+
+    def __getitem__(self, video_id):
+        return self._videos[video_id]
+
+    def __iter__(self):
+        return iter(self._videos)
+
+    def __len__(self):
+        return len(self._videos)
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + sys.getsizeof(self._videos)
+
+    def values(self):
+        return self._videos.values()
+
+    def values_by_title(self):
+        # The videos are in memory anyway, so the order is kept once
+        # computed
+        if self._by_title is None:
+            self._by_title = super().values_by_title()
+        return self._by_title
+
+    def add_videos(self, videos):
+        self._by_title = None
+        for video in videos:
+            self._videos[video.video_id] = video
+
+    def search_titles(self, search_term):
+        search_key = search_term.lower()
+        return [video for video in self._videos.values()
+                if search_key in video.search_key]
+
+    def search_tag(self, video_tag):
+        video_tag = video_tag.lower()
+        return [video for video in self._videos.values()
+                if video_tag in video.tags]
+
+
+class SqliteStorage(VideoStorage):
+    """A class used to keep the catalog in a local SQLite database.
+
+    Titles are indexed by an FTS5 trigram table, so substring searches of
+    three or more characters are index lookups. Tags live in their own
+    indexed table, and each video's tags are kept with it as a JSON list,
+    so a tag may contain any character. Videos are only built when a query
+    returns them, and listings by title stream rows from the title index,
+    so the catalog does not need to fit in memory.
+    """
+
+    _BATCH_SIZE = 10_000
+
+    # The database user_version from which tags are stored as JSON; older
+    # databases joined them with commas
+    _JSON_TAGS_VERSION = 1
+
+    def __init__(self, path=":memory:"):
+        """Opens or creates the database.
+
+        Args:
+            path: The database file. Defaults to a private in-memory database.
+        """
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS videos (
+                row INTEGER PRIMARY KEY,
+                video_id TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                tags TEXT NOT NULL,
+                duration REAL
+            );
+            CREATE TABLE IF NOT EXISTS tags (
+                tag TEXT NOT NULL,
+                row INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tags_by_tag ON tags (tag, row);
+            CREATE INDEX IF NOT EXISTS videos_by_title ON videos (title, row);
+        """)
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version < self._JSON_TAGS_VERSION and self._db.execute(
+                "SELECT 1 FROM videos LIMIT 1").fetchone() is None:
+            version = self._JSON_TAGS_VERSION
+            self._db.execute(f"PRAGMA user_version = {version}")
+        self._json_tags = version >= self._JSON_TAGS_VERSION
+        columns = [column[1] for column in
+                   self._db.execute("PRAGMA table_info(videos)")]
+        if "duration" not in columns:
+            # Databases built before durations were imported
+            self._db.execute("ALTER TABLE videos ADD COLUMN duration REAL")
+        try:
+            self._db.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS titles USING fts5(
+                    title, content='videos', content_rowid='row',
+                    tokenize='trigram')
+            """)
+            self._has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 or the trigram tokenizer
+            self._has_fts = False
+
+    def _to_video(self, row):
+        video_id, title, tags, duration = row
+        if self._json_tags:
+            tags = json.loads(tags)
+        else:
+            tags = tags.split(",") if tags else []
+        return Video(title, video_id, tags, duration)
+
+    def __getitem__(self, video_id):
+        row = self._db.execute(
+            "SELECT video_id, title, tags, duration FROM videos "
+            "WHERE video_id = ?", (video_id,)).fetchone()
+        if row is None:
+            raise KeyError(video_id)
+        return self._to_video(row)
+
+    def __contains__(self, video_id):
+        return self._db.execute(
+            "SELECT 1 FROM videos WHERE video_id = ?",
+            (video_id,)).fetchone() is not None
+
+    def __iter__(self):
+        for (video_id,) in self._db.execute(
+                "SELECT video_id FROM videos ORDER BY row"):
+            yield video_id
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def values(self):
+        return [self._to_video(row) for row in self._db.execute(
+            "SELECT video_id, title, tags, duration FROM videos "
+            "ORDER BY row")]
+
+    def values_by_title(self):
+        # Rows come off the title index as they are listed; nothing is kept
+        cursor = self._db.execute(
+            "SELECT video_id, title, tags, duration FROM videos "
+            "ORDER BY title, row")
+        return (self._to_video(row) for row in cursor)
+
+    def add_videos(self, videos):
+        batch = []
+        with self._db:
+            for video in videos:
+                batch.append(video)
+                if len(batch) >= self._BATCH_SIZE:
+                    self._insert(batch)
+                    batch = []
+            self._insert(batch)
+
+    def _insert(self, videos):
+        start = self._db.execute(
+            "SELECT COALESCE(MAX(row), 0) FROM videos").fetchone()[0] + 1
+        rows = [(start + offset, video.video_id, video.title,
+                 self._encode_tags(video.tags), video.duration)
+                for offset, video in enumerate(videos)]
+        self._db.executemany(
+            "INSERT INTO videos (row, video_id, title, tags, duration) "
+            "VALUES (?, ?, ?, ?, ?)", rows)
+        self._db.executemany(
+            "INSERT INTO tags (tag, row) VALUES (?, ?)",
+            [(tag, start + offset)
+             for offset, video in enumerate(videos) for tag in video.tags])
+        if self._has_fts:
+            self._db.executemany(
+                "INSERT INTO titles (rowid, title) VALUES (?, ?)",
+                [(row, title) for row, _, title, _, _ in rows])
+
+    def _encode_tags(self, tags):
+        if self._json_tags:
+            return json.dumps(list(tags))
+        return ",".join(tags)
+
+    def search_titles(self, search_term):
+        search_key = search_term.lower()
+        if self._has_fts and len(search_key) >= 3:
+            # A quoted trigram phrase matches the term as a substring
+            phrase = '"' + search_key.replace('"', '""') + '"'
+            cursor = self._db.execute(
+                "SELECT v.video_id, v.title, v.tags, v.duration FROM titles "
+                "JOIN videos v ON v.row = titles.rowid "
+                "WHERE titles MATCH ? ORDER BY v.row", (phrase,))
+        else:
+            cursor = self._db.execute(
+                "SELECT video_id, title, tags, duration FROM videos "
+                "WHERE instr(lower(title), ?) > 0 ORDER BY row",
+                (search_key,))
+        return [self._to_video(row) for row in cursor]
+
+    def search_tag(self, video_tag):
+        cursor = self._db.execute(
+            "SELECT v.video_id, v.title, v.tags, v.duration FROM tags t "
+            "JOIN videos v ON v.row = t.row WHERE t.tag = ? ORDER BY v.row",
+            (video_tag.lower(),))
+        return [self._to_video(row) for row in cursor]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,77 @@
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.video_player import VideoPlayer
+
+
+def test_add_and_remove_bulk(capfd, tmp_path):
+    id_file = tmp_path / "ids.txt"
+    id_file.write_text("funny_dogs_video_id\n\nlife_at_google_video_id\n")
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    player.create_playlist("my_playlist")
+    player.flag_video("nothing_video_id")
+    parser.execute_command(["ADD_TO_PLAYLIST_BULK", "my_PLAYlist",
+                            "amazing_cats_video_id", "does_not_exist",
+                            "amazing_cats_video_id", "nothing_video_id",
+                            f"@{id_file}"])
+    parser.execute_command(["REMOVE_FROM_PLAYLIST_BULK", "my_playlist",
+                            "amazing_cats_video_id", "another_cat_video_id",
+                            "life_at_google_video_id"])
+    player.add_to_playlist_bulk("another_playlist", ["amazing_cats_video_id"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[2:] == [
+        "Added 3 videos to my_PLAYlist",
+        "Could not add 3 videos:",
+        "  does_not_exist: Video does not exist",
+        "  amazing_cats_video_id: Video already added",
+        "  nothing_video_id: Video is currently flagged (reason: Not supplied)",
+        "Removed 2 videos from my_playlist",
+        "Could not remove 1 videos:",
+        "  another_cat_video_id: Video is not in playlist",
+        "Cannot add videos to another_playlist: Playlist does not exist",
+    ]
+    assert [video.video_id for video in player.playlists["my_playlist"].videos] \
+        == ["funny_dogs_video_id"]
+
+
+def test_flag_and_allow_bulk(capfd):
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    events = []
+    player.listeners.append(lambda *event: events.append(event))
+    player.play_video("amazing_cats_video_id")
+    parser.execute_command(["FLAG_VIDEOS", "amazing_cats_video_id",
+                            "funny_dogs_video_id", "funny_dogs_video_id",
+                            "reason=spam"])
+    parser.execute_command(["ALLOW_VIDEOS", "funny_dogs_video_id",
+                            "nothing_video_id", "does_not_exist"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[1:] == [
+        "Stopping video: Amazing Cats",
+        "Successfully flagged 2 videos (reason: spam)",
+        "Could not flag 1 videos:",
+        "  funny_dogs_video_id: Video is already flagged",
+        "Successfully removed flag from 1 videos",
+        "Could not allow 2 videos:",
+        "  nothing_video_id: Video is not flagged",
+        "  does_not_exist: Video does not exist",
+    ]
+    assert list(player.flagged_videos) == ["amazing_cats_video_id"]
+    assert events[2:] == [
+        ("flag_video", "amazing_cats_video_id", "spam"),
+        ("flag_video", "funny_dogs_video_id", "spam"),
+        ("allow_video", "funny_dogs_video_id"),
+    ]
+
+
+def test_bulk_argument_errors(tmp_path):
+    parser = CommandParser(VideoPlayer())
+    with pytest.raises(CommandException):
+        parser.execute_command(["ADD_TO_PLAYLIST_BULK", "my_playlist"])
+    with pytest.raises(CommandException):
+        parser.execute_command(["FLAG_VIDEOS", "reason=spam"])
+    with pytest.raises(CommandException):
+        parser.execute_command(["ALLOW_VIDEOS", f"@{tmp_path / 'missing'}"])
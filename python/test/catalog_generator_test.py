@@ -0,0 +1,18 @@
+from src.catalog_generator import generate_catalog, generate_rows
+from src.video_library import VideoLibrary
+
+
+def test_generate_rows_is_deterministic():
+    assert list(generate_rows(100, seed=7)) == list(generate_rows(100, seed=7))
+    assert list(generate_rows(100, seed=7)) != list(generate_rows(100, seed=8))
+
+
+def test_generated_catalog_loads(tmp_path):
+    path = tmp_path / "videos.txt"
+    generate_catalog(path, 1000, seed=1)
+    library = VideoLibrary(path)
+    assert len(library.get_all_videos()) == 1000
+    for title, video_id, tags in generate_rows(10, seed=1):
+        video = library.get_video(video_id)
+        assert video.title == title
+        assert video.tags == tags
@@ -0,0 +1,92 @@
+import bz2
+import gzip
+import json
+import lzma
+
+import pytest
+
+from src.catalog_import import CatalogImporter, detect_format
+from src.video_library import VideoLibrary
+
+_ROWS = [
+    ("Funny Dogs", "funny_dogs_video_id", ["#dog", "#animal"]),
+    ("Video about nothing", "nothing_video_id", []),
+]
+
+
+def _write_jsonl(path, opener=open):
+    with opener(path, "wt") as f:
+        for title, video_id, tags in _ROWS:
+            f.write(json.dumps(
+                {"title": title, "video_id": video_id, "tags": tags}) + "\n")
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("videos.txt", "pipe"), ("export.csv.gz", "csv"),
+    ("export.jsonl.xz", "jsonl"), ("export.ndjson", "jsonl"),
+    ("export.bz2", "pipe"),
+])
+def test_detect_format(path, expected):
+    assert detect_format(path) == expected
+
+
+@pytest.mark.parametrize("name, opener", [
+    ("export.jsonl", open), ("export.jsonl.gz", gzip.open),
+    ("export.jsonl.bz2", bz2.open), ("export.jsonl.xz", lzma.open),
+])
+def test_import_compressed_jsonl(tmp_path, name, opener):
+    path = tmp_path / name
+    _write_jsonl(path, opener)
+    library = VideoLibrary(path)
+    assert library.get_video("funny_dogs_video_id").tags == ("#dog", "#animal")
+    assert library.get_video("nothing_video_id").tags == ()
+    assert library.import_stats.rows == 2
+    assert library.import_stats.rejected == 0
+
+
+def test_import_csv_with_header(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text('title,video_id,tags\n'
+                    'Funny Dogs,funny_dogs_video_id,"#dog, #animal"\n'
+                    '"Cats, again",cats_video_id,\n')
+    library = VideoLibrary(path)
+    assert len(library.videos) == 2
+    assert library.get_video("funny_dogs_video_id").tags == ("#dog", "#animal")
+    assert library.get_video("cats_video_id").title == "Cats, again"
+
+
+def test_import_csv_with_capitalised_header(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text('Title,Video_ID,Tags,Duration\n'
+                    'Funny Dogs,funny_dogs_video_id,#dog,1:30\n')
+    library = VideoLibrary(path)
+    assert [video.video_id for video in library.get_all_videos()] == [
+        "funny_dogs_video_id"]
+    assert library.import_stats.rejected == 0
+
+
+def test_import_rejects_bad_rows(tmp_path):
+    path = tmp_path / "export.jsonl"
+    path.write_text('{"title": "Funny Dogs", "video_id": "dogs_video_id"}\n'
+                    'not json\n'
+                    '{"title": "", "video_id": "empty_video_id"}\n'
+                    '{"title": "Again", "video_id": "dogs_video_id"}\n'
+                    '["a list"]\n'
+                    '{"title": "Cats", "video_id": "cats_video_id", '
+                    '"tags": "#cat, #animal"}\n')
+    importer = CatalogImporter(path, batch_size=2)
+    videos = list(importer)
+    assert [video.video_id for video in videos] == [
+        "dogs_video_id", "cats_video_id"]
+    assert videos[1].tags == ("#cat", "#animal")
+    assert importer.stats.rows == 2
+    assert importer.stats.rejected == 4
+    assert [line for line, _ in importer.stats.rejections] == [2, 3, 4, 5]
+    assert "duplicate video_id dogs_video_id" in importer.stats.rejections[2][1]
+
+
+def test_import_default_catalog_stats():
+    library = VideoLibrary()
+    assert library.import_stats.rows == 5
+    assert library.import_stats.rejected == 0
+    assert "Imported 5 videos, rejected 0 rows" in str(library.import_stats)
@@ -0,0 +1,111 @@
+import pytest
+
+# The player imports its modules by their flat names, so it sees this copy
+# of the deadline module, with its own current deadline, not src.deadline
+import deadline as player_deadline
+
+from src.command_parser import CommandException, CommandParser
+from src.deadline import (Deadline, cancel_current, current_deadline,
+                          format_timeout, parse_timeout)
+from src.video_player import VideoPlayer
+
+
+class FakeClock:
+    """Moves on by step seconds every time it is read."""
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def test_parse_and_format_timeout():
+    assert parse_timeout("200ms") == pytest.approx(0.2)
+    assert parse_timeout("1.5s") == 1.5
+    assert parse_timeout("2M") == 120
+    assert parse_timeout("3") == 3
+    assert parse_timeout("off") is None
+    for text in ("", "0s", "-1s", "2h", "fast"):
+        with pytest.raises(ValueError):
+            parse_timeout(text)
+    assert format_timeout(0.2) == "200ms"
+    assert format_timeout(2.0) == "2s"
+    assert format_timeout(None) == "OFF"
+
+
+def test_deadline_expires_and_cancels():
+    deadline = Deadline(3, clock=FakeClock(1))
+    assert not deadline.expired
+    assert deadline.remaining() == 1
+    assert deadline.expired
+    assert deadline.describe() == "timed out after 3s"
+
+    assert not current_deadline().expired
+    assert not cancel_current()
+    with Deadline() as deadline:
+        assert current_deadline() is deadline
+        assert not deadline.expired
+        assert deadline.remaining() is None
+        assert cancel_current()
+        assert not cancel_current()
+        assert deadline.expired
+        assert deadline.describe() == "cancelled"
+    assert current_deadline() is not deadline
+
+
+def test_listing_is_truncated(capfd):
+    player = VideoPlayer()
+    # Each read moves the clock on a second: three videos fit in 4s
+    with player_deadline.Deadline(4, clock=FakeClock(1)):
+        player.show_all_videos()
+    with player_deadline.Deadline() as deadline:
+        deadline.cancel()
+        player.search_videos("cat")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 6
+    assert lines[0] == "Here's a list of all available videos:"
+    assert lines[1].startswith("Amazing Cats (amazing_cats_video_id)")
+    assert lines[4] == "Results truncated: command timed out after 4s"
+    assert lines[5] == "Results truncated: command cancelled"
+
+
+def test_ctrl_c_at_the_play_prompt_is_not_swallowed(monkeypatch):
+    player = VideoPlayer()
+    cancelled = []
+
+    def answer():
+        # What Ctrl-C does: with no command to cancel, it interrupts input
+        cancelled.append(player_deadline.cancel_current())
+        return "no"
+
+    monkeypatch.setattr("builtins.input", answer)
+    with player_deadline.Deadline() as deadline:
+        player.search_videos("cat")
+        assert player_deadline.current_deadline() is deadline
+    assert cancelled == [False]
+    assert not deadline.cancelled
+
+
+def test_timeout_command(capfd, monkeypatch):
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    timeouts = []
+    monkeypatch.setattr(player, "number_of_videos",
+                        lambda: timeouts.append(
+                            player_deadline.current_deadline().seconds))
+    parser.execute_command(["NUMBER_OF_VIDEOS"])
+    parser.execute_command(["TIMEOUT", "200ms", "NUMBER_OF_VIDEOS"])
+    parser.execute_command(["TIMEOUT", "2s"])
+    parser.execute_command(["NUMBER_OF_VIDEOS"])
+    parser.execute_command(["TIMEOUT", "1m", "NUMBER_OF_VIDEOS"])
+    assert timeouts == [None, pytest.approx(0.2), 2, 60]
+    with pytest.raises(CommandException):
+        parser.execute_command(["TIMEOUT", "soon", "NUMBER_OF_VIDEOS"])
+    with pytest.raises(CommandException):
+        parser.execute_command(["TIMEOUT"])
+    out, err = capfd.readouterr()
+    assert out == "Default timeout: 2s\n"
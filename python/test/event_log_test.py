@@ -0,0 +1,95 @@
+import threading
+
+from src.event_log import AsyncEventLog
+from src.video_player import VideoPlayer
+
+
+def _lines(path):
+    return [line.split("\t")[1:] for line in path.read_text().splitlines()]
+
+
+def test_logs_audited_events_on_close(tmp_path):
+    path = tmp_path / "events.log"
+    log = AsyncEventLog(path, flush_interval=60)
+    player = VideoPlayer()
+    log.attach(player)
+    player.play_video("amazing_cats_video_id")
+    player.pause_video()
+    player.continue_video()
+    player.create_playlist("my_playlist")
+    player.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    player.stop_video()
+    log.close()
+    assert _lines(path) == [
+        ["play_video", "amazing_cats_video_id"],
+        ["pause_video"],
+        ["continue_video"],
+        ["flag_video", "funny_dogs_video_id", "dont_like_dogs"],
+        ["stop_video"],
+    ]
+    assert log.written == 5
+    assert player.listeners == []
+
+
+def test_flushes_after_interval(tmp_path):
+    path = tmp_path / "events.log"
+    log = AsyncEventLog(path, flush_interval=0.01)
+    log.record("play_video", "a")
+    for _ in range(200):
+        if path.read_text():
+            break
+        threading.Event().wait(0.01)
+    assert _lines(path) == [["play_video", "a"]]
+    log.close()
+
+
+def test_rotates_log_files(tmp_path):
+    path = tmp_path / "events.log"
+    log = AsyncEventLog(path, batch_size=1, max_bytes=100, backups=2)
+    for number in range(20):
+        log.record("play_video", f"video_{number}")
+    log.close()
+    assert (tmp_path / "events.log.1").exists()
+    assert (tmp_path / "events.log.2").exists()
+    assert not (tmp_path / "events.log.3").exists()
+    assert _lines(path)[-1] == ["play_video", "video_19"]
+
+
+def test_overflow_policies(tmp_path):
+    for overflow, kept in (("drop_newest", "video_0"),
+                           ("drop_oldest", "video_99")):
+        path = tmp_path / f"{overflow}.log"
+        log = AsyncEventLog(path, max_queue=1, overflow=overflow)
+        # Hold the writer inside its first batch so the queue fills up
+        writing, release = threading.Event(), threading.Event()
+        write = log._write
+
+        def slow_write(batch):
+            writing.set()
+            release.wait()
+            write(batch)
+
+        log._write = slow_write
+        log.record("stop_video")
+        writing.wait()
+        for number in range(100):
+            log.record("play_video", f"video_{number}")
+        release.set()
+        log.close()
+        assert log.dropped == 99
+        assert _lines(path) == [["stop_video"], ["play_video", kept]]
+
+
+def test_close_closes_the_file_after_a_failed_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(threading, "excepthook", lambda args: None)
+    log = AsyncEventLog(tmp_path / "events.log")
+
+    def failing_write(batch):
+        raise OSError("disk full")
+
+    log._write = failing_write
+    log.record("play_video", "a")
+    log._thread.join(10)
+    assert not log._thread.is_alive()
+    log.close()
+    assert log._file.closed
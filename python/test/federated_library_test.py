@@ -0,0 +1,70 @@
+from src.federated_library import FederatedLibrary
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _library(tmp_path, name, rows):
+    catalog = tmp_path / name
+    catalog.write_text("".join(f"{row}\n" for row in rows))
+    return VideoLibrary(catalog)
+
+
+def _federated(tmp_path):
+    return FederatedLibrary([
+        _library(tmp_path, "uk.txt", [
+            "Zebra Crossing | zebra_video_id | #animal",
+            "Amazing Cats | cats_video_id | #cat , #animal",
+        ]),
+        _library(tmp_path, "us.txt", [
+            "Cats In Boxes | cats_video_id | #cat",
+            "Baseball Bloopers | baseball_video_id | #sport",
+            "Another Cat Video | another_cat_video_id | #cat",
+        ]),
+    ])
+
+
+def test_first_mounted_catalog_wins_collisions(tmp_path):
+    library = _federated(tmp_path)
+    assert len(library.videos) == 4
+    assert library.get_video("cats_video_id").title == "Amazing Cats"
+    assert library.get_video("baseball_video_id").title == "Baseball Bloopers"
+    assert library.get_video("missing_video_id") is None
+    assert "zebra_video_id" in library.videos
+    assert [video.video_id for video in library.get_all_videos()] == [
+        "zebra_video_id", "cats_video_id", "baseball_video_id",
+        "another_cat_video_id"]
+    assert [video.title for video in library.search_titles("cat")] == [
+        "Amazing Cats", "Another Cat Video"]
+    assert [video.video_id for video in library.search_tag("#cat")] == [
+        "cats_video_id", "another_cat_video_id"]
+
+
+def test_listing_merges_sorted_sources(tmp_path):
+    library = _federated(tmp_path)
+    assert [video.title for video in library.videos_by_title()] == [
+        "Amazing Cats", "Another Cat Video", "Baseball Bloopers",
+        "Zebra Crossing"]
+    hidden = library.mount(_library(tmp_path, "de.txt", [
+        "Zebra Crossing | zebra_video_id | #animal",
+        "Alpine Hiking | hiking_video_id | #outdoors",
+    ]))
+    assert hidden == {"zebra_video_id"}
+    assert len(library.videos) == 5
+    assert [video.title for video in library.videos_by_title()][:2] == [
+        "Alpine Hiking", "Amazing Cats"]
+
+
+def test_player_over_federated_library(tmp_path, capfd):
+    player = VideoPlayer(_federated(tmp_path))
+    player.number_of_videos()
+    player.show_all_videos()
+    player.play_video("baseball_video_id")
+    player.query_videos("tag:#cat")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[0] == "4 videos in the library"
+    assert lines[2] == "Amazing Cats (cats_video_id) [#cat #animal] "
+    assert lines[6] == "Playing video: Baseball Bloopers"
+    assert lines[8:] == [
+        "1) Amazing Cats (cats_video_id) [#cat #animal] ",
+        "2) Another Cat Video (another_cat_video_id) [#cat] "]
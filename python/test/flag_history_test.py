@@ -0,0 +1,112 @@
+from datetime import datetime
+
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.flag_history import ALLOW, FLAG, FlagEvent, FlagHistory
+from src.player_events import EventStore
+from src.video_player import VideoPlayer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_range_and_count_queries():
+    clock = FakeClock()
+    history = FlagHistory(clock)
+    for now, action, video_id, reason in [
+            (10, FLAG, "a", "spam"), (20, FLAG, "b", "dont_like"),
+            (30, ALLOW, "a", None), (30, FLAG, "c", "spam"),
+            (40, FLAG, "a", "dont_like"), (35, ALLOW, "c", None)]:
+        clock.now = now
+        history.record(action, video_id, reason)
+
+    assert len(history) == 6
+    assert history.count() == 6
+    assert history.count(20, 30) == 3
+    assert history.count(31, 39) == 0
+    assert history.count(50, 10) == 0
+    assert history.count(action=FLAG) == 4
+    assert history.count(25, None, FLAG) == 2
+    assert history.count(action=FLAG, reason="spam") == 2
+    assert history.count(reason="spam") == 4
+    assert history.count_by_reason(15) == {"dont_like": 2, "spam": 1}
+    assert history.count_by_reason(action=ALLOW) == {"spam": 2}
+    # The clock stepped back; the allow of c keeps the times sorted
+    assert history.events(30, 40, reason="spam") == [
+        FlagEvent(30, ALLOW, "a", "spam"), FlagEvent(30, FLAG, "c", "spam"),
+        FlagEvent(40, ALLOW, "c", "spam")]
+    assert [event.video_id for event in history.events(20, 20)] == ["b"]
+
+
+def test_flag_history_command(capfd):
+    player = VideoPlayer()
+    clock = FakeClock()
+    player.flag_history = FlagHistory(clock)
+    parser = CommandParser(player)
+    start = datetime(2024, 5, 1, 9, 0).timestamp()
+    clock.now = start
+    player.flag_video("amazing_cats_video_id", "spam")
+    clock.now = start + 60
+    player.flag_videos(["funny_dogs_video_id", "nothing_video_id"], "spam")
+    clock.now = start + 120
+    player.allow_videos(["funny_dogs_video_id"])
+    clock.now = start + 3600
+    player.allow_video("amazing_cats_video_id")
+    player.flag_video("life_at_google_video_id")
+    capfd.readouterr()
+
+    parser.execute_command(["FLAG_HISTORY", "2024-05-01T09:01",
+                            "2024-05-01T09:30"])
+    parser.execute_command(["FLAG_HISTORY", "2024-05-01T10:00",
+                            "reason=spam"])
+    parser.execute_command(["FLAG_HISTORY", "2024-05-02"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Flag history:",
+        "2024-05-01 09:01:00 Flagged Funny Dogs (funny_dogs_video_id) "
+        "(reason: spam)",
+        "2024-05-01 09:01:00 Flagged Video about nothing (nothing_video_id) "
+        "(reason: spam)",
+        "2024-05-01 09:02:00 Allowed Funny Dogs (funny_dogs_video_id) "
+        "(reason: spam)",
+        "2 flagged, 1 allowed",
+        "Flagged by reason:",
+        "  spam: 2",
+        "Flag history:",
+        "2024-05-01 10:00:00 Allowed Amazing Cats (amazing_cats_video_id) "
+        "(reason: spam)",
+        "0 flagged, 1 allowed",
+        "No flag history",
+    ]
+
+    with pytest.raises(CommandException):
+        parser.execute_command(["FLAG_HISTORY", "yesterday"])
+    with pytest.raises(CommandException):
+        parser.execute_command(["FLAG_HISTORY", "2024-05-01", "2024-05-02",
+                                "2024-05-03"])
+
+
+def test_recovered_flags_are_not_in_history(tmp_path, capfd):
+    player = VideoPlayer()
+    store = EventStore(tmp_path)
+    store.attach(player)
+    player.flag_video("amazing_cats_video_id", "spam")
+    player.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    player.allow_video("amazing_cats_video_id")
+    store.close()
+
+    restored = VideoPlayer()
+    EventStore(tmp_path).attach(restored)
+    assert "funny_dogs_video_id" in restored.flagged_videos
+    assert len(restored.flag_history) == 0
+    # The allow still knows the reason of the flag from the last session
+    restored.allow_video("funny_dogs_video_id")
+    assert [(event.action, event.reason)
+            for event in restored.flag_history.events()] == [
+        (ALLOW, "dont_like_dogs")]
@@ -0,0 +1,122 @@
+import threading
+
+from src.catalog_generator import generate_catalog
+from src.video_library import VideoLibrary
+from src.video_player import INDEX_CLASSES, VideoPlayer
+from src.video_query import BitmapIndex
+from src.video_storage import SqliteStorage
+
+
+def test_index_searches_match_library_scan(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    generate_catalog(catalog, 2000, seed=3)
+    library = VideoLibrary(catalog)
+    index = BitmapIndex(library.get_all_videos())
+    for term in ("a", "the", "cat", "zzz"):
+        assert index.search_titles(term) == library.search_titles(term)
+    assert not index.narrows("a")
+    assert index.narrows("zzz")
+    assert not index.narrows("cat") or \
+        len(library.search_titles("cat")) <= 2000 / 16
+    for video in library.get_all_videos()[:20]:
+        for tag in video.tags:
+            assert index.search_tag(tag) == library.search_tag(tag)
+
+
+def test_background_build_switches_searches_to_index(capfd):
+    player = VideoPlayer()
+    assert player._searchable() is player.video_library
+    player.build_indexes_in_background()
+    for name in INDEX_CLASSES:
+        assert player.index_builder.wait(name, timeout=10)
+    assert player._searchable() is player.indexes["query"]
+    # Too short for the trigrams to narrow anything
+    assert player._searchable("ca") is player.video_library
+    # No title has all of its trigrams
+    assert player._searchable("zzz") is player.indexes["query"]
+    player.show_index_status()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[0] == "Index status:"
+    assert lines[1].startswith("  query: ready (")
+
+
+def test_commands_wait_for_the_build_under_way(capfd, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda: "no")
+    player = VideoPlayer()
+    release = threading.Event()
+    built = []
+    build_index = player._build_index
+
+    def slow_build(name, *args):
+        release.wait()
+        built.append(name)
+        return build_index(name, *args)
+
+    player._build_index = slow_build
+    player.build_indexes_in_background()
+    player.show_index_status()
+    player.search_videos_tag("#cat")
+    threading.Timer(0.05, release.set).start()
+    player.recommend("amazing_cats_video_id", 1)
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[1].startswith("  query: building (")
+    assert lines[2] == "  recommender: pending"
+    assert lines[5] == "1) Amazing Cats (amazing_cats_video_id) [#cat #animal]"
+    assert lines[-1] == "1) Another Cat Video (another_cat_video_id) " \
+                        "[#cat #animal]"
+    assert built.count("recommender") == 1
+
+
+def test_status_without_background_build(capfd):
+    player = VideoPlayer()
+    player.query_videos("tag:#cat")
+    player.show_index_status()
+    out, err = capfd.readouterr()
+    assert out.splitlines()[-3:] == [
+        "  query: ready",
+        "  recommender: built on first use",
+        "  minhash: built on first use",
+    ]
+
+
+def test_status_shows_progress_of_the_build(capfd):
+    player = VideoPlayer()
+    started = threading.Event()
+    release = threading.Event()
+    loads = []
+    get_all_videos = player.video_library.get_all_videos
+
+    def counting_load():
+        loads.append(1)
+        return get_all_videos()
+
+    def stalled_build(name, videos, progress):
+        taken = progress(videos())
+        next(taken)
+        next(taken)
+        started.set()
+        release.wait()
+        return build_index(name, videos, lambda all_videos: taken)
+
+    build_index = player._build_index
+    player.video_library.get_all_videos = counting_load
+    player._build_index = stalled_build
+    player.build_indexes_in_background()
+    assert started.wait(10)
+    player.show_index_status()
+    release.set()
+    for name in INDEX_CLASSES:
+        assert player.index_builder.wait(name, timeout=10)
+    out, err = capfd.readouterr()
+    assert out.splitlines()[1].startswith("  query: building (2 of 5 videos, ")
+    # The library is read once for every index
+    assert len(loads) == 1
+
+
+def test_no_background_build_over_sqlite():
+    player = VideoPlayer(VideoLibrary(storage=SqliteStorage()))
+    assert not player.build_indexes_in_background()
+    assert player.index_builder is None
+    assert player.indexes == {}
@@ -0,0 +1,91 @@
+import os
+import shutil
+from pathlib import Path
+
+from src.index_cache import INDEX_FORMAT_VERSION, IndexCache, \
+    catalog_fingerprint
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+from src.video_query import BitmapIndex
+
+_CATALOG = Path(__file__).parent.parent / "src" / "videos.txt"
+
+
+def _catalog(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    shutil.copy(_CATALOG, catalog)
+    return catalog
+
+
+def test_fingerprint_changes_with_content_and_mtime(tmp_path):
+    catalog = _catalog(tmp_path)
+    fingerprint = catalog_fingerprint(catalog)
+    assert catalog_fingerprint(catalog) == fingerprint
+    stat = catalog.stat()
+    os.utime(catalog, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert catalog_fingerprint(catalog) != fingerprint
+
+
+def test_player_indexes_are_reused_across_processes(tmp_path, capfd):
+    catalog = _catalog(tmp_path)
+    first = VideoPlayer(VideoLibrary(catalog))
+    first.index_cache = IndexCache(tmp_path / "cache", catalog)
+    first.query_videos("tag:#cat")
+    first.recommend("amazing_cats_video_id")
+    first.show_similar("amazing_cats_video_id")
+    assert first.index_cache.misses == 3
+    assert sorted(path.name.split("-")[0] for path in
+                  (tmp_path / "cache").iterdir()) == [
+        "minhash", "query", "recommender"]
+
+    second = VideoPlayer(VideoLibrary(catalog))
+    second.index_cache = IndexCache(tmp_path / "cache", catalog)
+    second.query_videos("tag:#cat")
+    second.recommend("amazing_cats_video_id")
+    second.show_similar("amazing_cats_video_id")
+    assert second.index_cache.hits == 3
+    assert second.index_cache.misses == 0
+    out, err = capfd.readouterr()
+    half = len(out.splitlines()) // 2
+    assert out.splitlines()[:half] == out.splitlines()[half:]
+
+
+def test_stale_and_corrupt_entries_are_rebuilt(tmp_path):
+    catalog = _catalog(tmp_path)
+    cache = IndexCache(tmp_path / "cache", catalog)
+    cache.get("query", lambda: {"version": 1})
+    cache.path("query").write_bytes(b"not a pickle")
+    assert cache.get("query", lambda: {"version": 2}) == {"version": 2}
+    assert cache.misses == 2
+
+    with open(catalog, "a") as catalog_file:
+        catalog_file.write("New Video | new_video_id | #new\n")
+    updated = IndexCache(tmp_path / "cache", catalog)
+    assert updated.get("query", lambda: {"version": 3}) == {"version": 3}
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == [
+        f"query-{updated.catalog_key}-v{INDEX_FORMAT_VERSION}-"
+        f"{updated.fingerprint}.pickle"]
+
+
+def test_catalogs_sharing_a_directory_keep_their_entries(tmp_path):
+    first = _catalog(tmp_path)
+    second = tmp_path / "other.txt"
+    second.write_text("Other Video | other_video_id | #other\n")
+    for catalog in (first, second, first):
+        cache = IndexCache(tmp_path / "cache", catalog)
+        cache.get("query", lambda: {"catalog": str(catalog)})
+    assert cache.hits == 1
+    assert len(list((tmp_path / "cache").iterdir())) == 2
+
+
+def test_cached_indexes_share_the_library_videos(tmp_path):
+    catalog = _catalog(tmp_path)
+    IndexCache(tmp_path / "cache", catalog).get(
+        "query", lambda: BitmapIndex(VideoLibrary(catalog).get_all_videos()),
+        VideoLibrary(catalog).get_all_videos)
+    videos = VideoLibrary(catalog).get_all_videos()
+    cache = IndexCache(tmp_path / "cache", catalog)
+    index = cache.get("query", lambda: None, lambda: videos)
+    assert cache.hits == 1
+    assert all(cached is video for cached, video in zip(index.videos, videos))
+    assert len(index.videos) == len(videos)
@@ -0,0 +1,20 @@
+from src.load_generator import PROFILES, CommandStream, run_load
+from src.video_library import VideoLibrary
+
+
+def test_command_stream_is_reproducible():
+    ids = ["a_video_id", "b_video_id"]
+    first = CommandStream(ids, ["#cat"], PROFILES["browse"], seed=3).take(200)
+    second = CommandStream(ids, ["#cat"], PROFILES["browse"], seed=3).take(200)
+    assert first == second
+    assert {command[0] for command in first} <= set(PROFILES["browse"])
+
+
+def test_run_load_reports_throughput_and_latency():
+    report = run_load(VideoLibrary(), PROFILES["moderate"], players=2,
+                      commands=50, seed=1)
+    assert report["commands"] == 100
+    assert report["errors"] == 0
+    assert report["throughput_per_s"] > 0
+    assert report["p50_ms"] <= report["p99_ms"] <= report["p999_ms"]
+    assert sum(window["commands"] for window in report["windows"]) == 100
@@ -0,0 +1,56 @@
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.memory_usage import deep_sizeof, memory_report
+from src.video_player import VideoPlayer
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    shared = "x" * 100
+    seen = set()
+    first = deep_sizeof([shared], seen)
+    second = deep_sizeof([shared], seen)
+    assert first > second
+
+
+def test_memory_report_components():
+    player = VideoPlayer()
+    report = memory_report(player)
+    for component in ("videos", "strings", "tags", "playlists", "flags",
+                      "indexes"):
+        assert component in report
+    assert report["total"] == sum(
+        size for name, size in report.items() if name != "total")
+    assert report["videos"] > 0
+    assert report["strings"] > 0
+
+
+def test_memory_report_grows_with_flags():
+    player = VideoPlayer()
+    before = memory_report(player)["flags"]
+    player.flag_video("amazing_cats_video_id", "dont_like_cats")
+    assert memory_report(player)["flags"] > before
+
+
+def test_show_memory_with_tracing(capfd):
+    player = VideoPlayer()
+    player.show_memory("TRACE")
+    player.show_memory()
+    player.show_memory("STOP")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Memory tracing started" in lines[0]
+    assert "Memory usage:" in lines[1]
+    assert "Top allocation sites:" in out
+    assert "Memory tracing stopped" in lines[-1]
+
+
+def test_show_memory_rejects_unknown_options(capfd):
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    with pytest.raises(CommandException):
+        parser.execute_command(["MEMORY", "TRACES"])
+    player.show_memory("traces")
+    out, err = capfd.readouterr()
+    assert out.splitlines() == ["Cannot show memory: Unknown option TRACES"]
+    assert not player.memory_tracker.is_tracing
@@ -0,0 +1,67 @@
+from src.catalog_generator import generate_catalog
+from src.minhash import MinHashIndex
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+_VIDEOS = [
+    Video("How to bake sourdough bread at home", "bread_1_video_id",
+          ["#food", "#diy"]),
+    Video("How to bake sourdough bread at home!", "bread_2_video_id",
+          ["#food", "#diy"]),
+    Video("How to bake sourdough bread", "bread_3_video_id", ["#food"]),
+    Video("Top ten football goals of the week", "goals_video_id", ["#sport"]),
+    Video("Relaxing piano music for studying", "piano_video_id", ["#music"]),
+]
+
+
+def test_signatures_are_stored_flat():
+    index = MinHashIndex(_VIDEOS, num_perm=32, bands=8)
+    assert len(index.signatures) == 32 * len(_VIDEOS)
+    assert index.signatures.typecode == "I"
+
+
+def test_similar_finds_near_duplicates():
+    index = MinHashIndex(_VIDEOS)
+    similar = index.similar("bread_1_video_id")
+    assert [video.video_id for video, _ in similar][:2] == [
+        "bread_2_video_id", "bread_3_video_id"]
+    assert similar[0][1] > 0.8
+    assert "goals_video_id" not in [video.video_id for video, _ in similar]
+    assert index.similar("bread_1_video_id",
+                         excluded={"bread_2_video_id"})[0][0].video_id == \
+           "bread_3_video_id"
+
+
+def test_duplicates_report():
+    index = MinHashIndex(_VIDEOS + [
+        Video("Top ten football goals of the week", "goals_copy_video_id",
+              ["#sport"])])
+    pairs = [(first.video_id, second.video_id)
+             for first, second, _ in index.duplicates(0.8)]
+    assert pairs[0] == ("goals_video_id", "goals_copy_video_id")
+    assert ("bread_1_video_id", "bread_2_video_id") in pairs
+    assert all("piano_video_id" not in pair for pair in pairs)
+
+
+def test_duplicates_on_generated_catalog(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    generate_catalog(catalog, 3000, seed=8)
+    index = MinHashIndex(VideoLibrary(catalog).get_all_videos())
+    for first, second, similarity in index.duplicates(0.9):
+        assert similarity >= 0.9
+        assert first.video_id != second.video_id
+
+
+def test_show_similar_and_duplicates(capfd):
+    player = VideoPlayer()
+    player.show_similar("amazing_cats_video_id", 1)
+    player.show_similar("does_not_exist")
+    player.show_duplicates(0.99)
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Videos similar to Amazing Cats:" in lines[0]
+    assert lines[1].startswith("1) ") and "(similarity: " in lines[1]
+    assert "amazing_cats_video_id" not in lines[1]
+    assert "Cannot show similar videos: Video does not exist" in lines[2]
+    assert "No duplicate videos found" in lines[3]
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.play_counts import PlayCounter, SpaceSaving
+from src.video_player import VideoPlayer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_space_saving_is_exact_under_capacity():
+    counter = SpaceSaving(capacity=10)
+    for item in "abracadabra":
+        counter.add(item)
+    assert counter.top(3) == [("a", 5, 0), ("b", 2, 0), ("r", 2, 0)]
+
+
+def test_space_saving_keeps_heavy_hitters_in_fixed_memory():
+    counter = SpaceSaving(capacity=20)
+    rng = random.Random(0)
+    for _ in range(20000):
+        if rng.random() < 0.3:
+            counter.add("hot")
+        elif rng.random() < 0.3:
+            counter.add("warm")
+        else:
+            counter.add(rng.randrange(100000))
+    assert len(counter) == 20
+    top = counter.top(2)
+    assert [item for item, _, _ in top] == ["hot", "warm"]
+    for _, count, error in top:
+        assert error <= 20000 / 20
+        assert count - error > 4000
+
+
+def test_trending_decays_old_plays():
+    clock = _Clock()
+    counter = PlayCounter(half_life=10.0, clock=clock)
+    for _ in range(4):
+        counter.record("old")
+    clock.now = 20.0
+    counter.record("new")
+    counter.record("new")
+    assert counter.top_played() == [("old", 4), ("new", 2)]
+    trending = counter.trending()
+    assert trending[0][0] == "new"
+    assert abs(trending[0][1] - 2.0) < 1e-9
+    assert abs(trending[1][1] - 1.0) < 1e-9
+
+
+def test_trending_rebases_large_weights():
+    clock = _Clock()
+    counter = PlayCounter(half_life=1.0, clock=clock)
+    counter.record("a")
+    clock.now = 40.0
+    counter.record("b")
+    assert counter.trending() == [("b", 1.0), ("a", 2.0 ** -40)]
+
+
+def test_top_played_and_trending_commands(capfd):
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    parser.execute_command(["TOP_PLAYED"])
+    player.play_video("amazing_cats_video_id")
+    player.play_video("funny_dogs_video_id")
+    player.play_video("amazing_cats_video_id")
+    player.play_video("does_not_exist")
+    player.flag_video("funny_dogs_video_id")
+    parser.execute_command(["TOP_PLAYED", "5"])
+    parser.execute_command(["TRENDING"])
+    with pytest.raises(CommandException):
+        parser.execute_command(["TRENDING", "many"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "No videos have been played yet" in lines[0]
+    assert "Top played videos:" in lines[8]
+    assert "1) Amazing Cats (amazing_cats_video_id) [#cat #animal] " \
+           "(2 plays)" in lines[9]
+    assert "Trending videos:" in lines[10]
+    assert "1) Amazing Cats (amazing_cats_video_id) [#cat #animal] " \
+           "(score: 2.00)" in lines[11]
@@ -0,0 +1,153 @@
+import random
+import threading
+
+import pytest
+
+from src.catalog_import import CatalogImporter, parse_duration
+from src.playback_clock import PlaybackClock, TimerWheel
+from src.thread_safe_player import ThreadSafeVideoPlayer
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_timer_wheel_fires_on_the_right_tick():
+    wheel = TimerWheel(slots=8, levels=3)
+    rng = random.Random(4)
+    delays = [rng.randrange(1, 2000) for _ in range(500)] + [1, 8, 64, 512]
+    fired = []
+    for delay in delays:
+        wheel.schedule(delay, lambda delay=delay: fired.append(
+            (delay, wheel.now)))
+    cancelled = wheel.schedule(5, lambda: fired.append("cancelled"))
+    wheel.cancel(cancelled)
+    wheel.cancel(cancelled)
+    assert len(wheel) == len(delays)
+    for _ in range(100):
+        wheel.advance(20)
+    assert sorted(fired) == sorted((delay, delay) for delay in delays)
+    assert len(wheel) == 0
+
+
+def test_timer_wheel_many_sessions():
+    wheel = TimerWheel()
+    fired = []
+    for session in range(200000):
+        wheel.schedule(1 + session % 2000, lambda: fired.append(None))
+    assert wheel.advance(1000) == 100000
+    assert wheel.advance(1000) == 100000
+    assert len(fired) == 200000
+
+
+def test_parse_duration_and_import(tmp_path):
+    assert parse_duration("90") == 90
+    assert parse_duration("3:10") == 190
+    assert parse_duration("1:00:05") == 3605
+    catalog = tmp_path / "videos.txt"
+    catalog.write_text("Amazing Cats | cats_video_id | #cat | 3:10\n"
+                       "Funny Dogs | dogs_video_id | #dog\n"
+                       "Bad Video | bad_video_id | #x | soon\n")
+    importer = CatalogImporter(catalog)
+    assert [(video.video_id, video.duration) for video in importer] == [
+        ("cats_video_id", 190), ("dogs_video_id", None)]
+    assert importer.stats.rejections == [(3, "invalid duration 'soon'")]
+
+    for text in ("inf", "nan", "1:inf", "0"):
+        with pytest.raises(ValueError):
+            parse_duration(text)
+    catalog = tmp_path / "videos.jsonl"
+    catalog.write_text(
+        '{"title": "A", "video_id": "a", "tags": [], "duration": 60}\n'
+        '{"title": "B", "video_id": "b", "tags": [], "duration": NaN}\n'
+        '{"title": "C", "video_id": "c", "tags": [], "duration": Infinity}\n'
+        '{"title": "D", "video_id": "d", "tags": [], "duration": 1e400}\n'
+        '{"title": "E", "video_id": "e", "tags": [], "duration": 1' +
+        "0" * 400 + '}\n')
+    importer = CatalogImporter(catalog)
+    assert [video.video_id for video in importer] == ["a"]
+    assert [line for line, reason in importer.stats.rejections] == [
+        2, 3, 4, 5]
+
+
+def test_position_pauses_and_video_finishes(tmp_path, capfd):
+    catalog = tmp_path / "videos.txt"
+    catalog.write_text("Amazing Cats | cats_video_id | #cat | 1:00\n"
+                       "Funny Dogs | dogs_video_id | #dog\n")
+    clock = _Clock()
+    player = VideoPlayer(VideoLibrary(catalog), PlaybackClock(clock=clock))
+    events = []
+    player.listeners.append(lambda *event: events.append(event))
+    player.play_video("cats_video_id")
+    clock.now = 20
+    player.pause_video()
+    clock.now = 500
+    player.show_position()
+    player.continue_video()
+    clock.now = 539
+    player.show_position()
+    clock.now = 541
+    player.show_position()
+    player.play_video("dogs_video_id")
+    clock.now = 10000
+    player.show_position()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[2] == "Position: Amazing Cats 0:20 / 1:00 - PAUSED"
+    assert lines[4] == "Position: Amazing Cats 0:59 / 1:00"
+    assert lines[5] == "Finished video: Amazing Cats"
+    assert lines[6] == "No video is currently playing"
+    assert lines[8] == "Position: Funny Dogs 2:37:39"
+    assert ("stop_video",) in events
+    assert player.status_codes["current_video_id"].video_id == "dogs_video_id"
+
+
+def test_shared_clock_ends_videos_on_their_own_player(tmp_path, capfd):
+    catalog = tmp_path / "videos.txt"
+    catalog.write_text("Amazing Cats | cats_video_id | #cat | 1:00\n")
+    clock = _Clock()
+    shared = PlaybackClock(clock=clock)
+    library = VideoLibrary(catalog)
+    first = ThreadSafeVideoPlayer(library, shared)
+    second = ThreadSafeVideoPlayer(library, shared)
+    first.play_video("cats_video_id")
+    capfd.readouterr()
+    clock.now = 61
+    # The other player's advance fires the timer but leaves the video alone
+    second.advance_playback()
+    assert capfd.readouterr().out == ""
+    assert first.status_codes["is_playing"]
+    first.advance_playback()
+    assert capfd.readouterr().out == "Finished video: Amazing Cats\n"
+    assert not first.status_codes["is_playing"]
+
+
+def test_clock_is_shared_across_threads():
+    clock = _Clock()
+    shared = PlaybackClock(clock=clock)
+    fired = []
+
+    def session(seed):
+        rng = random.Random(seed)
+        for _ in range(2000):
+            timer = shared.schedule(rng.random(), lambda: fired.append(1))
+            if rng.random() < 0.5:
+                shared.cancel(timer)
+            shared.advance()
+
+    threads = [threading.Thread(target=session, args=(seed,))
+               for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    clock.now = 10
+    shared.advance()
+    assert len(shared.wheel) == 0
+    assert 0 < len(fired) < 8000
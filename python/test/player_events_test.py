@@ -0,0 +1,132 @@
+import struct
+import zlib
+
+from src.player_events import (EventStore, encode_event, read_events,
+                               replay, restore_state, snapshot_state)
+from src.video_player import VideoPlayer
+
+
+def _session(player):
+    player.create_playlist("My_Playlist")
+    player.add_to_playlist("my_playlist", "amazing_cats_video_id")
+    player.add_to_playlist("my_playlist", "funny_dogs_video_id")
+    player.play_video("amazing_cats_video_id")
+    player.pause_video()
+    player.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    player.create_playlist("other")
+    player.delete_playlist("other")
+    player.remove_from_playlist("my_playlist", "amazing_cats_video_id")
+    player.play_video("another_cat_video_id")
+
+
+def test_encode_and_read_events(tmp_path):
+    path = tmp_path / "events.log"
+    path.write_bytes(encode_event("play_video", "amazing_cats_video_id") +
+                     encode_event("stop_video") +
+                     encode_event("flag_video", "x_video_id", "reason é"))
+    events = [(name, args) for _, name, args in read_events(path)]
+    assert events == [("play_video", ("amazing_cats_video_id",)),
+                      ("stop_video", ()),
+                      ("flag_video", ("x_video_id", "reason é"))]
+
+
+def test_long_fields_and_older_records(tmp_path):
+    path = tmp_path / "events.log"
+    reason = "r" * 100_000
+    # A flag_video record as written when field lengths took 2 bytes
+    payload = b"".join(struct.pack("<H", len(field)) + field
+                       for field in (b"x_video_id", b"old reason"))
+    path.write_bytes(encode_event("flag_video", "y_video_id", reason) +
+                     struct.pack("<IBI", len(payload), 9,
+                                 zlib.crc32(payload)) + payload)
+    assert [args for _, _, args in read_events(path)] == [
+        ("y_video_id", reason), ("x_video_id", "old reason")]
+
+
+def test_torn_record_is_ignored(tmp_path):
+    path = tmp_path / "events.log"
+    path.write_bytes(encode_event("stop_video") +
+                     encode_event("play_video", "amazing_cats_video_id")[:-3])
+    assert [name for _, name, _ in read_events(path)] == ["stop_video"]
+
+
+def test_recover_from_log_only(tmp_path, capfd):
+    store = EventStore(tmp_path, snapshot_every=1000)
+    player = VideoPlayer()
+    store.attach(player)
+    _session(player)
+    store.close()
+    expected = snapshot_state(player)
+    capfd.readouterr()
+
+    restored = VideoPlayer()
+    EventStore(tmp_path).attach(restored)
+    assert snapshot_state(restored) == expected
+    out, err = capfd.readouterr()
+    assert out == ""
+    # Plays from the earlier session are not counted again
+    assert restored.play_counts.top_played() == []
+    assert not restored.replaying
+
+
+def test_recover_from_snapshot_and_tail(tmp_path):
+    store = EventStore(tmp_path, snapshot_every=4)
+    player = VideoPlayer()
+    store.attach(player)
+    _session(player)
+    store.close()
+    assert store.snapshot_path.exists()
+
+    restored = VideoPlayer()
+    replayed = EventStore(tmp_path).recover(restored)
+    assert replayed < 4
+    assert snapshot_state(restored) == snapshot_state(player)
+    assert restored.flagged_videos["funny_dogs_video_id"].reason == \
+           "dont_like_dogs"
+    assert restored.status_codes["current_video_id"].video_id == \
+           "another_cat_video_id"
+
+
+def test_offline_replay(tmp_path):
+    store = EventStore(tmp_path)
+    player = VideoPlayer()
+    store.attach(player)
+    _session(player)
+    store.close()
+
+    offline = VideoPlayer()
+    count = replay(offline, ((name, args) for _, name, args
+                             in read_events(store.log_path)))
+    assert count > 10
+    assert snapshot_state(offline) == snapshot_state(player)
+
+
+def test_snapshot_stores_playlists_as_row_ids():
+    player = VideoPlayer()
+    player.create_playlist("big")
+    player.add_to_playlist_bulk("big", ["amazing_cats_video_id",
+                                        "funny_dogs_video_id"])
+    player.playlists["big"].set_rows([0, 1] * 1000)
+    state = snapshot_state(player)
+    assert state["rows"] == ["amazing_cats_video_id", "funny_dogs_video_id"]
+    assert isinstance(state["playlists"][0][1], str)
+
+    restored = VideoPlayer()
+    restored.create_playlist("other")
+    restored.add_to_playlist("other", "funny_dogs_video_id")
+    restore_state(restored, state)
+    assert [video.video_id for video in
+            restored.playlists["big"].videos][:3] == [
+        "amazing_cats_video_id", "funny_dogs_video_id",
+        "amazing_cats_video_id"]
+    assert len(restored.playlists["big"].videos) == 2000
+
+
+def test_snapshot_of_video_ids_is_restored():
+    player = VideoPlayer()
+    restore_state(player, {
+        "current_video_id": "", "is_playing": False, "is_paused": True,
+        "playlists": [["Mine", ["funny_dogs_video_id", "gone_video_id"]]],
+        "flags": []})
+    assert [video.video_id for video in player.playlists["mine"].videos] == [
+        "funny_dogs_video_id"]
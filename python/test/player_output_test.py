@@ -0,0 +1,90 @@
+import json
+
+from src.command_parser import CommandParser
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _records(out):
+    return [json.loads(line) for line in out.splitlines()]
+
+
+def test_json_output_rows_and_messages(capfd):
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    player.flag_video("nothing_video_id", "boring")
+    parser.execute_command(["OUTPUT", "json"])
+    player.create_playlist("my_playlist")
+    player.add_to_playlist("my_playlist", "amazing_cats_video_id")
+    player.show_playlist("my_playlist")
+    player.show_all_videos()
+    parser.execute_command(["NOT_A_COMMAND"])
+    out, err = capfd.readouterr()
+    records = _records(out.split("\n", 1)[1])
+    assert records[0] == {"type": "message", "text": "Output mode: json"}
+    assert records[3] == {"type": "message",
+                          "text": "Showing playlist: my_playlist"}
+    assert records[4] == {"type": "video",
+                          "video_id": "amazing_cats_video_id",
+                          "title": "Amazing Cats", "tags": ["#cat", "#animal"],
+                          "flag_reason": None}
+    videos = [record for record in records[6:] if record["type"] == "video"]
+    assert len(videos) == 5
+    assert {"video_id": "nothing_video_id", "flag_reason": "boring"}.items() \
+        <= videos[-1].items()
+    assert records[-1]["type"] == "error"
+
+
+def test_json_search_results_are_numbered(capfd, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda: "no")
+    player = VideoPlayer()
+    player.set_output("JSON")
+    player.search_videos("cat")
+    player.set_output("xml")
+    player.set_output("text")
+    player.search_videos("dog")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    records = _records("\n".join(lines[:6]))
+    assert records[1] == {"type": "message",
+                          "text": "Here are the results for cat:"}
+    assert records[2]["number"] == 1
+    assert records[2]["video_id"] == "amazing_cats_video_id"
+    assert records[5]["text"] == "Cannot set output mode: Unknown mode xml"
+    assert lines[6] == "Output mode: text"
+    assert lines[7] == "Here are the results for dog:"
+    assert lines[8] == "1) Funny Dogs (funny_dogs_video_id) [#dog #animal]"
+
+
+def test_json_ranked_listings_have_number_and_score(capfd):
+    player = VideoPlayer()
+    player.set_output("json")
+    for video_id in ("funny_dogs_video_id", "amazing_cats_video_id",
+                     "funny_dogs_video_id"):
+        player.play_video(video_id)
+    capfd.readouterr()
+    player.show_top_played()
+    player.recommend("amazing_cats_video_id", 1)
+    out, err = capfd.readouterr()
+    records = _records(out)
+    assert records[0] == {"type": "message", "text": "Top played videos:"}
+    assert records[1] == {"type": "video", "video_id": "funny_dogs_video_id",
+                          "title": "Funny Dogs", "tags": ["#dog", "#animal"],
+                          "flag_reason": None, "number": 1, "score": 2}
+    assert {"video_id": "amazing_cats_video_id", "number": 2,
+            "score": 1}.items() <= records[2].items()
+    assert records[4]["type"] == "video"
+    assert records[4]["number"] == 1
+
+
+def test_json_duplicates_are_pairs(tmp_path, capfd):
+    catalog = tmp_path / "videos.txt"
+    catalog.write_text("Top ten goals | goals_video_id | #sport\n"
+                       "Top ten goals | goals_copy_video_id | #sport\n")
+    player = VideoPlayer(VideoLibrary(catalog))
+    player.set_output("json")
+    player.show_duplicates()
+    out, err = capfd.readouterr()
+    records = _records(out)
+    assert records[2] == {"type": "duplicate", "first": "goals_video_id",
+                          "second": "goals_copy_video_id", "similarity": 1.0}
@@ -0,0 +1,68 @@
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.video_player import VideoPlayer
+
+
+def _playlist_ids(player, name):
+    return [video.video_id for video in player.playlists[name].videos]
+
+
+@pytest.fixture
+def player(capfd):
+    player = VideoPlayer()
+    player.create_playlist("first")
+    player.add_to_playlist_bulk("first", [
+        "funny_dogs_video_id", "amazing_cats_video_id", "nothing_video_id"])
+    player.create_playlist("second")
+    player.add_to_playlist_bulk("second", [
+        "life_at_google_video_id", "nothing_video_id",
+        "amazing_cats_video_id"])
+    player.create_playlist("third")
+    player.add_to_playlist_bulk("third", ["nothing_video_id"])
+    capfd.readouterr()
+    return player
+
+
+def test_union_intersect_and_diff(player, capfd):
+    parser = CommandParser(player)
+    parser.execute_command(["PLAYLIST_UNION", "all", "first", "SECOND"])
+    parser.execute_command(["PLAYLIST_INTERSECT", "both", "second", "first"])
+    parser.execute_command(["PLAYLIST_DIFF", "only_first", "first", "second"])
+    parser.execute_command(["PLAYLIST_INTERSECT", "common", "first", "second",
+                            "third"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Created playlist all with 4 videos",
+        "Created playlist both with 2 videos",
+        "Created playlist only_first with 1 videos",
+        "Created playlist common with 1 videos",
+    ]
+    assert _playlist_ids(player, "all") == [
+        "funny_dogs_video_id", "amazing_cats_video_id", "nothing_video_id",
+        "life_at_google_video_id"]
+    assert _playlist_ids(player, "both") == [
+        "nothing_video_id", "amazing_cats_video_id"]
+    assert _playlist_ids(player, "only_first") == ["funny_dogs_video_id"]
+    assert _playlist_ids(player, "common") == ["nothing_video_id"]
+
+
+def test_flagged_and_missing(player, capfd):
+    player.flag_video("amazing_cats_video_id", "dont_like_cats")
+    capfd.readouterr()
+    player.playlist_union("all", ["first", "second"])
+    player.playlist_diff("all", ["first", "second"])
+    player.playlist_diff("none", ["first", "missing"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Created playlist all with 3 videos",
+        "Could not add 1 videos:",
+        "  amazing_cats_video_id: Video is currently flagged "
+        "(reason: dont_like_cats)",
+        "Cannot diff playlists: A playlist with the same name already exists",
+        "Cannot diff playlists: Playlist missing does not exist",
+    ]
+    assert "none" not in player.playlists
+    with pytest.raises(CommandException):
+        CommandParser(player).execute_command(["PLAYLIST_UNION", "x",
+                                               "first"])
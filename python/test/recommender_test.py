@@ -0,0 +1,64 @@
+from src.catalog_generator import generate_catalog
+from src.recommender import TagRecommender
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _ids(videos):
+    return [video.video_id for video in videos]
+
+
+def test_recommend_prefers_shared_tags():
+    recommender = TagRecommender(VideoLibrary().get_all_videos())
+    assert _ids(recommender.recommend("amazing_cats_video_id", 2)) == [
+        "another_cat_video_id", "funny_dogs_video_id"]
+    assert _ids(recommender.recommend(
+        "amazing_cats_video_id", excluded={"another_cat_video_id"})) == [
+        "funny_dogs_video_id"]
+    assert recommender.recommend("nothing_video_id") == []
+    assert recommender.recommend("does_not_exist") == []
+
+
+def test_add_video_refreshes_model():
+    recommender = TagRecommender(VideoLibrary().get_all_videos())
+    assert recommender.recommend("life_at_google_video_id") == []
+    recommender.add_video(Video("Google careers", "careers_video_id",
+                                ["#career"]))
+    assert _ids(recommender.recommend("life_at_google_video_id")) == [
+        "careers_video_id"]
+
+
+def test_recommend_on_large_catalogs(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    generate_catalog(catalog, 50_000, seed=6)
+    videos = VideoLibrary(catalog).get_all_videos()
+    recommender = TagRecommender(videos)
+    for video in videos[:1000]:
+        recommended = _ids(recommender.recommend(video.video_id))
+        assert len(recommended) <= 5
+        assert len(set(recommended)) == len(recommended)
+        assert video.video_id not in recommended
+        if recommended:
+            excluded = {recommended[0]}
+            assert recommended[0] not in _ids(recommender.recommend(
+                video.video_id, excluded=excluded))
+
+
+def test_recommend_and_play_similar(capfd):
+    player = VideoPlayer()
+    player.flag_video("another_cat_video_id")
+    player.recommend("amazing_cats_video_id")
+    player.recommend("does_not_exist")
+    player.play_similar()
+    player.play_video("amazing_cats_video_id")
+    player.play_similar()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Recommendations for Amazing Cats:" in lines[1]
+    assert "1) Funny Dogs (funny_dogs_video_id) [#dog #animal]" in lines[2]
+    assert len(lines) == 8
+    assert "Cannot recommend videos: Video does not exist" in lines[3]
+    assert "Cannot play similar video: No video is currently playing" in \
+           lines[4]
+    assert "Playing video: Funny Dogs" in lines[7]
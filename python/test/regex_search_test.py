@@ -0,0 +1,82 @@
+import time
+
+from src.catalog_generator import generate_catalog
+from src.deadline import Deadline
+from src.regex_search import RegexSearcher, compile_pattern, required_literal
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+from src.video_query import BitmapIndex
+
+
+def test_required_literal():
+    assert required_literal("^how to .* (cat|dog)") == "how to "
+    assert required_literal("Amazing (Cats)+") == "amazing "
+    assert required_literal("(?:big )?dogs") == "dogs"
+    assert required_literal("a|b") == ""
+    assert required_literal("(") == ""
+    assert compile_pattern("cat") is compile_pattern("cat")
+
+
+def test_search_matches_plain_scan(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    generate_catalog(catalog, 3000, seed=5)
+    videos = VideoLibrary(catalog).get_all_videos()
+    searcher = RegexSearcher(videos)
+    index = BitmapIndex(videos)
+    for pattern in ("^the", "ing$", "a.b", "(top|best) [0-9]+", "video"):
+        expected = [video for video in videos
+                    if compile_pattern(pattern).search(video.title)]
+        assert searcher.search(pattern) == (expected, True)
+        assert searcher.search(pattern, index=index) == (expected, True)
+
+
+def test_parallel_scan_and_budget():
+    videos = [Video(f"Video number {number}", f"video_{number}", [])
+              for number in range(1000)] + \
+             [Video("a" * 40 + "!", "slow_video_id", [])]
+    searcher = RegexSearcher(videos, parallel_threshold=100, workers=2,
+                             chunk_size=300)
+    try:
+        found, complete = searcher.search("number 99[0-9]$")
+        assert [video.video_id for video in found] == [
+            f"video_{number}" for number in range(990, 1000)]
+        assert complete
+        # Catastrophic backtracking on the last title
+        found, complete = searcher.search("(a+)+$", budget=0.2)
+        assert not complete
+        found, complete = searcher.search("number 5$")
+        assert [video.video_id for video in found] == ["video_5"]
+    finally:
+        searcher.close()
+
+
+def test_cancelled_command_stops_the_scan():
+    videos = [Video("a" * 40 + "!", f"slow_{number}_video_id", [])
+              for number in range(4)]
+    deadline = Deadline()
+    deadline.cancel()
+    for workers in (1, 2):
+        searcher = RegexSearcher(videos, parallel_threshold=2,
+                                 workers=workers, chunk_size=2)
+        try:
+            start = time.monotonic()
+            found, complete = searcher.search("(a+)+$", budget=60,
+                                              deadline=deadline)
+            assert not complete
+            assert time.monotonic() - start < 10
+        finally:
+            searcher.close()
+
+
+def test_search_regex_command(capfd, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda: "1")
+    player = VideoPlayer()
+    player.search_videos_regex("^(amazing|funny) ")
+    player.search_videos_regex("(unclosed")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[0] == "Here are the results for ^(amazing|funny) :"
+    assert lines[1] == "1) Funny Dogs (funny_dogs_video_id) [#dog #animal]"
+    assert lines[-2] == "Playing video: Funny Dogs"
+    assert lines[-1].startswith("Cannot search videos: Invalid pattern (")
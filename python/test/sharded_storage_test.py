@@ -0,0 +1,84 @@
+import pickle
+import threading
+
+import pytest
+
+from src.catalog_generator import generate_catalog
+from src.sharded_storage import ShardedStorage, shard_of
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+@pytest.fixture
+def storage():
+    storage = ShardedStorage(3)
+    yield storage
+    storage.close()
+
+
+def _ids(videos):
+    return [video.video_id for video in videos]
+
+
+def test_shard_of_is_stable():
+    assert shard_of("amazing_cats_video_id", 4) == \
+           shard_of("amazing_cats_video_id", 4)
+    assert {shard_of(f"video_{i}", 4) for i in range(100)} == {0, 1, 2, 3}
+
+
+def test_sharded_lookups(storage):
+    library = VideoLibrary(storage=storage)
+    assert len(library.videos) == 5
+    assert "amazing_cats_video_id" in library.videos
+    assert "does_not_exist" not in library.videos
+    assert library.get_video("amazing_cats_video_id").tags == (
+        "#cat", "#animal")
+    assert _ids(library.get_all_videos()) == _ids(
+        VideoLibrary().get_all_videos())
+
+
+def test_sharded_search_is_merged_in_title_order(storage, tmp_path):
+    catalog = tmp_path / "videos.txt"
+    generate_catalog(catalog, 5000, seed=4)
+    sharded = VideoLibrary(catalog, storage)
+    single = VideoLibrary(catalog)
+
+    for term in ("cat", "how", "zzz"):
+        expected = sorted(single.search_titles(term), key=lambda v: v.title)
+        results = sharded.search_titles(term)
+        assert sorted(_ids(results)) == sorted(_ids(expected))
+        assert [v.title for v in results] == [v.title for v in expected]
+    assert sorted(_ids(sharded.search_tag("#CAT"))) == sorted(
+        _ids(single.search_tag("#cat")))
+
+
+def test_player_on_sharded_storage(storage, capfd):
+    player = VideoPlayer(VideoLibrary(storage=storage))
+    player.play_video("amazing_cats_video_id")
+    player.flag_video("funny_dogs_video_id")
+    player.play_video("funny_dogs_video_id")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Playing video: Amazing Cats" in lines[0]
+    assert "Successfully flagged video: Funny Dogs (reason: Not supplied)" in \
+           lines[1]
+    assert "Cannot play video: Video is currently flagged" in lines[2]
+
+
+def test_failed_send_leaves_shards_usable(storage):
+    VideoLibrary(storage=storage)
+    unpicklable = threading.Lock()
+    results = []
+
+    def use_shards():
+        # A shard left locked would hang here, so this runs on a thread
+        with pytest.raises((pickle.PicklingError, TypeError)):
+            storage._owner("amazing_cats_video_id").call("get", unpicklable)
+        with pytest.raises((pickle.PicklingError, TypeError)):
+            storage._scatter("search_titles", unpicklable)
+        results.append(("amazing_cats_video_id" in storage, len(storage)))
+
+    worker = threading.Thread(target=use_shards, daemon=True)
+    worker.start()
+    worker.join(10)
+    assert results == [(True, 5)]
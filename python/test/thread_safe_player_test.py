@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.benchmark import quiet_player
+from src.catalog_generator import generate_catalog
+from src.rwlock import ReadWriteLock
+from src.thread_safe_player import ThreadSafeVideoPlayer
+from src.video_library import VideoLibrary
+
+
+def test_readers_share_and_writers_exclude():
+    lock = ReadWriteLock()
+    inside = []
+    peak = []
+    guard = threading.Lock()
+
+    def reader():
+        with lock.read_locked():
+            with guard:
+                inside.append(1)
+                peak.append(len(inside))
+            time.sleep(0.05)
+            with guard:
+                inside.pop()
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.01)
+    with lock.write_locked():
+        assert not inside
+        with lock.write_locked(), lock.read_locked():
+            pass
+    for thread in threads:
+        thread.join()
+    assert max(peak) > 1
+
+
+def test_no_lost_updates_under_concurrency(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    generate_catalog(catalog, 2000, seed=5)
+    library = VideoLibrary(catalog)
+    video_ids = [video.video_id for video in library.get_all_videos()]
+    player = ThreadSafeVideoPlayer(library)
+    with quiet_player():
+        player.create_playlist("shared")
+
+        def work(worker):
+            for count, video_id in enumerate(video_ids[worker::8]):
+                player.add_to_playlist("shared", video_id)
+                player.add_to_playlist("shared", video_ids[0])
+                if count % 50 == 0:
+                    player.show_playlist("shared")
+                    player.search_videos("cat")
+            player.flag_video(video_ids[worker])
+            player.play_video(video_ids[worker + 8])
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(work, range(8)))
+
+    playlist_ids = [video.video_id for video in
+                    player.playlists["shared"].videos]
+    assert sorted(playlist_ids) == sorted(video_ids)
+    assert sorted(player.flagged_videos) == sorted(video_ids[:8])
+    assert player.status_codes["is_playing"]
+
+
+def test_concurrent_regex_searches_share_one_searcher(monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda: "no")
+    player = ThreadSafeVideoPlayer()
+    with quiet_player():
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: player.search_videos_regex("^a"),
+                          range(32)))
+    searcher = player.regex_searcher
+    assert searcher is not None
+    assert player._regex_searcher() is searcher
+
+
+def test_concurrent_readers_build_an_index_once(monkeypatch):
+    player = ThreadSafeVideoPlayer()
+    built = []
+    build_index = player._build_index
+
+    def slow_build(name, *args):
+        built.append(name)
+        time.sleep(0.05)
+        return build_index(name, *args)
+
+    player._build_index = slow_build
+    with quiet_player():
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: player.query_videos("tag:#cat"),
+                          range(8)))
+    assert built == ["query"]
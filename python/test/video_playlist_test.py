@@ -0,0 +1,117 @@
+import random
+from array import array
+
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.video import Video
+from src.video_player import VideoPlayer
+from src.video_playlist import MappedRows, Playlist, VideoRows
+
+
+def _videos(count):
+    return [Video(f"Video {number}", f"video_{number}", [])
+            for number in range(count)]
+
+
+def test_mapped_rows_match_array(tmp_path):
+    rng = random.Random(3)
+    expected = list(range(4000))
+    rows = MappedRows(tmp_path, expected)
+    for _ in range(3000):
+        operation = rng.randrange(4)
+        row = rng.randrange(1 << 32)
+        if operation == 0:
+            rows.append(row)
+            expected.append(row)
+        elif operation == 1:
+            rows.extend([row, row + 1 & 0xFFFFFFFF])
+            expected.extend([row, row + 1 & 0xFFFFFFFF])
+        elif operation == 2 and expected:
+            position = rng.randrange(len(expected))
+            del rows[position]
+            del expected[position]
+        elif expected:
+            rows.insert_rows(0, 0, [row])
+            expected.insert(0, row)
+    assert len(rows) == len(expected) > 4096
+    assert rows[:] == expected
+    assert rows[-1] == expected[-1]
+    assert rows.index(expected[500]) == expected.index(expected[500])
+    # On a little endian machine the bytes 00 00 00 01 02 00 00 00 of these
+    # two rows contain 513 across the boundary, which is not a row
+    rows = MappedRows(tmp_path, [1 << 24, 2])
+    assert 513 not in rows
+    assert 2 in rows
+    rows.remove(1 << 24)
+    assert rows[:] == [2]
+    with pytest.raises(ValueError):
+        rows.remove(7)
+    rows.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_playlist_stores_row_ids(tmp_path):
+    videos = _videos(50)
+    rows = VideoRows()
+    small = Playlist("small", rows)
+    large = Playlist("large", rows, tmp_path, spill_at=30)
+    small.videos.extend(videos[:20])
+    large.videos.extend(videos[10:35])
+    assert not large.spilled
+    for video in videos[35:]:
+        large.videos.append(video)
+    assert large.spilled and not small.spilled
+    assert len(rows) == 50
+    assert small._entries.itemsize == 4
+
+    for playlist, expected in ((small, videos[:20]), (large, videos[10:])):
+        playlist.videos.remove(expected[3])
+        playlist.videos.insert(0, expected[3])
+        del playlist.videos[-1]
+        expected = [expected[3]] + expected[:3] + expected[4:-1]
+        assert list(playlist.videos) == expected
+        assert playlist.videos[2:5] == expected[2:5]
+        assert list(playlist.iter_videos(5, 8)) == expected[5:8]
+        assert expected[0] in playlist.videos
+        assert videos[49] not in playlist.videos
+        assert playlist.videos.index(expected[4]) == 4
+        assert list(playlist.iter_rows(1, 3)) == [
+            rows.find(video) for video in expected[1:3]]
+        assert playlist.row_bytes() == \
+            array("I", playlist.iter_rows()).tobytes()
+
+    # Filtering a spilled playlist reads its rows before replacing them
+    large.set_rows(row for row in large.iter_rows() if row % 2 == 0)
+    assert [video.video_id for video in large.videos][:3] == [
+        "video_10", "video_12", "video_14"]
+
+    large.videos = [video for video in large.videos
+                    if video.video_id.endswith("2")]
+    assert not large.spilled
+    assert [video.video_id for video in large.videos] == [
+        "video_12", "video_22", "video_32", "video_42"]
+    large.close()
+
+
+def test_show_playlist_pages(capfd):
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    player.create_playlist("my_playlist")
+    player.add_to_playlist_bulk("my_playlist", [
+        "amazing_cats_video_id", "funny_dogs_video_id",
+        "life_at_google_video_id"])
+    capfd.readouterr()
+    parser.execute_command(["SHOW_PLAYLIST", "my_playlist", "2", "1"])
+    parser.execute_command(["SHOW_PLAYLIST", "my_playlist", "3"])
+    parser.execute_command(["SHOW_PLAYLIST", "my_playlist", "4"])
+    out, err = capfd.readouterr()
+    assert [line.rstrip() for line in out.splitlines()] == [
+        "Showing playlist: my_playlist",
+        "Funny Dogs (funny_dogs_video_id) [#dog #animal]",
+        "Showing playlist: my_playlist",
+        "Life at Google (life_at_google_video_id) [#google #career]",
+        "Cannot show playlist my_playlist: Playlist has only 3 videos",
+    ]
+    with pytest.raises(CommandException):
+        parser.execute_command(["SHOW_PLAYLIST", "my_playlist", "0"])
@@ -0,0 +1,71 @@
+import pytest
+
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+from src.video_query import BitmapIndex, QuerySyntaxError, iter_rows, run_query
+
+
+def _ids(videos):
+    return {video.video_id for video in videos}
+
+
+def test_iter_rows():
+    assert list(iter_rows(0)) == []
+    assert list(iter_rows(0b1010_0000_0001 | (1 << 70))) == [0, 9, 11, 70]
+
+
+def test_query_fields_and_operators():
+    index = BitmapIndex(VideoLibrary().get_all_videos())
+    assert _ids(run_query("title:cat", index)) == {
+        "amazing_cats_video_id", "another_cat_video_id"}
+    assert _ids(run_query("tag:#animal AND NOT cat", index)) == {
+        "funny_dogs_video_id"}
+    assert _ids(run_query("tag:#dog OR (id:nothing_video_id)", index)) == {
+        "funny_dogs_video_id", "nothing_video_id"}
+    assert _ids(run_query("title:at tag:#CAREER", index)) == {
+        "life_at_google_video_id"}
+
+
+def test_query_flagged():
+    index = BitmapIndex(VideoLibrary().get_all_videos())
+    flagged = {"amazing_cats_video_id"}
+    assert _ids(run_query("title:cat AND tag:#animal AND NOT flagged", index,
+                          flagged)) == {"another_cat_video_id"}
+    assert _ids(run_query("flagged", index, flagged)) == flagged
+
+
+@pytest.mark.parametrize("query", ["", "title:", "color:red", "(cat", "cat)",
+                                   "cat AND", "OR cat"])
+def test_query_syntax_errors(query):
+    index = BitmapIndex(VideoLibrary().get_all_videos())
+    with pytest.raises(QuerySyntaxError):
+        run_query(query, index)
+
+
+def test_query_nesting_is_limited():
+    index = BitmapIndex(VideoLibrary().get_all_videos())
+    assert _ids(run_query("NOT " * 50 + "(" * 50 + "dog" + ")" * 50,
+                          index)) == {"funny_dogs_video_id"}
+    for query in ("NOT " * 5000 + "cat", "(" * 5000 + "cat" + ")" * 5000):
+        with pytest.raises(QuerySyntaxError):
+            run_query(query, index)
+
+
+def test_query_videos(capfd):
+    player = VideoPlayer()
+    player.flag_video("amazing_cats_video_id", "dont_like_cats")
+    player.query_videos("title:cat AND tag:#animal AND NOT flagged")
+    player.query_videos("tag:#animal AND flagged")
+    player.query_videos("tag:#nothing")
+    player.query_videos("title:cat AND")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 7
+    assert "Here are the results for title:cat AND tag:#animal AND NOT " \
+           "flagged:" in lines[1]
+    assert "1) Another Cat Video (another_cat_video_id) [#cat #animal]" in \
+           lines[2]
+    assert ("1) Amazing Cats (amazing_cats_video_id) [#cat #animal] - FLAGGED "
+            "(reason: dont_like_cats)") in lines[4]
+    assert "No search results for tag:#nothing" in lines[5]
+    assert "Cannot run query: Unexpected end of query" in lines[6]
@@ -0,0 +1,118 @@
+import sqlite3
+
+import pytest
+
+from src.catalog_generator import generate_catalog, generate_rows
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+from src.video import Video
+from src.video_storage import InMemoryStorage, SqliteStorage
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def library(request):
+    storage = InMemoryStorage() if request.param == "memory" \
+        else SqliteStorage()
+    yield VideoLibrary(storage=storage)
+    storage.close()
+
+
+def _ids(videos):
+    return [video.video_id for video in videos]
+
+
+def test_storage_lookups(library):
+    assert len(library.videos) == 5
+    assert "amazing_cats_video_id" in library.videos
+    assert "does_not_exist" not in library.videos
+    video = library.get_video("amazing_cats_video_id")
+    assert video.title == "Amazing Cats"
+    assert video.tags == ("#cat", "#animal")
+    assert library.get_video("nothing_video_id").tags == ()
+    assert library.get_video("does_not_exist") is None
+    assert _ids(library.get_all_videos())[0] == "funny_dogs_video_id"
+
+
+def test_storage_searches(library):
+    assert _ids(library.search_titles("CAT")) == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+    assert _ids(library.search_titles("at")) == [
+        "amazing_cats_video_id", "another_cat_video_id",
+        "life_at_google_video_id"]
+    assert _ids(library.search_titles("blah")) == []
+    assert _ids(library.search_tag("#DOG")) == ["funny_dogs_video_id"]
+    assert _ids(library.search_tag("#nothing")) == []
+
+
+def test_videos_by_title(library):
+    assert _ids(library.videos_by_title()) == [
+        "amazing_cats_video_id", "another_cat_video_id",
+        "funny_dogs_video_id", "life_at_google_video_id",
+        "nothing_video_id"]
+
+
+def test_sqlite_streams_listing_by_title():
+    storage = SqliteStorage()
+    storage.add_videos([Video("B", "b1", []), Video("A", "a", []),
+                        Video("B", "b2", [])])
+    listing = storage.values_by_title()
+    assert not isinstance(listing, list)
+    assert _ids(listing) == ["a", "b1", "b2"]
+    storage.close()
+
+
+def test_sqlite_keeps_tags_containing_commas(tmp_path):
+    database = tmp_path / "catalog.db"
+    storage = SqliteStorage(database)
+    storage.add_videos([Video("Title", "video_id", ["#a,b", "#c"])])
+    storage.close()
+    storage = SqliteStorage(database)
+    assert storage["video_id"].tags == ("#a,b", "#c")
+    assert _ids(storage.search_tag("#a,b")) == ["video_id"]
+    storage.close()
+
+
+def test_sqlite_reads_comma_joined_tags_of_older_databases(tmp_path):
+    database = tmp_path / "catalog.db"
+    SqliteStorage(database).close()
+    connection = sqlite3.connect(database)
+    with connection:
+        connection.execute("PRAGMA user_version = 0")
+        connection.execute(
+            "INSERT INTO videos (row, video_id, title, tags) "
+            "VALUES (1, 'video_id', 'Title', '#a,#b')")
+    connection.close()
+    storage = SqliteStorage(database)
+    assert storage["video_id"].tags == ("#a", "#b")
+    storage.close()
+
+
+def test_player_on_sqlite_storage(capfd):
+    player = VideoPlayer(VideoLibrary(storage=SqliteStorage()))
+    player.create_playlist("my_playlist")
+    player.add_to_playlist("my_playlist", "amazing_cats_video_id")
+    player.add_to_playlist("my_playlist", "amazing_cats_video_id")
+    player.play_video("amazing_cats_video_id")
+    player.play_video("funny_dogs_video_id")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Cannot add video to my_playlist: Video already added" in lines[2]
+    assert "Stopping video: Amazing Cats" in lines[4]
+    assert "Playing video: Funny Dogs" in lines[5]
+
+
+def test_sqlite_database_is_reused(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    generate_catalog(catalog, 25_000, seed=2)
+    database = tmp_path / "catalog.db"
+    storage = SqliteStorage(database)
+    VideoLibrary(catalog, storage)
+    storage.close()
+    catalog.unlink()
+
+    storage = SqliteStorage(database)
+    library = VideoLibrary(catalog, storage)
+    assert len(library.videos) == 25_000
+    title, video_id, tags = next(generate_rows(1, seed=2))
+    assert library.get_video(video_id).title == title
+    storage.close()
@@ -0,0 +1,20 @@
+import pytest
+
+from src.video import Video
+
+
+def test_precomputed_fields():
+    video = Video("Amazing Cats", "amazing_cats_video_id", ["#cat", "#animal"])
+    assert video.search_key == "amazing cats"
+    assert video.display_line == \
+           "Amazing Cats (amazing_cats_video_id) [#cat #animal]"
+    assert video.display() == video.display_line + " "
+    assert video.display("dont_like_cats") == \
+           video.display_line + " - FLAGGED (reason: dont_like_cats)"
+
+
+def test_video_has_no_instance_dict():
+    video = Video("Video about nothing", "nothing_video_id", [])
+    assert video.display_line == "Video about nothing (nothing_video_id) []"
+    with pytest.raises(AttributeError):
+        video.extra = 1